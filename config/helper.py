@@ -42,6 +42,12 @@ def get_sector_config() -> dict:
         config = yaml.safe_load(f)
     return config
 
+def get_settings() -> dict:
+    config_path = Path(__file__).resolve().parent / "settings.yaml"
+    with config_path.open("r") as f:
+        config = yaml.safe_load(f)
+    return config or {}
+
 def get_sector_tickers(sector: str, limit: Optional[int] = None) -> list:
     """
     Get tickers for a specific sector with optional limit
@@ -75,6 +81,16 @@ def get_sector_tickers(sector: str, limit: Optional[int] = None) -> list:
         return tickers[:limit]
     return tickers
 
+def get_all_holdings() -> list:
+    """
+    Get every ticker listed under sector_holdings, across all sectors, without duplicates.
+    """
+    config = get_sector_config()
+    tickers = []
+    for sector in config['sector_holdings']:
+        tickers.extend(get_sector_tickers(sector))
+    return list(dict.fromkeys(tickers))
+
 def get_resource(filename: str) -> Path:
     project_root = Path(__file__).resolve().parents[1]
     return project_root / "resources" / filename
\ No newline at end of file
@@ -2,8 +2,10 @@ import pandas as pd
 import os
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
-from config.helper import get_sector_config, get_data_file
+from config.helper import get_sector_config
 from src.fetch.update_data import update_data
+from src.fetch.manifest import get_entry
+from src.fetch.storage import read_tail
 
 class Dashboard:
     
@@ -25,28 +27,29 @@ class Dashboard:
         for ticker in self.all_tickers:
             try:
                 update_data(ticker)
-                # Get the daily data file path
+                # Synthetic ETFs keep their real price bars in _real_raw, returns stay in _daily
                 if ticker in (self.config['synthetic_etfs']):
-                    file_path_percent = get_data_file(f"{ticker}_real_raw.parquet")
-                    file_path_raw = get_data_file(f"{ticker}_daily.parquet")
+                    raw_artifact = 'real_raw'
                 else:
-                    file_path_percent = get_data_file(f"{ticker}_daily.parquet")
-                    file_path_raw = get_data_file(f"{ticker}_daily_raw.parquet")
+                    raw_artifact = 'daily_raw'
                 
-                # Read the parquet file
-                df_percent = pd.read_parquet(file_path_percent)
-                df_raw = pd.read_parquet(file_path_raw)
-                df_percent = df_percent.sort_values('date')
-                df_raw = df_raw.sort_values('date')
-                
-                if len(df_percent) < 2:
-                    errors.append(f"Insufficient data for {ticker}")
+                # Check the manifest before opening any file
+                percent_entry = get_entry(ticker, 'daily')
+                raw_entry = get_entry(ticker, raw_artifact)
+                if percent_entry is None or raw_entry is None:
+                    errors.append(f"No data for {ticker}")
                     continue
                 
-                if len(df_raw) < 2:
+                if percent_entry['rows'] < 2 or raw_entry['rows'] < 2:
                     errors.append(f"Insufficient data for {ticker}")
                     continue
                 
+                # Read only the trailing rows
+                df_percent = read_tail(ticker, 'daily', 1)
+                df_raw = read_tail(ticker, raw_artifact, 2)
+                df_percent = df_percent.sort_values('date')
+                df_raw = df_raw.sort_values('date')
+                
                 # Get last two days of data
                 last_two = df_raw.tail(2)
                 current = last_two.iloc[-1]
@@ -12,9 +12,8 @@ from PyQt6 import uic
 from gui.dashboard import Dashboard
 from src.graphing.graphs import plot_rrg, plot_sector_relative_strength, plot_sector_relative_strength_momentum, plot_volatility_heatmap
 from config.helper import get_sector_tickers, get_sector_config
-from src.process.relative_strength import get_relative_strength
-from src.process.rs_momentum import get_relative_strength_momentum
-from src.process.volatility import compute_volatility_for_timeframe
+from src.process.rrg import compute_rrg
+from src.process.volatility import compute_volatility
 
 sector_config = get_sector_config()
 sector_etfs = sector_config['sector_etfs']
@@ -177,10 +176,18 @@ class MainWindow(QMainWindow):
             'tickers': target_list,
             'benchmark': current_benchmark
         }
+
+        # RS ratio and momentum for all three timeframes in one pass, shared by the graphs and the tables
+        try:
+            rrg = compute_rrg(target_list, current_benchmark, lookback_days=self.comparisonLookbackSpinBox.value(), momentum_window=self.comparisonWindowSpinBox.value())
+        except Exception as e:
+            print(f"Error computing RRG data: {e}")
+            rrg = None
         
         if self.RRGChoice.isChecked():
             plottype = plot_rrg
             params['momentum_widget'] = self.comparisonWindowSpinBox
+            params['rrg'] = rrg
         elif self.RSMomentumChoice.isChecked():
             plottype = plot_sector_relative_strength_momentum
             params['momentum_widget'] = self.comparisonWindowSpinBox
@@ -196,22 +203,27 @@ class MainWindow(QMainWindow):
             'weekly': self.weeklyComparisonTable,
             'monthly': self.monthlyComparisonTable
         }
-        self.timeframe_comparison_tables(tickers=target_list, benchmark=current_benchmark, lookback=self.comparisonLookbackSpinBox.value(), momentum_window=self.comparisonWindowSpinBox.value(), tables_dict=tables_dict)
+        self.timeframe_comparison_tables(tickers=target_list, benchmark=current_benchmark, lookback=self.comparisonLookbackSpinBox.value(), momentum_window=self.comparisonWindowSpinBox.value(), tables_dict=tables_dict, rrg=rrg)
         
-    def timeframe_comparison_tables(self, tickers, benchmark, lookback, momentum_window, tables_dict):
+    def timeframe_comparison_tables(self, tickers, benchmark, lookback, momentum_window, tables_dict, rrg=None):
         metrics = ['Volatility', 'RS', 'Momentum']
+        try:
+            # every ticker and timeframe in one pass
+            volatility = compute_volatility(tickers, list(tables_dict), window=lookback)
+        except Exception as e:
+            print(f"Error computing volatility: {e}")
+            volatility = None
         
         for tf, table in tables_dict.items():
             rows = []
             for ticker in tickers:
                 try:
-                    vol = compute_volatility_for_timeframe(ticker, timeframe=tf, window=lookback, raw_volatility=True)
-                    rs_raw = get_relative_strength(target=ticker, benchmark=benchmark, timeframe=tf, lookback_days=lookback)
-                    rs_series = pd.Series(rs_raw) if isinstance(rs_raw, list) else rs_raw
-                    rs = rs_series.iloc[-1]
-                    mom_raw = get_relative_strength_momentum(target=ticker, benchmark=benchmark, timeframe=tf, lookback_days=lookback, return_series=True)
-                    mom_series = pd.Series(mom_raw) if isinstance(mom_raw, list) else mom_raw
-                    mom = mom_series.iloc[-1]
+                    vol = volatility[tf]['vol'][ticker].dropna().iloc[-1] if volatility is not None else None
+                    if rrg is None:
+                        rrg = compute_rrg(tickers, benchmark, lookback_days=lookback, momentum_window=momentum_window)
+                    # latest point of the ticker's RRG tail
+                    rs = rrg[tf]['rs'][ticker].dropna().iloc[-1]
+                    mom = rrg[tf]['momentum'][ticker].dropna().iloc[-1]
                     rows.append((ticker, vol, rs, mom))
                 except Exception as e:
                     print(f"Error for {ticker} @ {tf}: {e}")
@@ -414,7 +426,7 @@ class MainWindow(QMainWindow):
         table_widget.resizeColumnsToContents()
         table_widget.setSortingEnabled(True)
 
-    def render_plot_to_webview(self, webview, lookback_widget, timeframe_widget, plot_func, momentum_widget: Optional[QSpinBox] = None, benchmark: Optional[str] = None, tickers: Optional[List[str]] = None, normalize: Optional[bool] = None):
+    def render_plot_to_webview(self, webview, lookback_widget, timeframe_widget, plot_func, momentum_widget: Optional[QSpinBox] = None, benchmark: Optional[str] = None, tickers: Optional[List[str]] = None, normalize: Optional[bool] = None, rrg: Optional[dict] = None):
         try:
             lookback = lookback_widget.value()
             timeframe = timeframe_widget
@@ -438,6 +450,9 @@ class MainWindow(QMainWindow):
                 params['benchmark'] = benchmark
             if momentum_widget is not None:
                 params['momentum_window'] = momentum_widget.value()
+            # precomputed RRG data shared across timeframes
+            if rrg is not None and plot_func.__name__ == 'plot_rrg':
+                params['rrg'] = rrg
             
             # Call the function with unpacked parameters
             html_content = plot_func(**params)
@@ -1,10 +1,9 @@
-import requests
 import pandas as pd
-import time
 import os
 from datetime import datetime
 
 from config.helper import key, get_financial_dir
+from src.fetch.provider_client import http_get
 data_dir = get_financial_dir()
 
 poly_api_key = key('polygon')
@@ -49,7 +48,7 @@ def fetchfinancials(ticker):
         endpoint = f"{polyfinendpoint}ticker={ticker}&order=desc&limit=1&sort=filing_date&apiKey={poly_api_key}"
     
         print(f"Fetching page for {ticker}...")
-        raw = requests.get(endpoint)
+        raw = http_get(endpoint)
         jraw = raw.json()
         
         if jraw.get('status') not in ['OK', 'DELAYED']:
@@ -58,8 +57,6 @@ def fetchfinancials(ticker):
         results = jraw.get('results',[])
         
         all_results.extend(results)
-
-        time.sleep(0.1)
             
         if all_results:
             most_recent_entry = all_results[0]
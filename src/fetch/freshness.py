@@ -0,0 +1,53 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from config.helper import get_settings
+from src.fetch.trading_calendar import last_completed_session
+
+# ticker -> (expires_at, session the check was made against)
+_registry = {}
+_listeners = []
+_lock = threading.Lock()
+
+ttl_seconds = get_settings().get('freshness', {}).get('ttl_seconds', 300)
+
+def set_ttl(seconds: float):
+    global ttl_seconds
+    ttl_seconds = seconds
+
+def is_fresh(ticker: str) -> bool:
+    """
+    True if ticker was checked within the TTL and no new session has completed since.
+    """
+    with _lock:
+        entry = _registry.get(ticker)
+    if entry is None:
+        return False
+    expires_at, session = entry
+    return time.monotonic() < expires_at and session == last_completed_session()
+
+def mark_fresh(ticker: str, ttl: Optional[float] = None):
+    expires_at = time.monotonic() + (ttl_seconds if ttl is None else ttl)
+    session = last_completed_session()
+    with _lock:
+        _registry[ticker] = (expires_at, session)
+
+def invalidate(ticker: Optional[str] = None):
+    """
+    Forget the freshness of one ticker (or all of them) and notify listeners.
+    Called by the fetch layer whenever it writes new data.
+    """
+    with _lock:
+        if ticker is None:
+            _registry.clear()
+        else:
+            _registry.pop(ticker, None)
+        listeners = list(_listeners)
+    for callback in listeners:
+        callback(ticker)
+
+def on_invalidate(callback: Callable[[Optional[str]], None]):
+    """Register a callback(ticker) run on every invalidation; ticker is None for a full reset."""
+    with _lock:
+        _listeners.append(callback)
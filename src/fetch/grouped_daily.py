@@ -0,0 +1,123 @@
+import pandas as pd
+from datetime import timedelta
+from typing import List, Optional
+
+from config.helper import key, get_all_holdings, get_settings
+from src.fetch.provider_client import http_get
+from src.fetch.price_data import fetch, etf_tickers
+from src.fetch.trading_calendar import sessions, last_completed_session
+from src.fetch.manifest import last_date
+from src.fetch.storage import append_bars
+from src.fetch.update_data import update_data
+
+poly_api_key = key('polygon')
+grouped_api_endpoint = 'https://api.polygon.io/v2/aggs/grouped/locale/us/market/stocks/'
+
+# holdings further behind than this are updated on their own rather than widening the grouped span
+max_sessions = get_settings().get('grouped', {}).get('max_sessions', 10)
+
+def fetch_grouped_daily(date: str) -> pd.DataFrame:
+    """
+    Fetch every US stock's daily bar for one session in a single request.
+    Returns a DataFrame indexed by ticker with the same columns as the Polygon _daily_raw files.
+    """
+    print(f"Fetching grouped daily bars for {date}...")
+    raw = http_get(f"{grouped_api_endpoint}{date}?adjusted=true&apiKey={poly_api_key}")
+    jraw = raw.json()
+
+    if jraw.get('status') not in ['OK', 'DELAYED']:
+        print(f"Error: API returned status {jraw.get('status')} for grouped daily {date}")
+        return pd.DataFrame()
+
+    results = jraw.get('results', [])
+    if not results:
+        # non-sessions come back empty
+        return pd.DataFrame()
+
+    bars = pd.DataFrame(results)
+    bars = bars.rename(columns={
+        'T': 'ticker',
+        'v': 'volume',
+        'c': 'close',
+        'o': 'open',
+        'h': 'high',
+        'l': 'low'
+    })
+    bars['date'] = pd.Timestamp(date)
+    return bars.set_index('ticker')
+
+def _sessions_behind(last_dates: dict, end_date) -> dict:
+    """Number of sessions after each ticker's last stored date, up to end_date."""
+    naive = {t: pd.Timestamp(d.tz_localize(None) if d.tz is not None else d).normalize() for t, d in last_dates.items()}
+    if not naive:
+        return {}
+    calendar = sessions(min(naive.values()) + timedelta(days=1), end_date)
+    return {t: int(len(calendar) - calendar.searchsorted(d, side='right')) for t, d in naive.items()}
+
+def update_grouped(tickers: Optional[List[str]] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> dict:
+    """
+    Bring a universe of stocks up to date with one grouped-daily request per missing session,
+    instead of one request per ticker.
+
+    Args:
+        tickers: Tickers to update (defaults to every sector holding in config/sectors.yaml).
+            ETFs are skipped since they are sourced from Tiingo.
+        start_date: First session to pull for every stored ticker. By default the span starts
+            after the oldest last date among tickers at most grouped.max_sessions behind; tickers
+            further behind (stale or delisted) are caught up one by one through update_data, so
+            they never stretch the grouped span.
+        end_date: Last session to pull (defaults to the last completed session)
+    Returns:
+        {'written': ticker -> new rows from the grouped bars,
+         'laggards': tickers caught up individually,
+         'backfilled': tickers without stored history, fetched in full through fetch()}
+    """
+    if tickers is None:
+        tickers = get_all_holdings()
+    tickers = [t for t in dict.fromkeys(tickers) if t not in etf_tickers]
+    if end_date is None:
+        end_date = last_completed_session().strftime('%Y-%m-%d')
+
+    last_dates = {t: last_date(t, 'daily_raw') for t in tickers}
+    missing = [t for t, d in last_dates.items() if d is None]
+    stored = {t: d for t, d in last_dates.items() if d is not None}
+
+    laggards = []
+    if start_date is None:
+        behind = _sessions_behind(stored, end_date)
+        laggards = [t for t, n in behind.items() if n > max_sessions]
+        stored = {t: d for t, d in stored.items() if 0 < behind[t] <= max_sessions}
+        if stored:
+            start_date = (min(stored.values()) + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    written = {}
+    if stored:
+        # one request per exchange session, weekends and holidays are skipped
+        frames = [fetch_grouped_daily(d.strftime('%Y-%m-%d')) for d in sessions(start_date, end_date)]
+        frames = [f for f in frames if not f.empty]
+
+        if frames:
+            bars = pd.concat(frames)
+            bars = bars[bars.index.isin(list(stored))]
+            # single write pass: one delta partition per ticker for the whole span
+            for ticker, ticker_bars in bars.groupby(level=0):
+                ticker_bars = ticker_bars.set_index('date').sort_index()
+                try:
+                    written[ticker] = append_bars(ticker, ticker_bars)
+                except Exception as e:
+                    print(f"Error writing grouped bars for {ticker}: {e}")
+        print(f"Grouped update: {len(frames)} sessions, {sum(written.values())} new rows across {len(written)} tickers")
+
+    if laggards:
+        print(f"{len(laggards)} tickers more than {max_sessions} sessions behind, updating individually...")
+        for ticker in laggards:
+            update_data(ticker)
+
+    if missing:
+        print(f"No stored history for {len(missing)} tickers, backfilling individually...")
+        fetch(missing, concurrent=True)
+
+    return {'written': written, 'laggards': laggards, 'backfilled': missing}
+
+if __name__ == "__main__":
+    update_grouped()
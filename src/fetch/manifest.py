@@ -0,0 +1,254 @@
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from config.helper import get_data_dir, get_settings
+from src.fetch.freshness import invalidate
+
+data_dir = get_data_dir()
+manifest_path = data_dir / 'manifest.json'
+
+# date-sorted row groups with min/max statistics let readers skip everything outside a date range
+row_group_size = get_settings().get('storage', {}).get('row_group_size', 252)
+
+# artifact name -> file suffix, following the {ticker}{suffix} naming in data/
+ARTIFACTS = {
+    'daily': '_daily.parquet',
+    'daily_raw': '_daily_raw.parquet',
+    'weekly': '_weekly.parquet',
+    'weekly_raw': '_weekly_raw.parquet',
+    'monthly': '_monthly.parquet',
+    'monthly_raw': '_monthly_raw.parquet',
+    'real_raw': '_real_raw.parquet',
+    'synthetic_prices_raw': '_synthetic_prices_raw.parquet',
+    # cached pre-inception segments are keyed by their weights under synthetic/; the row points at the one in use
+    'synthetic': '_synthetic.parquet'
+}
+
+# artifacts update_data fetches; writing one changes what a ticker's freshness and cached
+# series were based on. Derived artifacts (resampled timeframes) are rebuilt from these.
+SOURCE_ARTIFACTS = {'daily', 'daily_raw', 'real_raw'}
+
+def register_artifact(artifact: str, suffix: Optional[str] = None):
+    """Add an artifact kind, e.g. a custom resampled timeframe ('quarterly', '10session')."""
+    ARTIFACTS.setdefault(artifact, suffix or f"_{artifact}.parquet")
+
+_lock = threading.RLock()
+_entries = None
+_loaded_mtime = None
+
+def artifact_path(ticker: str, artifact: str) -> Path:
+    if artifact not in ARTIFACTS:
+        raise ValueError(f"Unknown artifact '{artifact}'. Use one of {list(ARTIFACTS)}")
+    return data_dir / f"{ticker}{ARTIFACTS[artifact]}"
+
+def _entry_key(ticker: str, artifact: str) -> str:
+    return f"{ticker}/{artifact}"
+
+def file_sha256(path) -> str:
+    """SHA-256 of a file's contents, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _load():
+    # (re)load from disk if another process rewrote the manifest
+    global _entries, _loaded_mtime
+    mtime = manifest_path.stat().st_mtime_ns if manifest_path.exists() else None
+    if _entries is None or mtime != _loaded_mtime:
+        if mtime is None:
+            _entries = {}
+        else:
+            with manifest_path.open('r') as f:
+                _entries = json.load(f).get('entries', {})
+        _loaded_mtime = mtime
+    return _entries
+
+def _flush():
+    global _loaded_mtime
+    data_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix('.json.tmp')
+    with tmp_path.open('w') as f:
+        json.dump({'version': 1, 'entries': _entries}, f)
+    os.replace(tmp_path, manifest_path)
+    _loaded_mtime = manifest_path.stat().st_mtime_ns
+
+def _last_values(df: pd.DataFrame) -> dict:
+    # numeric values of the final row, e.g. the last close needed to extend a return series
+    if df.empty:
+        return {}
+    last = df.iloc[-1]
+    return {str(col): float(last[col]) for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and pd.notna(last[col])}
+
+def describe(df: pd.DataFrame, path) -> dict:
+    """Manifest row for a stored frame: date span, row count, schema, last values and content hashes."""
+    index = df.index
+    if isinstance(index, pd.DatetimeIndex) and len(index):
+        first_date, last_date = index.min().isoformat(), index.max().isoformat()
+    else:
+        first_date = last_date = None
+    file_hash = file_sha256(path)
+    return {
+        'path': os.path.relpath(path, data_dir),
+        'first_date': first_date,
+        'last_date': last_date,
+        'rows': int(len(df)),
+        'schema': {str(col): str(dtype) for col, dtype in df.dtypes.items()},
+        'last': _last_values(df),
+        'hash': file_hash,
+        # identifies the stored history: unchanged by appended deltas and compaction, new on any other rewrite
+        'base_hash': file_hash,
+        'deltas': [],
+        'updated': datetime.now().isoformat(timespec='seconds')
+    }
+
+def record(ticker: str, artifact: str, df: pd.DataFrame, path=None) -> dict:
+    """Update the manifest row for an artifact that has just been written."""
+    path = artifact_path(ticker, artifact) if path is None else Path(path)
+    entry = dict(describe(df, path), ticker=ticker, artifact=artifact)
+    with _lock:
+        _load()[_entry_key(ticker, artifact)] = entry
+        _flush()
+    return entry
+
+def write_parquet(df: pd.DataFrame, path):
+    """Write a frame sorted by date in fixed-size row groups with statistics, atomically (temp file + rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    df.sort_index().to_parquet(tmp_path, row_group_size=row_group_size, write_statistics=True)
+    os.replace(tmp_path, path)
+
+def write_artifact(df: pd.DataFrame, ticker: str, artifact: str, path=None) -> dict:
+    """
+    Write a frame to parquet (see write_parquet), record it in the manifest and, for source
+    artifacts, invalidate the ticker's freshness. Returns the manifest row.
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    df = df.sort_index()
+    path = artifact_path(ticker, artifact) if path is None else Path(path)
+    write_parquet(df, path)
+    with _lock:
+        old_entry = _load().get(_entry_key(ticker, artifact))
+        entry = record(ticker, artifact, df, path)
+    # a full rewrite supersedes any appended delta partitions
+    if old_entry is not None:
+        for delta in old_entry.get('deltas', []):
+            delta_path = data_dir / delta
+            if delta_path.exists():
+                delta_path.unlink()
+            if delta_path.parent.exists() and not any(delta_path.parent.iterdir()):
+                delta_path.parent.rmdir()
+    if artifact in SOURCE_ARTIFACTS:
+        invalidate(ticker)
+    return entry
+
+def extend(ticker: str, artifact: str, delta: pd.DataFrame, delta_path, replaced: int = 0) -> dict:
+    """
+    Update the manifest row of an artifact after a delta partition with newer rows has been
+    written next to it (see src.fetch.storage). `replaced` counts delta rows that overwrite
+    existing ones rather than adding to the row count. Returns the updated row.
+    """
+    with _lock:
+        entry = dict(_load()[_entry_key(ticker, artifact)])
+        delta_hash = file_sha256(delta_path)
+        entry.update({
+            'last_date': delta.index.max().isoformat(),
+            'rows': entry['rows'] + int(len(delta)) - replaced,
+            'last': dict(entry.get('last', {}), **_last_values(delta)),
+            'hash': hashlib.sha256((entry['hash'] + delta_hash).encode()).hexdigest(),
+            'deltas': entry.get('deltas', []) + [os.path.relpath(delta_path, data_dir)],
+            'updated': datetime.now().isoformat(timespec='seconds')
+        })
+        if entry['first_date'] is None:
+            entry['first_date'] = delta.index.min().isoformat()
+        _entries[_entry_key(ticker, artifact)] = entry
+        _flush()
+    if artifact in SOURCE_ARTIFACTS:
+        invalidate(ticker)
+    return entry
+
+def annotate(ticker: str, artifact: str, **fields) -> dict:
+    """Attach extra fields to an existing manifest row (kept until the artifact is rewritten)."""
+    with _lock:
+        entry = dict(_load()[_entry_key(ticker, artifact)], **fields)
+        _entries[_entry_key(ticker, artifact)] = entry
+        _flush()
+    return entry
+
+def get_entry(ticker: str, artifact: str) -> Optional[dict]:
+    """
+    Manifest row for an artifact, or None if it does not exist. Files written before
+    the manifest existed are indexed on first lookup.
+    """
+    with _lock:
+        entry = _load().get(_entry_key(ticker, artifact))
+    if entry is not None:
+        if (data_dir / entry['path']).exists():
+            return entry
+        forget(ticker, artifact)
+        return None
+
+    path = artifact_path(ticker, artifact) if artifact in ARTIFACTS else None
+    if path is None or not path.exists():
+        return None
+    return record(ticker, artifact, pd.read_parquet(path), path)
+
+def base_version(entry: dict) -> Optional[str]:
+    """
+    Hash of the base file an artifact's deltas are stacked on, kept through compaction (which
+    folds in rows that were already appended). It changes when history is rewritten (re-fetch,
+    rebuild, new start date) but not on appends. None for rows indexed before it was tracked.
+    """
+    if 'base_hash' in entry:
+        return entry['base_hash']
+    return entry['hash'] if not entry.get('deltas') else None
+
+def last_date(ticker: str, artifact: str = 'daily') -> Optional[pd.Timestamp]:
+    entry = get_entry(ticker, artifact)
+    if entry is None or entry['last_date'] is None:
+        return None
+    return pd.Timestamp(entry['last_date'])
+
+def version(ticker: str, artifact: str = 'daily') -> Optional[str]:
+    """Content hash of an artifact, usable as a cache key."""
+    entry = get_entry(ticker, artifact)
+    return entry['hash'] if entry is not None else None
+
+def forget(ticker: str, artifact: str):
+    with _lock:
+        if _load().pop(_entry_key(ticker, artifact), None) is not None:
+            _flush()
+
+def entries() -> dict:
+    with _lock:
+        return dict(_load())
+
+def rebuild_manifest():
+    """
+    Re-index every artifact file in data/ from scratch. Artifacts that were recorded at a path
+    outside the {ticker}{suffix} naming (e.g. synthetic segments) are re-indexed from the
+    recorded path while their file still exists.
+    """
+    global _entries
+    with _lock:
+        previous = dict(_load())
+        _entries = {}
+        for artifact, suffix in ARTIFACTS.items():
+            for path in data_dir.glob(f"*{suffix}"):
+                ticker = path.name[:-len(suffix)]
+                _entries[_entry_key(ticker, artifact)] = dict(describe(pd.read_parquet(path), path), ticker=ticker, artifact=artifact)
+        for key, entry in previous.items():
+            path = data_dir / entry['path']
+            if key not in _entries and entry.get('artifact') in ARTIFACTS and path.exists():
+                _entries[key] = dict(describe(pd.read_parquet(path), path), ticker=entry['ticker'], artifact=entry['artifact'])
+        _flush()
+    return entries()
@@ -0,0 +1,212 @@
+import os
+import json
+import threading
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import List, Optional
+
+from config.helper import get_data_dir, get_sector_config
+from src.fetch.manifest import get_entry, base_version
+from src.fetch.storage import read_artifact
+
+data_dir = get_data_dir()
+panel_dir = data_dir / 'panel'
+sources_path = panel_dir / '_sources.json'
+
+config = get_sector_config()
+synth_tickers = config['synthetic_etfs']
+
+# stored fields; 'return' is the daily return series from _daily, the rest come from the raw bars.
+# All of them are on _daily's price basis: Tiingo's unadjusted open/high/low/close/volume (not the
+# adj* columns next to them) and Polygon's adjusted aggregates, so close.pct_change() == return
+FIELDS = ['open', 'high', 'low', 'close', 'volume', 'return']
+
+# bump when the way fields are built changes, so every ticker is re-ingested on the next sync
+PANEL_VERSION = 2
+
+_lock = threading.RLock()
+
+def _raw_artifact(ticker: str) -> str:
+    return 'real_raw' if ticker in synth_tickers else 'daily_raw'
+
+def _naive_dates(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    # one shared, tz-naive date axis for Tiingo (naive) and Polygon (UTC midnight) data
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+def _year_path(field: str, year: int):
+    return panel_dir / field / f"year={year}.parquet"
+
+def _load_sources() -> dict:
+    if not sources_path.exists():
+        return {}
+    with sources_path.open('r') as f:
+        return json.load(f)
+
+def _save_sources(sources: dict):
+    panel_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = sources_path.with_suffix('.json.tmp')
+    with tmp_path.open('w') as f:
+        json.dump(sources, f)
+    os.replace(tmp_path, sources_path)
+
+def _source_versions(ticker: str) -> Optional[dict]:
+    daily = get_entry(ticker, 'daily')
+    if daily is None:
+        return None
+    raw = get_entry(ticker, _raw_artifact(ticker))
+    return {
+        'daily': daily['hash'],
+        'raw': raw['hash'] if raw is not None else None,
+        'daily_base': base_version(daily),
+        'raw_base': base_version(raw) if raw is not None else None,
+        'version': PANEL_VERSION
+    }
+
+def _rewritten(versions: dict, previous: dict) -> bool:
+    # appends and compaction keep the base versions; anything else (re-fetch, rebuild) replaced history
+    return (
+        not previous
+        or versions['daily_base'] is None
+        or versions['daily_base'] != previous.get('daily_base')
+        or versions['raw_base'] != previous.get('raw_base')
+        or versions['version'] != previous.get('version')
+    )
+
+def _ticker_fields(ticker: str) -> dict:
+    """Every panel field of one ticker as a date-indexed Series."""
+    series = {}
+    daily = read_artifact(ticker, 'daily')
+    if isinstance(daily, pd.DataFrame):
+        daily = daily.select_dtypes(include='number').iloc[:, 0]
+    daily.index = _naive_dates(daily.index)
+    series['return'] = daily
+
+    if get_entry(ticker, _raw_artifact(ticker)) is not None:
+        raw = read_artifact(ticker, _raw_artifact(ticker))
+        raw.index = _naive_dates(raw.index)
+        for field in ['open', 'high', 'low', 'close', 'volume']:
+            if field in raw.columns:
+                series[field] = raw[field].astype(float)
+    return series
+
+def _write_year(field: str, year: int, columns: dict, dropped=()):
+    path = _year_path(field, year)
+    frame = pd.read_parquet(path) if path.exists() else pd.DataFrame()
+    frame = frame.drop(columns=[t for t in list(columns) + list(dropped) if t in frame.columns])
+    if columns:
+        frame = pd.concat([frame, pd.DataFrame(columns)], axis=1)
+    frame = frame.sort_index()
+    frame.index.name = 'date'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    frame.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+def _stored_years(field: str) -> set:
+    field_dir = panel_dir / field
+    if not field_dir.exists():
+        return set()
+    return {int(path.stem.split('=')[1]) for path in field_dir.glob('year=*.parquet')}
+
+def sync_panel(tickers: List[str]) -> List[str]:
+    """
+    Bring the panel up to date with the per-ticker artifacts. Only tickers whose manifest
+    hashes changed since the last sync are re-ingested. When only deltas were appended, only
+    the years from the previous last date on are rewritten; when a base file was replaced
+    (re-fetch, rebuild, new start date) every year is re-ingested and the ticker is dropped from
+    years its new history no longer covers. Each affected year file is written once per field.
+    Returns the synced tickers.
+    """
+    with _lock:
+        sources = _load_sources()
+        changed = {}
+        for ticker in tickers:
+            versions = _source_versions(ticker)
+            if versions is None:
+                continue
+            previous = sources.get(ticker, {})
+            if any(previous.get(k) != v for k, v in versions.items()):
+                first_year = None if _rewritten(versions, previous) or not previous.get('last_date') else pd.Timestamp(previous['last_date']).year
+                changed[ticker] = (versions, first_year)
+
+        if not changed:
+            return []
+
+        # year -> field -> ticker -> series slice, and year -> field -> tickers to drop
+        by_year, dropped = {}, {}
+        stored_years = {field: _stored_years(field) for field in FIELDS}
+        for ticker, (versions, first_year) in changed.items():
+            fields = _ticker_fields(ticker)
+            for field, values in fields.items():
+                covered = set()
+                for year, chunk in values.groupby(values.index.year):
+                    covered.add(year)
+                    # appended data only touches years from the previous last date onwards
+                    if first_year is not None and year < first_year:
+                        continue
+                    by_year.setdefault(year, {}).setdefault(field, {})[ticker] = chunk
+                if first_year is None:
+                    for year in stored_years[field] - covered:
+                        if ticker not in pq.read_schema(_year_path(field, year)).names:
+                            continue
+                        dropped.setdefault(year, {}).setdefault(field, set()).add(ticker)
+            last_date = fields['return'].index.max()
+            sources[ticker] = dict(versions, last_date=last_date.isoformat() if pd.notna(last_date) else None)
+
+        years = set(by_year) | set(dropped)
+        for year in years:
+            for field in set(by_year.get(year, {})) | set(dropped.get(year, {})):
+                _write_year(field, year, by_year.get(year, {}).get(field, {}), dropped.get(year, {}).get(field, ()))
+        _save_sources(sources)
+        print(f"Panel synced: {len(changed)} tickers, {len(years)} years")
+        return list(changed)
+
+def _read_columns(path, tickers: List[str]) -> pd.DataFrame:
+    # only the requested tickers that exist in this partition
+    available = set(pq.read_schema(path).names)
+    columns = [t for t in tickers if t in available]
+    return pd.read_parquet(path, columns=columns)
+
+def load_panel(tickers: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None, field: str = 'close', sync: bool = True) -> pd.DataFrame:
+    """
+    Load an aligned date x ticker matrix of one field for any ticker subset and date range.
+    Only the year partitions covering the range are opened, and only the requested columns
+    are read from them.
+
+    Args:
+        tickers: Tickers to load (columns of the result, in this order)
+        start_date, end_date: Optional inclusive date bounds
+        field: One of 'open', 'high', 'low', 'close', 'volume', 'return'
+        sync: Re-ingest tickers whose stored data changed before reading
+    Returns:
+        DataFrame indexed by date with one column per ticker (NaN where a ticker has no data)
+    """
+    if field not in FIELDS:
+        raise ValueError(f"field must be one of {FIELDS}")
+    tickers = list(dict.fromkeys(tickers))
+    if sync:
+        sync_panel(tickers)
+
+    field_dir = panel_dir / field
+    if not field_dir.exists():
+        return pd.DataFrame(columns=tickers, dtype=float)
+
+    start = pd.Timestamp(start_date) if start_date is not None else None
+    end = pd.Timestamp(end_date) if end_date is not None else None
+    frames = []
+    for path in sorted(field_dir.glob('year=*.parquet')):
+        year = int(path.stem.split('=')[1])
+        if (start is not None and year < start.year) or (end is not None and year > end.year):
+            continue
+        frames.append(_read_columns(path, tickers))
+
+    if not frames:
+        return pd.DataFrame(columns=tickers, dtype=float)
+    panel = pd.concat(frames).sort_index()
+    if start is not None:
+        panel = panel[panel.index >= start]
+    if end is not None:
+        panel = panel[panel.index <= end]
+    return panel.reindex(columns=tickers)
@@ -1,11 +1,14 @@
-import requests
 import pandas as pd
 import time
-import os
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from config.helper import key, get_data_dir, get_sector_config
 from src.fetch.synthetic_price_data import fetchandpatch_synthetics
+from src.fetch.rate_limit import get_limiter
+from src.fetch.provider_client import http_get
+from src.fetch.manifest import write_artifact, get_entry
+from src.fetch.storage import append_bars
 
 # dir of data files and sector list
 data_dir = get_data_dir()
@@ -68,9 +71,39 @@ synthetic_params = {
     }
 }
 
+def _report(ticker, provider, status, rows=0, error=None, started=None):
+    return {
+        'ticker': ticker,
+        'provider': provider,
+        'status': status,
+        'rows': rows,
+        'error': error,
+        'seconds': round(time.monotonic() - started, 3) if started is not None else None
+    }
+
+def provider_for(ticker: str) -> str:
+    """
+    Provider used for a ticker: sector ETFs and the benchmark come from Tiingo, everything else from Polygon.
+    """
+    return 'tiingo' if ticker in etf_tickers else 'polygon'
+
+def raw_artifact(ticker: str) -> str:
+    """Raw bars a ticker's new sessions are appended to: the real post-inception bars for synthetic ETFs."""
+    return 'real_raw' if ticker in synthetic_params else 'daily_raw'
+
+def _appendable(ticker, start_date, update):
+    # appends continue from the last stored raw bar; without one only a full history is written,
+    # never the missing span on its own
+    if update and get_entry(ticker, raw_artifact(ticker)) is None:
+        print(f"No stored {raw_artifact(ticker)} data for {ticker}, fetching the full history instead")
+        return default_start_date, False
+    return start_date, update
+
 def fetch_polygon_stock(ticker, start_date=default_start_date, end_date=default_end_date, update=False):
 
     print(f'Fetching {ticker} using Polygon API...')
+    started = time.monotonic()
+    start_date, update = _appendable(ticker, start_date, update)
     try:
         all_results = []
         next_url = f"{stock_api_endpoint}{ticker}/range/1/day/{start_date}/{end_date}?adjusted=true&sort=asc&limit=50000&apikey={poly_api_key}"
@@ -78,7 +111,7 @@ def fetch_polygon_stock(ticker, start_date=default_start_date, end_date=default_
         # Loop through all pages
         while next_url:
             print(f"Fetching page for {ticker}...")
-            raw = requests.get(next_url)
+            raw = http_get(next_url)
             jraw = raw.json()
             
             if jraw.get('status') not in ['OK', 'DELAYED']:
@@ -97,9 +130,6 @@ def fetch_polygon_stock(ticker, start_date=default_start_date, end_date=default_
                 # Add API key to next_url if it doesn't have it
                 if 'apikey=' not in next_url:
                     next_url += f"&apikey={poly_api_key}"
-            
-            # Small delay to avoid rate limiting
-            time.sleep(0.1)
         
         if all_results:
             # Convert to DataFrame
@@ -120,19 +150,14 @@ def fetch_polygon_stock(ticker, start_date=default_start_date, end_date=default_
                 'l': 'low'
             })
             
+            # Append logic: only the new bars are written, as delta partitions
+            if update:
+                rows = append_bars(ticker, data)
+                print(f"Appended {rows} new rows for {ticker}")
+                return _report(ticker, 'polygon', 'ok', rows=rows, started=started)
+
             # Save raw data
-            raw_path = os.path.join(data_dir, f'{ticker}_daily_raw.parquet')
-            daily_path = os.path.join(data_dir, f'{ticker}_daily.parquet')
-            # Append logic
-            if update and os.path.exists(raw_path):
-                old_raw = pd.read_parquet(raw_path)
-                data = data[~data.index.isin(old_raw.index)]
-                if not data.empty:
-                    data = pd.concat([old_raw, data]).sort_index()
-                else:
-                    data = old_raw
-            if not data.empty:
-                data.to_parquet(raw_path)
+            write_artifact(data, ticker, 'daily_raw')
             
             # Extract close prices and rename column
             close_df = data[['close']].copy()
@@ -140,118 +165,146 @@ def fetch_polygon_stock(ticker, start_date=default_start_date, end_date=default_
             
             # Calculate returns
             data_returns = close_df.pct_change().dropna()
-            data_returns.name = f'{ticker}'
             
             # Save processed data
-            if update and os.path.exists(daily_path):
-                old_daily = pd.read_parquet(daily_path)
-                # Ensure old_daily is a DataFrame
-                if isinstance(old_daily, pd.Series):
-                    old_daily = old_daily.to_frame()
-                data_returns = data_returns[~data_returns.index.isin(old_daily.index)]
-                if not data_returns.empty:
-                    data_returns = pd.concat([old_daily, data_returns]).sort_index()
-                else:
-                    data_returns = old_daily
             if not data_returns.empty:
-                data_returns.to_parquet(daily_path)
+                write_artifact(data_returns, ticker, 'daily')
             print(f"Saved: {ticker}_daily.parquet ({len(all_results)} records)")
+            return _report(ticker, 'polygon', 'ok', rows=len(all_results), started=started)
         else:
             print(f"Error: No data returned for {ticker}")
+            return _report(ticker, 'polygon', 'empty', started=started)
             
     except Exception as e:
         print(f"Error fetching {ticker} from Polygon: {e}")
+        return _report(ticker, 'polygon', 'error', error=str(e), started=started)
 
-def fetch(tickers=etf_tickers, start_date=default_start_date, end_date=default_end_date, update=False):
-    # Fetch and save data
-    if isinstance(tickers, str):
-        tickers = [tickers]
-    
-    for ticker in tickers:
-        print(f"\nFetching data for {ticker}...")
 
-        # Check if ticker is in the etf_tickers list
-        if ticker not in etf_tickers:
-            print(f'{ticker} is not in ETF list, using Polygon API...')
-            fetch_polygon_stock(ticker, start_date, end_date, update)
-            time.sleep(0.1)
-            continue
+def fetch_ticker(ticker, start_date=default_start_date, end_date=default_end_date, update=False) -> dict:
+    """
+    Fetch and save a single ticker from its provider.
+    Returns a result report: {'ticker', 'provider', 'status', 'rows', 'error', 'seconds'}
+    where status is 'ok', 'empty' or 'error'.
+    """
+    print(f"\nFetching data for {ticker}...")
+    started = time.monotonic()
+    start_date, update = _appendable(ticker, start_date, update)
 
-        # Many ETFs were reclassified or edited, skewing data
-        if ticker in synthetic_params:
-            print(f'Handling {ticker} (custom logic)...')
-            try:
-                params = synthetic_params[ticker]
+    # Check if ticker is in the etf_tickers list
+    if ticker not in etf_tickers:
+        print(f'{ticker} is not in ETF list, using Polygon API...')
+        return fetch_polygon_stock(ticker, start_date, end_date, update)
 
-                fetchandpatch_synthetics(
-                    ticker=ticker, 
-                    custom_list=params['weights'], 
-                    start_date=start_date, 
-                    customdate1=params['customdate1'], 
-                    customdate2=params['customdate2'], 
-                    end_date=end_date,
-                    api_endpoint=api_endpoint, 
-                    api_key=api_key,
-                    update=update
-                )
+    # Many ETFs were reclassified or edited, skewing data
+    if ticker in synthetic_params:
+        print(f'Handling {ticker} (custom logic)...')
+        try:
+            params = synthetic_params[ticker]
 
-                print(f"Saved synthetic and full stitched {ticker} return streams.")
-            except Exception as e:
-                print(f"Error calling synthetic ETF patching function for {ticker}: {e}")
+            rows = fetchandpatch_synthetics(
+                ticker=ticker, 
+                custom_list=params['weights'], 
+                start_date=start_date, 
+                customdate1=params['customdate1'], 
+                customdate2=params['customdate2'], 
+                end_date=end_date,
+                api_endpoint=api_endpoint, 
+                api_key=api_key,
+                update=update
+            )
+
+            if rows is None:
+                return _report(ticker, 'tiingo', 'empty', started=started)
+            print(f"Saved synthetic and full stitched {ticker} return streams.")
+            return _report(ticker, 'tiingo', 'ok', rows=rows, started=started)
+        except Exception as e:
+            print(f"Error calling synthetic ETF patching function for {ticker}: {e}")
+            return _report(ticker, 'tiingo', 'error', error=str(e), started=started)
+
+    try:
+        raw = http_get(f"{api_endpoint}/daily/{ticker}/prices?startDate={start_date}&endDate={end_date}&format=json&resampleFreq=daily&token={api_key}")
+        jraw = raw.json()
+        
+        # Debug: Check if we got valid data
+        if not jraw or len(jraw) == 0:
+            print(f"Warning: No data returned from API for {ticker}")
+            return _report(ticker, 'tiingo', 'empty', started=started)
+            
+        # Create DataFrame with explicit index to avoid scalar values error
+        try:
+            data = pd.DataFrame(jraw)
+        except ValueError as e:
+            raise e
+        
+        data['date'] = pd.to_datetime(data['date'])
+        
+        data.set_index('date', inplace=True)
+        # Append logic: only the new bars are written, as delta partitions
+        if update:
+            rows = append_bars(ticker, data)
+            print(f"Appended {rows} new rows for {ticker}")
+            return _report(ticker, 'tiingo', 'ok', rows=rows, started=started)
+
+        rows = len(data)
+        write_artifact(data, ticker, 'daily_raw')
+        data = data[['close']].copy()
+        data.rename(columns={'close': ticker}, inplace=True)
+        data_returns = data.pct_change().dropna()
+        if not data_returns.empty:
+            write_artifact(data_returns, ticker, 'daily')
+            print(f"Saved: {ticker}_daily.parquet")
+            return _report(ticker, 'tiingo', 'ok', rows=rows, started=started)
         else:
+            print(f"Error: No data returned for {ticker}")
+            return _report(ticker, 'tiingo', 'empty', started=started)
+    except Exception as e:
+        print(f"Error fetching {ticker}: {e}")
+        return _report(ticker, 'tiingo', 'error', error=str(e), started=started)
+
+def _fetch_with_slot(ticker, start_date, end_date, update):
+    # Synthetic ETFs take a slot per constituent and real-data request instead; holding one
+    # here as well could leave their constituents waiting on a slot held by their own parent
+    if ticker in synthetic_params:
+        return fetch_ticker(ticker, start_date, end_date, update)
+    # Hold one of the provider's concurrency slots for the whole ticker
+    with get_limiter(provider_for(ticker)).slot():
+        return fetch_ticker(ticker, start_date, end_date, update)
+
+def fetch(tickers=etf_tickers, start_date=default_start_date, end_date=default_end_date, update=False, concurrent=False, max_workers=None) -> dict:
+    """
+    Fetch and save data for one or more tickers.
+
+    Args:
+        tickers: Ticker or list of tickers
+        start_date, end_date: Date range as 'YYYY-MM-DD'
+        update: Append to existing files instead of overwriting them
+        concurrent: Fetch tickers in a thread pool. Throughput is bounded by each provider's
+            max_concurrency and token-bucket rate from config/settings.yaml.
+        max_workers: Thread pool size (defaults to the sum of the providers' max_concurrency)
+    Returns:
+        Dictionary of ticker -> result report (see fetch_ticker), in input order
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    # dedupe while keeping order
+    tickers = list(dict.fromkeys(tickers))
+
+    if not concurrent or len(tickers) < 2:
+        return {ticker: _fetch_with_slot(ticker, start_date, end_date, update) for ticker in tickers}
+
+    if max_workers is None:
+        max_workers = sum(get_limiter(p).max_concurrency for p in {provider_for(t) for t in tickers})
+
+    reports = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_fetch_with_slot, ticker, start_date, end_date, update): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
             try:
-                raw = requests.get(f"{api_endpoint}/daily/{ticker}/prices?startDate={start_date}&endDate={end_date}&format=json&resampleFreq=daily&token={api_key}")
-                jraw = raw.json()
-                
-                # Debug: Check if we got valid data
-                if not jraw or len(jraw) == 0:
-                    print(f"Warning: No data returned from API for {ticker}")
-                    continue
-                    
-                # Create DataFrame with explicit index to avoid scalar values error
-                try:
-                    data = pd.DataFrame(jraw)
-                except ValueError as e:
-                    raise e
-                
-                data['date'] = pd.to_datetime(data['date'])
-                
-                data.set_index('date', inplace=True)
-                raw_path = os.path.join(data_dir, f'{ticker}_daily_raw.parquet')
-                daily_path = os.path.join(data_dir, f'{ticker}_daily.parquet')
-                # Append logic
-                if update and os.path.exists(raw_path):
-                    old_raw = pd.read_parquet(raw_path)
-                    data = data[~data.index.isin(old_raw.index)]
-                    if not data.empty:
-                        data = pd.concat([old_raw, data]).sort_index()
-                    else:
-                        data = old_raw
-                if not data.empty:
-                    data.to_parquet(raw_path)
-                data = data[['close']].copy()
-                data.rename(columns={'close': ticker}, inplace=True)
-                data_returns = data.pct_change().dropna()
-                # Ensure data_returns is a Series and set its name
-                if isinstance(data_returns, pd.DataFrame):
-                    data_returns = data_returns.iloc[:, 0]  # Take first column if it's a DataFrame
-                data_returns.name = f'{ticker}'
-                if update and os.path.exists(daily_path):
-                    old_daily = pd.read_parquet(daily_path)
-                    # Ensure old_daily is a DataFrame
-                    if isinstance(old_daily, pd.Series):
-                        old_daily = old_daily.to_frame()
-                    data_returns = data_returns[~data_returns.index.isin(old_daily.index)]
-                    if not data_returns.empty:
-                        data_returns = pd.concat([old_daily, data_returns]).sort_index()
-                    else:
-                        data_returns = old_daily
-                if not data_returns.empty:
-                    data_returns.to_parquet(daily_path)
-                    print(f"Saved: {ticker}_daily.parquet")
-                else:
-                    print(f"Error: No data returned for {ticker}")
+                reports[ticker] = future.result()
             except Exception as e:
-                print(f"Error fetching {ticker}: {e}")
-        
-        time.sleep(1)
\ No newline at end of file
+                reports[ticker] = _report(ticker, provider_for(ticker), 'error', error=str(e))
+
+    failed = [t for t, r in reports.items() if r['status'] != 'ok']
+    print(f"\nFetched {len(tickers) - len(failed)}/{len(tickers)} tickers" + (f" (failed: {', '.join(failed)})" if failed else ""))
+    return {ticker: reports[ticker] for ticker in tickers}
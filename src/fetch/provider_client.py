@@ -0,0 +1,68 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.helper import get_settings
+from src.fetch.rate_limit import get_limiter
+
+# hosts that map to a rate-limited provider
+PROVIDER_HOSTS = {
+    'api.tiingo.com': 'tiingo',
+    'api.polygon.io': 'polygon'
+}
+
+http_settings = get_settings().get('http', {})
+default_timeout = http_settings.get('timeout', 30)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(
+        total=http_settings.get('retries', 3),
+        backoff_factor=http_settings.get('backoff', 0.5),
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        respect_retry_after_header=True
+    )
+    pool_size = http_settings.get('pool_maxsize', 16)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive'
+    })
+    return session
+
+def get_session(url: str) -> requests.Session:
+    """
+    Get the keep-alive session for the host of a URL, creating it on first use.
+    """
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _build_session()
+            _sessions[host] = session
+        return session
+
+def http_get(url: str, timeout: float = None, **kwargs) -> requests.Response:
+    """
+    GET through the pooled session for the URL's host. Requests to known providers
+    are throttled by that provider's token bucket (see src.fetch.rate_limit).
+    """
+    provider = PROVIDER_HOSTS.get(urlsplit(url).netloc)
+    if provider is not None:
+        get_limiter(provider).throttle()
+    return get_session(url).get(url, timeout=timeout or default_timeout, **kwargs)
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
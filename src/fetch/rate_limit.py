@@ -0,0 +1,91 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from config.helper import get_settings
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens refill continuously at `rate` per second
+    up to `capacity`; acquire() blocks until enough tokens are available.
+    """
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = max(float(capacity), 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+class ProviderLimiter:
+    """
+    Concurrency and request-rate limits for a single data provider.
+
+    slot() bounds how many tickers are fetched from the provider at once,
+    throttle() is called before every HTTP request made to it.
+    """
+    def __init__(self, name: str, max_concurrency: int = 1, rate: float = 1.0, burst: float = 1.0):
+        self.name = name
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.bucket = TokenBucket(rate, burst)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+    @contextmanager
+    def slot(self):
+        with self._semaphore:
+            yield
+
+    def throttle(self):
+        self.bucket.acquire()
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """
+    Get the shared limiter for a provider ('tiingo' or 'polygon'), built from
+    the `providers` section of config/settings.yaml on first use.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            params = get_settings().get('providers', {}).get(provider, {})
+            limiter = ProviderLimiter(
+                provider,
+                max_concurrency=params.get('max_concurrency', 1),
+                rate=params.get('rate', 1.0),
+                burst=params.get('burst', 1.0)
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+def configure_provider(provider: str, max_concurrency: int = None, rate: float = None, burst: float = None) -> ProviderLimiter:
+    """
+    Override the limits for a provider at runtime. Unspecified values keep their current setting.
+    """
+    current = get_limiter(provider)
+    limiter = ProviderLimiter(
+        provider,
+        max_concurrency=max_concurrency if max_concurrency is not None else current.max_concurrency,
+        rate=rate if rate is not None else current.bucket.rate,
+        burst=burst if burst is not None else current.bucket.capacity
+    )
+    with _limiters_lock:
+        _limiters[provider] = limiter
+    return limiter
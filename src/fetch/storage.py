@@ -0,0 +1,198 @@
+import time
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import List, Optional
+
+from config.helper import get_data_dir, get_settings
+from src.fetch.manifest import ARTIFACTS, artifact_path, get_entry, write_artifact, write_parquet, extend, entries, annotate, base_version
+
+data_dir = get_data_dir()
+delta_dir = data_dir / 'deltas'
+
+# fold deltas into the base file once an artifact has this many of them
+max_deltas = get_settings().get('storage', {}).get('max_deltas', 20)
+
+def _align_tz(index: pd.DatetimeIndex, reference: pd.Timestamp) -> pd.DatetimeIndex:
+    # Polygon files are UTC-indexed, Tiingo files are naive; follow whatever is already stored
+    if reference.tz is not None and index.tz is None:
+        return index.tz_localize(reference.tz)
+    if reference.tz is None and index.tz is not None:
+        return index.tz_convert(None)
+    return index
+
+def append_artifact(df: pd.DataFrame, ticker: str, artifact: str, replace_last: bool = False) -> dict:
+    """
+    Append rows newer than the stored last date as a small delta partition, without
+    reading or rewriting the base file. With replace_last, a row at the stored last date is
+    kept too and supersedes the stored one (e.g. a still-open weekly bar).
+    Falls back to a full write when nothing is stored yet. Returns the manifest row.
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    entry = get_entry(ticker, artifact)
+    if entry is None or entry['last_date'] is None:
+        return write_artifact(df.sort_index(), ticker, artifact)
+
+    last_date = pd.Timestamp(entry['last_date'])
+    df = df.copy()
+    df.index = _align_tz(df.index, last_date)
+    df = df[(df.index >= last_date) if replace_last else (df.index > last_date)].sort_index()
+    if df.empty:
+        return entry
+    replaced = int((df.index == last_date).sum())
+    # keep the base schema so readers can concatenate partitions directly
+    df = df.reindex(columns=list(entry['schema']))
+
+    partition_dir = delta_dir / f"{ticker}{ARTIFACTS[artifact].replace('.parquet', '')}"
+    path = partition_dir / f"part-{time.time_ns()}.parquet"
+    write_parquet(df, path)
+    entry = extend(ticker, artifact, df, path, replaced=replaced)
+
+    if len(entry['deltas']) >= max_deltas:
+        compact(ticker, artifact)
+    return entry
+
+def read_artifact(ticker: str, artifact: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read an artifact with any delta partitions merged in, sorted by date.
+    """
+    entry = get_entry(ticker, artifact)
+    path = data_dir / entry['path'] if entry is not None else artifact_path(ticker, artifact)
+    base = pd.read_parquet(path, columns=columns)
+    deltas = entry.get('deltas', []) if entry is not None else []
+    if not deltas:
+        return base
+
+    return _merge([base] + [pd.read_parquet(data_dir / delta, columns=columns) for delta in deltas])
+
+def _naive(ts) -> pd.Timestamp:
+    # compare dates across naive (Tiingo) and UTC (Polygon) indexes on the same footing
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert(None) if ts.tz is not None else ts
+
+def _merge(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    merged = pd.concat(parts)
+    merged.index.name = parts[0].index.name
+    merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.sort_index()
+
+def _read_row_groups(pf: pq.ParquetFile, row_groups: List[int], columns: Optional[List[str]]) -> pd.DataFrame:
+    return pf.read_row_groups(row_groups, columns=columns, use_pandas_metadata=True).to_pandas()
+
+def _date_bounds(pf: pq.ParquetFile) -> list:
+    """(min, max) index date of every row group from the footer statistics, None where unknown."""
+    index_column = pf.schema_arrow.pandas_metadata['index_columns'][0]
+    column = pf.schema_arrow.get_field_index(index_column)
+    bounds = []
+    for i in range(pf.num_row_groups):
+        stats = pf.metadata.row_group(i).column(column).statistics
+        if stats is None or not stats.has_min_max:
+            bounds.append(None)
+        else:
+            bounds.append((_naive(stats.min), _naive(stats.max)))
+    return bounds
+
+def _delta_frames(entry: Optional[dict], columns: Optional[List[str]]) -> List[pd.DataFrame]:
+    deltas = entry.get('deltas', []) if entry is not None else []
+    return [pd.read_parquet(data_dir / delta, columns=columns) for delta in deltas]
+
+def read_range(ticker: str, artifact: str, start_date=None, end_date=None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read the rows of an artifact between two dates (inclusive, either may be None). Row groups
+    whose footer statistics fall outside the range are never read.
+    """
+    entry = get_entry(ticker, artifact)
+    path = data_dir / entry['path'] if entry is not None else artifact_path(ticker, artifact)
+    start = _naive(start_date) if start_date is not None else None
+    end = _naive(end_date) if end_date is not None else None
+
+    pf = pq.ParquetFile(path)
+    selected = [
+        i for i, bounds in enumerate(_date_bounds(pf))
+        if bounds is None or ((start is None or bounds[1] >= start) and (end is None or bounds[0] <= end))
+    ]
+    merged = _merge([_read_row_groups(pf, selected, columns)] + _delta_frames(entry, columns))
+
+    dates = merged.index.tz_convert(None) if merged.index.tz is not None else merged.index
+    mask = np.ones(len(merged), dtype=bool)
+    if start is not None:
+        mask &= dates >= start
+    if end is not None:
+        mask &= dates <= end
+    return merged[mask]
+
+def read_tail(ticker: str, artifact: str, rows: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read the last `rows` rows of an artifact. Delta partitions are newest, so only as many
+    trailing row groups of the base file are read as the deltas leave uncovered.
+    """
+    entry = get_entry(ticker, artifact)
+    path = data_dir / entry['path'] if entry is not None else artifact_path(ticker, artifact)
+    deltas = _delta_frames(entry, columns)
+    needed = rows - sum(len(delta) for delta in deltas)
+
+    pf = pq.ParquetFile(path)
+    selected = []
+    for i in reversed(range(pf.num_row_groups)):
+        if needed <= 0:
+            break
+        selected.insert(0, i)
+        needed -= pf.metadata.row_group(i).num_rows
+    merged = _merge([_read_row_groups(pf, selected, columns)] + deltas)
+    # deltas that replaced stored rows cover fewer dates than their length suggests
+    while len(merged) < rows and len(selected) < pf.num_row_groups:
+        selected.insert(0, selected[0] - 1 if selected else pf.num_row_groups - 1)
+        merged = _merge([_read_row_groups(pf, selected, columns)] + deltas)
+    return merged.tail(rows)
+
+def compact(ticker: Optional[str] = None, artifact: Optional[str] = None) -> int:
+    """
+    Fold delta partitions into their base files. With no arguments, compacts every artifact
+    that has deltas. Returns the number of artifacts compacted.
+    """
+    compacted = 0
+    for entry in entries().values():
+        if ticker is not None and entry['ticker'] != ticker:
+            continue
+        if artifact is not None and entry['artifact'] != artifact:
+            continue
+        if not entry.get('deltas'):
+            continue
+        merged = read_artifact(entry['ticker'], entry['artifact'])
+        write_artifact(merged, entry['ticker'], entry['artifact'], path=data_dir / entry['path'])
+        # same history in fewer files: readers keyed on the base version need not re-read it
+        if base_version(entry) is not None:
+            annotate(entry['ticker'], entry['artifact'], base_hash=base_version(entry))
+        compacted += 1
+    return compacted
+
+def append_bars(ticker: str, bars: pd.DataFrame, raw_artifact: str = 'daily_raw', close_column: str = 'close') -> int:
+    """
+    Append new OHLCV bars to a raw artifact and the matching daily returns to _daily.
+    The first new return is computed from the last stored close in the manifest, so
+    neither file is read. Returns the number of new bars.
+    """
+    raw_entry = get_entry(ticker, raw_artifact)
+    if raw_entry is None:
+        raise ValueError(f"No stored {raw_artifact} data for {ticker}")
+
+    last_date = pd.Timestamp(raw_entry['last_date'])
+    bars = bars.copy()
+    bars.index = _align_tz(bars.index, last_date)
+    bars = bars[bars.index > last_date].sort_index()
+    if bars.empty:
+        return 0
+
+    prev_close = raw_entry.get('last', {}).get(close_column)
+    if prev_close is None:
+        # manifest rows indexed before last values were tracked
+        prev_close = read_artifact(ticker, raw_artifact, columns=[close_column])[close_column].iloc[-1]
+    closes = bars[close_column].astype(float)
+    base = pd.concat([pd.Series([prev_close], index=[last_date]), closes])
+    data_returns = base.pct_change().iloc[1:].dropna().to_frame(name=ticker)
+    data_returns.index.name = bars.index.name
+
+    append_artifact(bars, ticker, raw_artifact)
+    append_artifact(data_returns, ticker, 'daily')
+    return len(bars)
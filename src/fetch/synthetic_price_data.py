@@ -1,96 +1,186 @@
 import pandas as pd
-import requests
 import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 
 from config.helper import get_data_dir
+from src.fetch.provider_client import http_get
+from src.fetch.rate_limit import get_limiter
+from src.fetch.manifest import write_artifact, record, get_entry, file_sha256
+from src.fetch.storage import append_bars
+from src.process.index_builder import build_index
 
 data_dir = get_data_dir()
+synthetic_dir = data_dir / 'synthetic'
 
-def fetchandpatch_synthetics(ticker, custom_list, start_date, customdate1, customdate2, end_date, api_endpoint, api_key, update = False):
+# bump when the way the synthetic series is built changes, so cached artifacts are rebuilt
+SYNTHETIC_VERSION = 2
 
+# the Select Sector indexes rebalance quarterly; weights drift in between
+SYNTHETIC_REBALANCE = 'quarterly'
+
+def synthetic_key(ticker, custom_list, start_date, customdate1, customdate2) -> str:
+    """
+    Cache key of a synthetic segment: a hash of the weight set, date range and builder version.
+    """
+    payload = json.dumps({
+        'version': SYNTHETIC_VERSION,
+        'ticker': ticker,
+        'weights': sorted((t, float(w)) for t, w in custom_list.items()),
+        'start_date': str(start_date),
+        'customdate1': str(customdate1),
+        'customdate2': str(customdate2)
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def _artifact_paths(ticker, cache_key):
+    base = synthetic_dir / f'{ticker}_synthetic_{cache_key}'
+    return base.with_suffix('.parquet'), base.with_suffix('.json')
+
+def load_synthetic(ticker, cache_key):
+    """
+    Load a cached synthetic return series. Returns None if it is missing or fails its checksum.
+    """
+    data_path, meta_path = _artifact_paths(ticker, cache_key)
+    if not (data_path.exists() and meta_path.exists()):
+        return None
+    with meta_path.open('r') as f:
+        meta = json.load(f)
+    if meta.get('sha256') != file_sha256(data_path):
+        print(f"Warning: checksum mismatch for cached {ticker} synthetic series, rebuilding...")
+        return None
+    cached = pd.read_parquet(data_path)
+    entry = get_entry(ticker, 'synthetic')
+    if entry is None or entry['hash'] != meta['sha256']:
+        # the manifest row follows the segment in use (e.g. after rebuild_manifest or a weight change back)
+        record(ticker, 'synthetic', cached, data_path)
+    return cached
+
+def save_synthetic(ticker, cache_key, synthetic_returns, meta):
+    synthetic_dir.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _artifact_paths(ticker, cache_key)
+    tmp_path = data_path.with_suffix('.parquet.tmp')
+    synthetic_returns.to_parquet(tmp_path)
+    os.replace(tmp_path, data_path)
+    meta = dict(meta, sha256=file_sha256(data_path), rows=len(synthetic_returns), created=datetime.now().isoformat(timespec='seconds'))
+    tmp_meta = meta_path.with_suffix('.json.tmp')
+    with tmp_meta.open('w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, meta_path)
+    record(ticker, 'synthetic', synthetic_returns, data_path)
+
+def _fetch_constituent(ticker, tempticker, start_date, customdate1, api_endpoint, api_key):
+    print(f"Fetching holding {tempticker}, part of {ticker}...")
+    # each constituent holds one of Tiingo's concurrency slots, like a ticker fetched on its own
+    with get_limiter('tiingo').slot():
+        raw = http_get(f"{api_endpoint}/daily/{tempticker}/prices?startDate={start_date}&endDate={customdate1}&format=json&resampleFreq=daily&token={api_key}")
+    raw.raise_for_status()
+    jraw = raw.json()
+
+    prices = pd.DataFrame(jraw)
+    prices['date'] = pd.to_datetime(prices['date'])
+    prices.set_index('date', inplace=True)
+    prices = prices[['adjClose']]
+    prices.rename(columns={'adjClose': tempticker}, inplace= True)
+    return prices
+
+def build_synthetic(ticker, custom_list, start_date, customdate1, api_endpoint, api_key):
+    """
+    Download every constituent in parallel and build the weighted synthetic return series.
+    Returns (synthetic_returns, complete) where complete is False if any constituent failed.
+    """
     all_data = []
-    if (start_date <= customdate1):
-        # download synthetic ETF
-        for tempticker in custom_list:
+    complete = True
+    max_workers = get_limiter('tiingo').max_concurrency
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {tempticker: pool.submit(_fetch_constituent, ticker, tempticker, start_date, customdate1, api_endpoint, api_key) for tempticker in custom_list}
+        for tempticker, future in futures.items():
             try:
-                print(f"Fetching holding {tempticker}, part of {ticker}...")
-                raw = requests.get(f"{api_endpoint}/daily/{tempticker}/prices?startDate={start_date}&endDate={customdate1}&format=json&resampleFreq=daily&token={api_key}")
-                raw.raise_for_status()
-                jraw = raw.json()
-
-                prices = pd.DataFrame(jraw)
-                prices['date'] = pd.to_datetime(prices['date'])
-                prices.set_index('date', inplace=True)
-                prices = prices[['adjClose']]
-                prices.rename(columns={'adjClose': tempticker}, inplace= True)
-                
-                all_data.append(prices)
+                all_data.append(future.result())
             except Exception as e:
+                complete = False
                 print(f"Error fetching {tempticker}: {e}")
-        
-        combined = pd.concat(all_data, axis=1)
-        combined.dropna(axis=0, how='any', inplace=True)
-        combined.to_parquet(os.path.join(data_dir, f'{ticker}_synthetic_prices_raw.parquet'))
-
-        # normalize weights
-        weights = pd.Series(custom_list)
-        # Keep only weights for tickers actually present in the data
-        valid_weights = weights[weights.index.isin(combined.columns)]
-        valid_weights /= valid_weights.sum()
-
-        # calc daily returns
-        returns = combined.pct_change().dropna()
-        returns = returns[valid_weights.index]
-
-        # create weighted synthetic returns
-        synthetic_returns = returns.dot(valid_weights)
-        synthetic_returns.name = f"{ticker}"
-        synthetic_returns.to_frame().to_parquet(os.path.join(data_dir, f'{ticker}_synthetic_returns.parquet'))
+
+    combined = pd.concat(all_data, axis=1).sort_index()
+
+    # weights drift between rebalances and are renormalized over the constituents trading at each one,
+    # so a date is only lost when none of them has a price
+    synthetic_returns = build_index(combined, custom_list, rebalance=SYNTHETIC_REBALANCE)['returns'].dropna()
+    # only stored once the index is built, so a failed build leaves no partial artifact
+    write_artifact(combined, ticker, 'synthetic_prices_raw')
+    synthetic_returns.name = f"{ticker}"
+    return synthetic_returns.to_frame(), complete
+
+def get_synthetic_returns(ticker, custom_list, start_date, customdate1, customdate2, api_endpoint, api_key, rebuild=False):
+    """
+    Get the frozen pre-inception synthetic segment, building and caching it on first use.
+    The cached artifact is keyed by the weights and cut-over dates, so it is only
+    rebuilt when those change (or when rebuild=True).
+    """
+    cache_key = synthetic_key(ticker, custom_list, start_date, customdate1, customdate2)
+    if not rebuild:
+        cached = load_synthetic(ticker, cache_key)
+        if cached is not None:
+            print(f"Using cached synthetic {ticker} series ({cache_key})")
+            return cached
+
+    synthetic_returns, complete = build_synthetic(ticker, custom_list, start_date, customdate1, api_endpoint, api_key)
+    if complete:
+        save_synthetic(ticker, cache_key, synthetic_returns, {
+            'ticker': ticker,
+            'version': SYNTHETIC_VERSION,
+            'weights': custom_list,
+            'rebalance': SYNTHETIC_REBALANCE,
+            'start_date': str(start_date),
+            'customdate1': str(customdate1),
+            'customdate2': str(customdate2)
+        })
+    else:
+        print(f"Warning: synthetic {ticker} series built from partial constituents, not caching")
+    return synthetic_returns
+
+def fetchandpatch_synthetics(ticker, custom_list, start_date, customdate1, customdate2, end_date, api_endpoint, api_key, update = False) -> Optional[int]:
+    """
+    Fetch the real post-inception bars of a synthetic ETF and save them stitched onto the
+    synthetic pre-inception segment (or appended to the stored real bars, with update). Returns
+    the number of real bars stored (0 when none were new), None when the provider returned none.
+    Request and parsing errors are raised to the caller.
+    """
+    if (start_date <= customdate1):
+        synthetic_returns = get_synthetic_returns(ticker, custom_list, start_date, customdate1, customdate2, api_endpoint, api_key)
 
     # Download real data
-    try:
-        print(f"Fetching real {ticker} data non-synthetic...")
-        if (start_date <= customdate1):
-            raw = requests.get(f"{api_endpoint}/daily/{ticker}/prices?startDate={customdate2}&endDate={end_date}&format=json&resampleFreq=daily&token={api_key}")
-        else:
-            raw = requests.get(f"{api_endpoint}/daily/{ticker}/prices?startDate={start_date}&endDate={end_date}&format=json&resampleFreq=daily&token={api_key}")
-        jraw = raw.json()
-
-        real = pd.DataFrame(jraw)
-        real['date'] = pd.to_datetime(real['date'])
-        real.set_index('date', inplace=True)
-        real_raw_path = os.path.join(data_dir, f'{ticker}_real_raw.parquet')
-        if update and os.path.exists(real_raw_path):
-            old_real_raw = pd.read_parquet(real_raw_path)
-            real = real[~real.index.isin(old_real_raw.index)]
-            if not real.empty:
-                real = pd.concat([old_real_raw, real]).sort_index()
-            else:
-                real = old_real_raw
-        real.to_parquet(real_raw_path)
-
-        real = real[['close']]
-        real.rename(columns={'close': ticker}, inplace=True)
-        real_returns = real.pct_change().dropna()
-        real_returns.name = f'{ticker}'
-        if (start_date <= customdate1):
-            full_returns = pd.concat([synthetic_returns, real_returns])
-        else:
-            full_returns = real_returns
-        daily_path = os.path.join(data_dir, f'{ticker}_daily.parquet')
-        if update and os.path.exists(daily_path):
-            old_daily = pd.read_parquet(daily_path)
-            # Ensure old_daily is a DataFrame
-            if isinstance(old_daily, pd.Series):
-                old_daily = old_daily.to_frame()
-            full_returns = full_returns[~full_returns.index.isin(old_daily.index)]
-            if not full_returns.empty:
-                full_returns = pd.concat([old_daily, full_returns]).sort_index()
-            else:
-                full_returns = old_daily
-        full_returns.to_parquet(daily_path)
-
-        print(f"Saved full stitched returns for {ticker}.")
-
-    except Exception as e:
-        print(f"Error fetching real {ticker}: {e}")
\ No newline at end of file
+    print(f"Fetching real {ticker} data non-synthetic...")
+    real_start = customdate2 if (start_date <= customdate1) else start_date
+    with get_limiter('tiingo').slot():
+        raw = http_get(f"{api_endpoint}/daily/{ticker}/prices?startDate={real_start}&endDate={end_date}&format=json&resampleFreq=daily&token={api_key}")
+    jraw = raw.json()
+    if not jraw:
+        print(f"Warning: No real {ticker} data returned")
+        return None
+
+    real = pd.DataFrame(jraw)
+    real['date'] = pd.to_datetime(real['date'])
+    real.set_index('date', inplace=True)
+    # Append logic: only the new bars are written, as delta partitions
+    if update:
+        rows = append_bars(ticker, real, raw_artifact='real_raw')
+        print(f"Appended {rows} new rows for {ticker}")
+        return rows
+
+    write_artifact(real, ticker, 'real_raw')
+
+    real = real[['close']]
+    real.rename(columns={'close': ticker}, inplace=True)
+    real_returns = real.pct_change().dropna()
+    if (start_date <= customdate1):
+        full_returns = pd.concat([synthetic_returns, real_returns])
+    else:
+        full_returns = real_returns
+    write_artifact(full_returns, ticker, 'daily')
+
+    print(f"Saved full stitched returns for {ticker}.")
+    return len(real)
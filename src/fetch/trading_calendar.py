@@ -0,0 +1,143 @@
+import pandas as pd
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from config.helper import get_settings
+
+EXCHANGE_TZ = ZoneInfo('America/New_York')
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# minutes after the close before providers reliably serve the day's bar
+data_delay = timedelta(minutes=get_settings().get('calendar', {}).get('data_delay_minutes', 60))
+
+# unscheduled NYSE closures (weather, national days of mourning, 9/11)
+SPECIAL_CLOSURES = {
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+    date(2004, 6, 11),
+    date(2007, 1, 2),
+    date(2012, 10, 29), date(2012, 10, 30),
+    date(2018, 12, 5),
+    date(2025, 1, 9),
+}
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th given weekday (Mon=0) of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(d: date) -> date:
+    # Saturday holidays move to Friday, Sunday holidays to Monday
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+@lru_cache(maxsize=None)
+def holidays(year: int) -> frozenset:
+    """
+    Full-day NYSE closures for a year, generated from the exchange's holiday rules.
+    """
+    days = set()
+    new_year = date(year, 1, 1)
+    # NYSE does not close on Friday Dec 31 when Jan 1 falls on a Saturday
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 1998:
+        days.add(_nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr. Day
+    days.add(_nth_weekday(year, 2, 0, 3))      # Washington's Birthday
+    days.add(_easter(year) - timedelta(days=2))  # Good Friday
+    days.add(_nth_weekday(year, 5, 0, -1))     # Memorial Day
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    days.add(_observed(date(year, 7, 4)))      # Independence Day
+    days.add(_nth_weekday(year, 9, 0, 1))      # Labor Day
+    days.add(_nth_weekday(year, 11, 3, 4))     # Thanksgiving
+    christmas = date(year, 12, 25)
+    days.add(_observed(christmas))
+    days.update(d for d in SPECIAL_CLOSURES if d.year == year)
+    return frozenset(days)
+
+@lru_cache(maxsize=None)
+def early_closes(year: int) -> frozenset:
+    """
+    13:00 ET early closes: July 3rd, the day after Thanksgiving and Christmas Eve, when they are sessions.
+    """
+    candidates = [
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24)
+    ]
+    return frozenset(d for d in candidates if is_session(d))
+
+def _to_date(d) -> date:
+    if isinstance(d, datetime):
+        return d.date()
+    if isinstance(d, date):
+        return d
+    return pd.Timestamp(d).date()
+
+def is_session(d) -> bool:
+    d = _to_date(d)
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+def session_close(d) -> datetime:
+    """Timezone-aware close time of a session."""
+    d = _to_date(d)
+    close = EARLY_CLOSE if d in early_closes(d.year) else REGULAR_CLOSE
+    return datetime.combine(d, close, tzinfo=EXCHANGE_TZ)
+
+def sessions(start, end) -> pd.DatetimeIndex:
+    """All sessions between start and end, inclusive."""
+    start, end = _to_date(start), _to_date(end)
+    if start > end:
+        return pd.DatetimeIndex([])
+    days = pd.bdate_range(start, end)
+    return days[[is_session(d) for d in days]]
+
+def previous_session(d) -> date:
+    d = _to_date(d) - timedelta(days=1)
+    while not is_session(d):
+        d -= timedelta(days=1)
+    return d
+
+def next_session(d) -> date:
+    d = _to_date(d) + timedelta(days=1)
+    while not is_session(d):
+        d += timedelta(days=1)
+    return d
+
+def last_completed_session(now: Optional[datetime] = None) -> date:
+    """
+    Most recent session whose bar should be available from the providers,
+    i.e. its close plus the configured data delay has passed.
+    """
+    now = datetime.now(EXCHANGE_TZ) if now is None else now.astimezone(EXCHANGE_TZ)
+    today = now.date()
+    if is_session(today) and now >= session_close(today) + data_delay:
+        return today
+    return previous_session(today)
+
+def missing_sessions(last_date, now: Optional[datetime] = None) -> pd.DatetimeIndex:
+    """Sessions after last_date up to the last completed session."""
+    return sessions(_to_date(last_date) + timedelta(days=1), last_completed_session(now))
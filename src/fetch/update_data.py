@@ -1,47 +1,53 @@
-import os
-import pandas as pd
-from datetime import datetime, timedelta
-from config.helper import get_data_file
-from src.fetch.price_data import fetch
+from src.fetch.price_data import fetch, raw_artifact
+from src.fetch.trading_calendar import missing_sessions
+from src.fetch.freshness import is_fresh, mark_fresh
+from src.fetch.manifest import get_entry, last_date as stored_last_date
 
-def update_data(ticker):
+def plan_update(ticker: str) -> dict:
     """
-    Ensures ticker_daily.parquet is up-to-date. If missing, fetches all data. If outdated, fetches only missing days and appends.
+    Work out what ticker_daily.parquet is missing, using the exchange calendar and the
+    data manifest (the parquet file itself is not opened).
+    Returns a plan dict:
+        {'action': 'full'}                                  no usable stored data (returns or raw bars)
+        {'action': 'none', 'last_date': ...}                every completed session is stored
+        {'action': 'update', 'start_date', 'end_date', 'sessions', 'last_date'}
     """
-    parquet_path = get_data_file(f"{ticker}_daily.parquet")
-    today = datetime.now().date()
+    last_date = stored_last_date(ticker, 'daily')
+    # new sessions are appended to the raw bars, so an update needs them as well
+    if last_date is None or get_entry(ticker, raw_artifact(ticker)) is None:
+        return {'action': 'full'}
 
-    if not os.path.exists(parquet_path):
-        # File doesn't exist, fetch all data
-        fetch(ticker)
-        return
+    missing = missing_sessions(last_date)
+    if len(missing) == 0:
+        return {'action': 'none', 'last_date': last_date}
+
+    return {
+        'action': 'update',
+        'start_date': missing[0].strftime('%Y-%m-%d'),
+        'end_date': missing[-1].strftime('%Y-%m-%d'),
+        'sessions': len(missing),
+        'last_date': last_date
+    }
 
-    # File exists, check most recent date
-    df = pd.read_parquet(parquet_path)
-    if df.empty:
-        fetch(ticker)
+def update_data(ticker):
+    """
+    Ensures ticker_daily.parquet is up-to-date. If missing, fetches all data. If outdated, fetches
+    only the span of missing exchange sessions and appends. Makes no request when nothing is missing.
+    After a successful check the answer is kept in the freshness registry, so repeated calls for the
+    same ticker are answered from memory until the TTL runs out or a new session completes.
+    A failed or empty fetch is not remembered, so the next call retries.
+    """
+    if is_fresh(ticker):
         return
-    
-    # Check if we have a datetime index or a date column
-    if isinstance(df.index, pd.DatetimeIndex):
-        last_date = df.index.max().date()
-    elif 'date' in df.columns:
-        last_date = df['date'].max().date()
+
+    plan = plan_update(ticker)
+
+    if plan['action'] == 'full':
+        report = fetch(ticker)[ticker]
+    elif plan['action'] == 'update':
+        report = fetch(ticker, start_date=plan['start_date'], end_date=plan['end_date'], update=True)[ticker]
     else:
-        print(f"Warning: No date information found in {parquet_path}")
-        fetch(ticker)
-        return
-    
-    if (today - last_date).days <= 3:
-        return        # Data is up to date (allowing for weekends)
-    
-    if today.weekday() < 5:
-        start_date = last_date + timedelta(days=1)
-        end_date = today
-        fetch(ticker, start_date=start_date.strftime('%Y-%m-%d'), end_date=end_date.strftime('%Y-%m-%d'), update=True)
-        
-    # Find first missing date (day after last_date)
-    start_date = last_date + timedelta(days=1)
-    end_date = today
-    # Call fetch with update=True and date range
-    fetch(ticker, start_date=start_date.strftime('%Y-%m-%d'), end_date=end_date.strftime('%Y-%m-%d'), update=True)
\ No newline at end of file
+        report = None
+
+    if report is None or report['status'] == 'ok':
+        mark_fresh(ticker)
@@ -7,12 +7,13 @@ from scipy.interpolate import make_interp_spline
 from scipy.signal import savgol_filter
 from typing import Optional, List
 
-from src.process.relative_strength import get_relative_strength
-from src.process.rs_momentum import get_relative_strength_momentum
-from src.process.lead_lag import sector_lead_lag_matrix, granger_lead_lag_matrix
+from src.process.relative_strength import get_relative_strength, get_relative_strength_panel
+from src.process.rrg import compute_rrg
+from src.process.rs_momentum import get_relative_strength_momentum_panel
+from src.process.lead_lag import sector_lead_lag_matrix, granger_lead_lag_matrix, rolling_sector_lead_lag
 from src.process.volatility import get_volatility_data
+from src.process.correlation import correlation_matrix
 from config.helper import get_sector_config, get_resource
-from src.fetch.update_data import update_data
 config = get_sector_config()
 
 
@@ -74,16 +75,16 @@ def plot_sector_relative_strength(tickers: Optional[List[str]] = config['sector_
     
     all_rs = {}
 
+    # one aligned RS matrix for all sectors instead of reloading the benchmark per ticker
+    rs_panel = get_relative_strength_panel(tickers, benchmark, lookback_days, normalize, timeframe=timeframe)
     for ticker in tickers:
         if ticker == benchmark:
-            update_data(ticker)
             continue
-        try:
-            rs = get_relative_strength(ticker, benchmark, lookback_days, normalize, timeframe=timeframe)
-            all_rs[ticker] = rs
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
+        rs = rs_panel[ticker].dropna()
+        if rs.empty:
+            print(f"Error processing {ticker}: no data")
             continue
+        all_rs[ticker] = rs
 
     # Build figure
     fig = go.Figure()
@@ -171,26 +172,18 @@ def plot_sector_relative_strength_momentum(tickers: Optional[List[str]] = config
     if timeframe not in ['daily','weekly', 'monthly']:
         raise ValueError("freq must be 'daily', 'weekly', or 'monthly'")
     
-    momentum_scores = {}
-
-    for ticker in tickers:
-        if ticker == benchmark:
-            update_data(ticker)
-            continue
-        try:
-            score = get_relative_strength_momentum(
-                target=ticker,
-                benchmark=benchmark,
-                lookback_days=lookback_days,
-                momentum_window=momentum_window,
-                normalize=normalize,
-                timeframe=timeframe
-            )
-            momentum_scores[ticker] = score
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
-
-    df = pd.DataFrame.from_dict(momentum_scores, orient='index', columns=['Momentum'])
+    momentum_scores = get_relative_strength_momentum_panel(
+        tickers,
+        benchmark,
+        lookback_days=lookback_days,
+        momentum_window=momentum_window,
+        normalize=normalize,
+        timeframe=timeframe
+    ).drop(benchmark)
+    for ticker in momentum_scores.index[momentum_scores.isna()]:
+        print(f"Error processing {ticker}: Insufficient RS data for {ticker} vs {benchmark}")
+
+    df = momentum_scores.dropna().to_frame(name='Momentum')
     df.sort_values(by='Momentum', ascending=True, inplace=True)  # Sort for bar order
 
     fig = go.Figure(go.Bar(
@@ -221,68 +214,41 @@ def plot_rrg(
     lookback_days: int = 30,
     momentum_window: int = 5,
     normalize: bool = True,
-    timeframe: str = 'daily'
+    timeframe: str = 'daily',
+    rrg: Optional[dict] = None
 ):
+    """
+    Render a Relative Rotation Graph. Pass the result of compute_rrg to reuse one computation
+    across several timeframes; otherwise it is computed for this timeframe only.
+    """
     if timeframe not in ['daily', 'weekly', 'monthly']:
         raise ValueError("timeframe must be 'daily', 'weekly', or 'monthly'")
 
-    # Update benchmark data once
-    update_data(benchmark)
+    if rrg is None or timeframe not in rrg:
+        rrg = compute_rrg(tickers, benchmark, lookback_days=lookback_days, momentum_window=momentum_window, normalize=normalize, timeframes=[timeframe])
+    tails = rrg[timeframe]['tail']
 
     colors = px.colors.qualitative.Light24
     traces = []
     all_x, all_y = [], []
 
-    total_lookback = lookback_days + momentum_window
-
     for i, ticker in enumerate(tickers):
         if ticker == benchmark:
             continue
 
         try:
-            # Fetch target data
-            update_data(ticker)
-
-            # 1) RS series
-            rs = get_relative_strength(
-                target=ticker,
-                benchmark=benchmark,
-                lookback_days=total_lookback,
-                normalize=normalize,
-                timeframe=timeframe
-            )
-
-            # 2) Raw momentum list
-            raw_mom = get_relative_strength_momentum(
-                target=ticker,
-                benchmark=benchmark,
-                lookback_days=total_lookback,
-                momentum_window=momentum_window,
-                normalize=normalize,
-                method='slope',
-                return_series=True,
-                timeframe=timeframe
-            )
-
-            # 3) Align momentum as Series indexed to rs (momentum starts at index shift)
-            # momentum length should be len(rs) - momentum_window + 1
-            start_idx = momentum_window - 1
-            mom = pd.Series(raw_mom, index=rs.index[start_idx:])
-
-            # Ensure counts match
-            if len(rs) < momentum_window + 1 or len(mom) != len(rs) - momentum_window + 1:
+            points = tails[tails['ticker'] == ticker]
+            if points.empty:
                 continue
-
-            # 4) Extract tails (last momentum_window points)
-            tail_rs  = rs.iloc[-momentum_window:].to_numpy()
-            tail_mom = mom.iloc[-momentum_window:].to_numpy()
+            tail_rs = points['rs_ratio'].to_numpy()
+            tail_mom = points['rs_momentum'].to_numpy()
 
             # Collect all for axis scaling
             all_x.extend(tail_rs)
             all_y.extend(tail_mom)
             color = colors[i % len(colors)]
 
-            # 5a) Line+markers trace (no text)
+            # Line+markers trace (no text)
             traces.append(go.Scatter(
                 x=tail_rs,
                 y=tail_mom,
@@ -294,7 +260,7 @@ def plot_rrg(
                 showlegend=False
             ))
 
-            # 5b) Final point with label
+            # Final point with label
             traces.append(go.Scatter(
                 x=[tail_rs[-1]],
                 y=[tail_mom[-1]],
@@ -424,9 +390,9 @@ def plot_granger_lead_lag_matrix(
         if not title:
             title = f"Granger Causality Min p-value Matrix (Timeframe: {timeframe}, Max Lag: {max_lag})"
     elif plot == 'lag':
-        data = granger_matrix.applymap(lambda x: x[1] if isinstance(x, tuple) else np.nan).astype(float)
+        data = granger_matrix.map(lambda x: x[1] if isinstance(x, tuple) else np.nan).astype(float)
         if mask_nonsignificant:
-            pvals = granger_matrix.applymap(lambda x: x[0] if isinstance(x, tuple) else np.nan).astype(float)
+            pvals = granger_matrix.map(lambda x: x[0] if isinstance(x, tuple) else np.nan).astype(float)
             data = data.where(pvals <= alpha)
         if zmin is None:
             zmin = 1
@@ -454,6 +420,103 @@ def plot_granger_lead_lag_matrix(
     return fig.to_html(include_plotlyjs='cdn')
 
 
+def plot_rolling_lead_lag_matrix(
+    sectors: Optional[List[str]] = None,
+    timeframe: str = 'daily',
+    window: int = 126,
+    max_lag: int = 5,
+    plot: str = 'lag',  # 'lag' or 'corr'
+    max_frames: int = 60,
+    show: bool = True,
+    save_path: Optional[str] = None,
+    color_scale: str = 'RdBu',
+    **kwargs
+):
+    """
+    Plot the rolling lead-lag matrix as a heatmap with a date slider, one frame per window end date.
+    At most max_frames evenly spaced dates (always including the latest) are drawn.
+    """
+    if sectors is None:
+        sectors = list(config['sector_etfs'])
+    if plot not in ('lag', 'corr'):
+        raise ValueError("plot must be 'lag' or 'corr'")
+    rolling = rolling_sector_lead_lag(sectors=sectors, timeframe=timeframe, window=window, max_lag=max_lag, **kwargs)
+    if len(rolling['dates']) == 0:
+        raise ValueError(f"Not enough data for a {window}-period window")
+
+    frames = np.unique(np.linspace(0, len(rolling['dates']) - 1, min(max_frames, len(rolling['dates']))).round().astype(int))
+    data = rolling[plot][frames].astype(float)
+    if plot == 'lag':
+        data[np.isnan(rolling['corr'][frames])] = np.nan
+        zmin, zmax, colorbar_label = -max_lag, max_lag, "Lag (periods)"
+    else:
+        zmin, zmax, colorbar_label = -1, 1, "Correlation"
+
+    fig = px.imshow(
+        data,
+        x=rolling['tickers'],
+        y=rolling['tickers'],
+        animation_frame=0,
+        color_continuous_scale=color_scale,
+        zmin=zmin,
+        zmax=zmax,
+        labels=dict(x="Laggard", y="Leader", color=colorbar_label, animation_frame="Date")
+    )
+    # label the slider steps with window end dates instead of frame numbers
+    dates = rolling['dates'][frames].strftime('%Y-%m-%d')
+    for step, date in zip(fig.layout.sliders[0].steps, dates):
+        step.label = date
+    fig.layout.sliders[0].currentvalue.prefix = "Window end: "
+    fig.layout.sliders[0].active = len(frames) - 1
+    fig.update_traces(z=data[-1])
+    title = f"Rolling Lead-Lag {'Best Lag' if plot == 'lag' else 'Correlation'} Matrix (Timeframe: {timeframe}, Window: {window}, Max Lag: {max_lag})"
+    fig.update_layout(title=title, width=900, height=850)
+    if save_path:
+        fig.write_image(save_path)
+    if show:
+        fig.show()
+    return fig.to_html(include_plotlyjs='cdn')
+
+
+def plot_correlation_heatmap(
+    tickers: Optional[List[str]] = None,
+    method: str = 'pearson',
+    window: Optional[int] = None,
+    timeframe: str = 'daily',
+    cluster: bool = True,
+    show: bool = True,
+    save_path: Optional[str] = None,
+    color_scale: str = 'RdBu',
+    **kwargs
+):
+    """
+    Plot a heatmap of the return correlation matrix ('pearson', 'ewma' or 'ledoit_wolf'),
+    ordered by hierarchical clustering unless cluster is False.
+    """
+    if tickers is None:
+        tickers = list(config['sector_etfs'])
+    corr = correlation_matrix(tickers, method=method, window=window, timeframe=timeframe, cluster=cluster, **kwargs)
+    span = f"last {window} bars" if window else "full history"
+    title = f"Return Correlation Matrix ({method}, Timeframe: {timeframe}, {span})"
+    if 'shrinkage' in corr.attrs:
+        title += f", shrinkage {corr.attrs['shrinkage']:.2f}"
+    fig = px.imshow(
+        corr,
+        x=corr.columns,
+        y=corr.index,
+        color_continuous_scale=color_scale,
+        zmin=-1,
+        zmax=1,
+        labels=dict(x="Ticker", y="Ticker", color="Correlation")
+    )
+    fig.update_layout(title=title, width=900, height=800)
+    if save_path:
+        fig.write_image(save_path)
+    if show:
+        fig.show()
+    return fig.to_html(include_plotlyjs='cdn')
+
+
 def plot_volatility_heatmap(
     tickers: Optional[List[str]] = None,
     timeframe: str = 'daily',
@@ -464,6 +527,8 @@ def plot_volatility_heatmap(
     zmin: Optional[float] = None,
     zmax: Optional[float] = None,
     normalize: bool = False,
+    volatility: Optional[dict] = None,
+    estimator: str = 'close',
     **kwargs
 ):
     """
@@ -477,15 +542,17 @@ def plot_volatility_heatmap(
         color_scale: Color scale for the heatmap
         zmin, zmax: Min/max values for color scale
         raw_volatility: If True, plot raw annualized volatility; if False, plot z-scores (default: False)
+        volatility: Precomputed compute_volatility output to reuse
+        estimator: Volatility estimator ('close', 'parkinson', 'garman_klass', 'rogers_satchell', 'yang_zhang', 'ewma')
         **kwargs: Additional arguments passed to get_volatility_data
     """
     if tickers is None:
         tickers = list(config['sector_etfs'])
-    vol_df = get_volatility_data(tickers=tickers, timeframe=timeframe, window=lookback_days, raw_volatility=normalize, **kwargs)
+    vol_df = get_volatility_data(tickers=tickers, timeframe=timeframe, window=lookback_days, raw_volatility=normalize, volatility=volatility, estimator=estimator, **kwargs)
     
     col_name = f"{timeframe.capitalize()}Vol" if normalize else f"{timeframe.capitalize()}ZVol"
     value_type = "Annualized Volatility" if normalize else "Z-Score"
-    title = f"{timeframe} {'Volatility' if normalize else 'Z-Score'} (lookback: {lookback_days})"
+    title = f"{timeframe} {'Volatility' if normalize else 'Z-Score'} (lookback: {lookback_days}" + (f", {estimator}" if estimator != 'close' else "") + ")"
 
     tf_data = vol_df[col_name].dropna()
 
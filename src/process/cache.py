@@ -0,0 +1,74 @@
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+def nbytes(value) -> int:
+    """Approximate in-memory size of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    return int(getattr(value, 'nbytes', 64))
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total byte size of its values.
+    Keys are tuples whose first element is the ticker, so a ticker's entries can be dropped together.
+    Values are copied on the way in and out, so callers may modify what they get back.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0].copy()
+
+    def put(self, key: Hashable, value):
+        size = nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            self._items[key] = (value.copy(), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """Drop every entry of a ticker, or everything when ticker is None."""
+        with self._lock:
+            if ticker is None:
+                self._items.clear()
+                self._bytes = 0
+                return
+            for key in [k for k in self._items if k[0] == ticker]:
+                self._bytes -= self._items.pop(key)[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+from typing import Iterator, List, Optional, Tuple
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+from sklearn.covariance import LedoitWolf
+from config.helper import get_sector_config
+from src.process.returns import get_returns_panel
+from src.process.lead_lag import centered_returns, lagged_correlations, sliding_products
+from src.process.volatility import ewma_lambda
+
+config = get_sector_config()
+
+METHODS = ['pearson', 'ewma', 'ledoit_wolf']
+
+def _pairwise_corr(sums: np.ndarray, n_cols: int, min_periods: int, complete: bool = False) -> np.ndarray:
+    # sums is the (3N x 2N) product [w | x | xx].T @ [w | x]; pick out the blocks
+    if complete:
+        # every column is present on every row of the window: counts and sums are per column
+        n = sums[0, 0]
+        sx = sums[n_cols:2 * n_cols, 0]
+        var_x = n * sums[2 * n_cols:, 0] - sx ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = n * sums[n_cols:2 * n_cols, n_cols:] - np.outer(sx, sx)
+            std = np.sqrt(np.where(var_x > 1e-12 * n * sums[2 * n_cols:, 0], var_x, np.nan))
+            corr /= std[:, None]
+            corr /= std[None, :]
+        if n < min_periods:
+            corr[:] = np.nan
+        return np.clip(corr, -1.0, 1.0, out=corr)
+
+    n = sums[:n_cols, :n_cols]
+    sx = sums[n_cols:2 * n_cols, :n_cols]
+    sxy = sums[n_cols:2 * n_cols, n_cols:]
+    sxx = sums[2 * n_cols:, :n_cols]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = n * sxx
+        var_x = scale - sx ** 2
+        cov = n * sxy
+        cov -= sx * sx.T
+        var = var_x * var_x.T
+        corr = cov / np.sqrt(var)
+        # sums are updated by adding and subtracting rows, so treat tiny variances as zero
+        scale *= scale.T
+        corr[(n < min_periods) | ~(var > 1e-12 * scale)] = np.nan
+    return np.clip(corr, -1.0, 1.0, out=corr)
+
+def iter_rolling_correlation(returns: pd.DataFrame, window: int = 63, step: int = 1, min_periods: Optional[int] = None) -> Iterator[Tuple[pd.Timestamp, np.ndarray]]:
+    """
+    Pairwise Pearson correlation matrix of every trailing window, yielded one window end at a
+    time so that no more than one N x N matrix (plus the running sums) is held in memory.
+
+    The per-pair sums (counts, sums, cross products, squares over the dates both columns are
+    present) are carried from one window to the next by lead_lag.sliding_products: the rows
+    entering since the last yielded window are added and those leaving are subtracted,
+    together in one matrix product.
+
+    Args:
+        returns: Date x ticker returns
+        window: Rows per window
+        step: Yield every step-th window end (the last row is always yielded)
+        min_periods: Overlapping observations a pair needs (default: half the window)
+    Yields:
+        (window end date, N x N correlation array in column order)
+    """
+    if window < 3:
+        raise ValueError("window must be at least 3")
+    min_periods = max(3, window // 2 if min_periods is None else min_periods)
+    x, w, xx = centered_returns(returns)
+    n_rows, n_cols = x.shape
+
+    ends = list(range(window - 1, n_rows, step))
+    if ends and ends[-1] != n_rows - 1:
+        ends.append(n_rows - 1)
+
+    # rows with any missing value; windows without one take the cheaper per-column path
+    gaps = np.concatenate([[0], np.cumsum(w.min(axis=1) < 1)])
+
+    for end, sums in zip(ends, sliding_products(np.hstack([w, x, xx]), np.hstack([w, x]), ends, window)):
+        complete = gaps[end + 1] == gaps[end - window + 1]
+        yield returns.index[end], _pairwise_corr(sums, n_cols, min_periods, complete)
+
+def rolling_correlation(
+    returns: pd.DataFrame,
+    window: int = 63,
+    step: int = 1,
+    pairs: Optional[List[Tuple[str, str]]] = None,
+    min_periods: Optional[int] = None
+):
+    """
+    Rolling correlation over the whole history (see iter_rolling_correlation).
+
+    With pairs, returns a date x pair DataFrame (columns 'A/B') holding only those entries.
+    Otherwise returns {'dates', 'tickers', 'corr': (dates, N, N) float32}; use step to bound
+    its size for large universes, or iterate iter_rolling_correlation directly.
+    """
+    tickers = list(returns.columns)
+    if pairs is not None:
+        rows = np.array([tickers.index(a) for a, _ in pairs], dtype=int)
+        cols = np.array([tickers.index(b) for _, b in pairs], dtype=int)
+        dates, values = [], []
+        for date, corr in iter_rolling_correlation(returns, window, step, min_periods):
+            dates.append(date)
+            values.append(corr[rows, cols])
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name=returns.index.name), columns=[f"{a}/{b}" for a, b in pairs])
+
+    dates, matrices = [], []
+    for date, corr in iter_rolling_correlation(returns, window, step, min_periods):
+        dates.append(date)
+        matrices.append(corr.astype(np.float32))
+    corr = np.stack(matrices) if matrices else np.empty((0, len(tickers), len(tickers)), dtype=np.float32)
+    return {'dates': pd.DatetimeIndex(dates), 'tickers': tickers, 'corr': corr}
+
+def average_correlation(returns: pd.DataFrame, window: int = 63, step: int = 1) -> pd.Series:
+    """Mean off-diagonal rolling correlation per window end, a one-number co-movement gauge."""
+    n = returns.shape[1]
+    off_diagonal = ~np.eye(n, dtype=bool)
+    dates, values = [], []
+    for date, corr in iter_rolling_correlation(returns, window, step):
+        dates.append(date)
+        values.append(np.nanmean(corr[off_diagonal]) if np.isfinite(corr[off_diagonal]).any() else np.nan)
+    return pd.Series(values, index=pd.DatetimeIndex(dates), name='AverageCorrelation')
+
+def pearson_correlation(returns: pd.DataFrame) -> pd.DataFrame:
+    """Pairwise Pearson correlation over the dates each pair overlaps, as masked matrix products."""
+    _, corr = lagged_correlations(returns, max_lag=0)
+    return pd.DataFrame(corr[0], index=returns.columns, columns=returns.columns)
+
+def ewma_correlation(returns: pd.DataFrame, lam: Optional[float] = None) -> pd.DataFrame:
+    """
+    Exponentially weighted (RiskMetrics, zero-mean) correlation as of the last row. Row t gets
+    weight lam^(T-1-t), so the whole recursion is one weighted matrix product; each pair only
+    uses the rows where both columns are present.
+    """
+    lam = ewma_lambda if lam is None else lam
+    values = returns.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    filled = np.where(mask, values, 0.0)
+    # decay weights of the older rows underflow to 0 harmlessly
+    decay = lam ** np.arange(len(values) - 1, -1, -1, dtype=float)
+    scaled = filled * np.sqrt(decay)[:, None]
+    cross = scaled.T @ scaled
+    # each column's weighted sum of squares over the rows the other column is present
+    own = (scaled ** 2).T @ mask.astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cross / np.sqrt(own * own.T)
+    corr[~(own * own.T > 0)] = np.nan
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=returns.columns, columns=returns.columns)
+
+def ledoit_wolf_correlation(returns: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ledoit-Wolf shrunk correlation over the rows where every column is present. Columns with
+    too little data to share those rows are left out. The shrinkage intensity is in attrs['shrinkage'].
+    """
+    complete = returns.dropna(axis=1, thresh=max(3, len(returns) // 2)).dropna()
+    dropped = [t for t in returns.columns if t not in complete.columns]
+    if dropped:
+        print(f"Ledoit-Wolf: not enough overlapping data for {', '.join(dropped)}")
+    if len(complete) < 3 or complete.shape[1] < 2:
+        raise ValueError("Not enough complete rows for a Ledoit-Wolf estimate")
+
+    model = LedoitWolf().fit(complete.to_numpy())
+    std = np.sqrt(np.diag(model.covariance_))
+    corr = model.covariance_ / np.outer(std, std)
+    df = pd.DataFrame(corr, index=complete.columns, columns=complete.columns)
+    df.attrs['shrinkage'] = float(model.shrinkage_)
+    return df
+
+def cluster_order(corr: pd.DataFrame, method: str = 'average') -> List[str]:
+    """
+    Tickers in hierarchical-clustering leaf order (distance sqrt((1 - rho) / 2)), so that
+    correlated groups sit next to each other in a heatmap.
+    """
+    if len(corr) < 3:
+        return list(corr.index)
+    rho = np.nan_to_num(corr.to_numpy(dtype=float), nan=0.0)
+    distance = np.sqrt(np.clip((1 - rho) / 2, 0.0, 1.0))
+    np.fill_diagonal(distance, 0.0)
+    tree = linkage(squareform(distance, checks=False), method=method, optimal_ordering=True)
+    return [corr.index[i] for i in leaves_list(tree)]
+
+def load_returns(tickers: List[str], timeframe: str = 'daily', start_date: Optional[str] = None) -> pd.DataFrame:
+    """Date x ticker returns of a timeframe from one panel read."""
+    return get_returns_panel(list(dict.fromkeys(tickers)), timeframe, start_date)
+
+def correlation_matrix(
+    tickers: Optional[List[str]] = None,
+    method: str = 'pearson',
+    window: Optional[int] = None,
+    timeframe: str = 'daily',
+    cluster: bool = False,
+    lam: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Correlation matrix of ticker returns.
+
+    Args:
+        tickers: Tickers (default: sector ETFs)
+        method: 'pearson', 'ewma' or 'ledoit_wolf'
+        window: Use only the last window bars (default: full history)
+        timeframe: 'daily', 'weekly' or 'monthly'
+        cluster: Reorder rows and columns by hierarchical clustering
+        lam: EWMA decay (default: volatility.ewma_lambda in settings.yaml)
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    tickers = list(config['sector_etfs']) if tickers is None else tickers
+    returns = load_returns(tickers, timeframe)
+    if window is not None:
+        returns = returns.tail(window)
+
+    if method == 'pearson':
+        corr = pearson_correlation(returns)
+    elif method == 'ewma':
+        corr = ewma_correlation(returns, lam)
+    else:
+        corr = ledoit_wolf_correlation(returns)
+
+    if cluster:
+        order = cluster_order(corr)
+        corr = corr.loc[order, order]
+    return corr
+
+def rolling_sector_correlation(
+    tickers: Optional[List[str]] = None,
+    window: int = 63,
+    timeframe: str = 'daily',
+    step: int = 1,
+    pairs: Optional[List[Tuple[str, str]]] = None
+):
+    """rolling_correlation of ticker returns loaded with one panel read (default: sector ETFs)."""
+    tickers = list(config['sector_etfs']) if tickers is None else tickers
+    return rolling_correlation(load_returns(tickers, timeframe), window=window, step=step, pairs=pairs)
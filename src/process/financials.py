@@ -1,10 +1,10 @@
-import requests
 import pandas as pd
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 
 from src.fetch.financialdata import fetchfinancials
 from config.helper import key, get_financial_file
+from src.fetch.provider_client import http_get
 
 poly_api_key = key('polygon')
 marketcapendpoint = 'https://api.polygon.io/v3/reference/tickers/'
@@ -20,7 +20,7 @@ def finRatios(ticker) -> pd.DataFrame:
     finpath = get_financial_file(f"{ticker}_financials_raw.parquet")
     rawfindata = pd.read_parquet(finpath)
     
-    raw = requests.get(tickermcapend)
+    raw = http_get(tickermcapend)
     jraw = raw.json()
     
     if jraw.get('status') not in ['OK', 'DELAYED']:
@@ -28,7 +28,7 @@ def finRatios(ticker) -> pd.DataFrame:
     
     marketcap = jraw['results']['market_cap']
     
-    raw = requests.get(tickercloseend)
+    raw = http_get(tickercloseend)
     jraw = raw.json()
     
     if jraw.get('status') not in ['OK', 'DELAYED']:
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Union
+from config.helper import get_sector_tickers
+from src.fetch.panel import load_panel
+
+Weights = Union[Dict[str, float], Dict[str, Dict[str, float]], pd.Series, pd.DataFrame]
+
+def _naive(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    # Tiingo dates are naive, Polygon and some Tiingo feeds UTC; compare on wall-clock dates
+    return index.tz_localize(None) if index.tz is not None else index
+
+def weight_schedule(weights: Weights) -> pd.DataFrame:
+    """
+    Normalize the accepted weight inputs to a date x ticker DataFrame of target weights, one
+    row per date from which a set of weights applies:
+        {ticker: weight} or a Series        one static set, from the start
+        {date: {ticker: weight}}            dated sets
+        DataFrame                           rows are dates, columns tickers
+    Missing entries are 0. Dates before the first price are fine (the set applies from the start).
+    Dates are returned tz-naive, so a schedule can be applied to naive or UTC price indexes alike.
+    """
+    if isinstance(weights, pd.DataFrame):
+        schedule = weights.copy()
+    elif isinstance(weights, pd.Series):
+        schedule = weights.to_frame().T
+        schedule.index = pd.DatetimeIndex([pd.Timestamp.min])
+    elif weights and all(isinstance(v, dict) for v in weights.values()):
+        schedule = pd.DataFrame.from_dict(weights, orient='index')
+    else:
+        schedule = pd.DataFrame([weights], index=pd.DatetimeIndex([pd.Timestamp.min]))
+
+    schedule.index = _naive(pd.DatetimeIndex(schedule.index))
+    schedule = schedule.sort_index().fillna(0.0).astype(float)
+    if (schedule < 0).any().any():
+        raise ValueError("Weights must be non-negative")
+    return schedule
+
+def rebalance_rows(index: pd.DatetimeIndex, rebalance: Optional[str] = 'quarterly') -> np.ndarray:
+    """
+    Positions in a date index at whose close the index is rebalanced: every row for 'daily',
+    the last session of each period for 'weekly', 'monthly', 'quarterly', 'Nsession' or a pandas
+    offset alias, and only the first row for None (buy and hold between schedule dates).
+    """
+    if rebalance is None:
+        return np.array([0])
+    if rebalance == 'daily':
+        return np.arange(len(index))
+    # imported here: transform_timeframe imports the fetch layer, which builds synthetics with this module
+    from src.process.transform_timeframe import bucket_labels
+    labels = bucket_labels(index, rebalance).to_numpy()
+    last_of_period = np.r_[labels[1:] != labels[:-1], True]
+    return np.r_[0, np.nonzero(last_of_period)[0]]
+
+def build_index(
+    prices: pd.DataFrame,
+    weights: Weights,
+    rebalance: Optional[str] = 'quarterly',
+    base: float = 100.0
+) -> Dict[str, pd.DataFrame]:
+    """
+    Weighted index of a price panel with point-in-time weights, drift between rebalances and
+    renormalization over the constituents available at each rebalance.
+
+    At each rebalance close the target weights in force (the latest schedule row on or before
+    that date) are renormalized over constituents that are listed on that date (between their
+    first and last price) and turned into units, weight / price. Until the next rebalance the
+    units are held, so weights drift with prices. Each day's return is then
+        sum(units * price_t) / sum(units * price_t-1) - 1
+    computed for all dates at once from the units of the segment each date falls in. A gap in a
+    constituent's prices carries its last price; a constituent that stops trading keeps its last
+    value until the next rebalance drops it.
+
+    Args:
+        prices: Date x ticker prices (adjusted closes), NaN where a ticker has no price
+        weights: Target weights, see weight_schedule
+        rebalance: See rebalance_rows; schedule dates are always rebalance dates too
+        base: Index level on the first date
+    Returns:
+        {'returns': daily index returns (Series, NaN on the first date),
+         'level': index level starting at base,
+         'weights': date x ticker weights held over each day (after the previous close's rebalance)}
+    """
+    schedule = weight_schedule(weights)
+    tickers = [t for t in schedule.columns if t in prices.columns]
+    missing = [t for t in schedule.columns if t not in prices.columns]
+    if missing:
+        print(f"No prices for {', '.join(missing)}, left out of the index")
+    if not tickers:
+        raise ValueError("None of the weighted tickers have prices")
+
+    prices = prices[tickers].sort_index()
+    prices = prices[prices.notna().any(axis=1)]
+    index = prices.index
+    dates = _naive(index)
+    values = prices.to_numpy(dtype=float)
+    filled = prices.ffill().to_numpy(dtype=float)
+
+    # listed between first and last valid price
+    valid = ~np.isnan(values)
+    started = np.maximum.accumulate(valid, axis=0)
+    not_ended = np.maximum.accumulate(valid[::-1], axis=0)[::-1]
+    listed = started & not_ended
+
+    # rebalance rows: the periodic ones plus the first row on or after each schedule date
+    schedule_rows = np.searchsorted(dates.to_numpy(), schedule.index.to_numpy(), side='left')
+    rows = np.union1d(rebalance_rows(dates, rebalance), schedule_rows[schedule_rows < len(index)])
+    rows = rows[rows < len(index)]
+
+    # targets in force at each rebalance, renormalized over what is listed there
+    in_force = np.searchsorted(schedule_rows, rows, side='right') - 1
+    targets = schedule[tickers].to_numpy()[np.maximum(in_force, 0)]
+    targets[in_force < 0] = 0.0
+    targets = np.where(listed[rows], targets, 0.0)
+    totals = targets.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        targets = np.where(totals > 0, targets / totals, 0.0)
+        units = np.where(targets > 0, targets / filled[rows], 0.0)
+
+    # units held over day t are those of the last rebalance strictly before t
+    segment = np.searchsorted(rows, np.arange(len(index)), side='left') - 1
+    held = np.where(segment[:, None] >= 0, units[np.maximum(segment, 0)], 0.0)
+    previous = np.vstack([np.full((1, len(tickers)), np.nan), filled[:-1]])
+    current_value = np.nansum(held * filled, axis=1)
+    previous_value = np.nansum(held * previous, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.where(previous_value > 0, current_value / previous_value - 1, np.nan)
+        held_weights = held * np.nan_to_num(previous) / previous_value[:, None]
+
+    returns = pd.Series(returns, index=index, name='return')
+    # the level starts at the first rebalance with something to hold
+    first = rows[totals[:, 0] > 0]
+    level = pd.Series(np.nan, index=index, name='level')
+    if len(first):
+        start = first[0]
+        level.iloc[start:] = base * (1 + returns.iloc[start:].fillna(0.0)).cumprod()
+    return {
+        'returns': returns,
+        'level': level,
+        'weights': pd.DataFrame(held_weights, index=index, columns=tickers)
+    }
+
+def build_index_from_panel(
+    weights: Weights,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    rebalance: Optional[str] = 'quarterly',
+    base: float = 100.0
+) -> Dict[str, pd.DataFrame]:
+    """build_index over closes from the panel store (constituents must already be fetched)."""
+    tickers = list(weight_schedule(weights).columns)
+    prices = load_panel(tickers, start_date=start_date, end_date=end_date, field='close')
+    return build_index(prices, weights, rebalance=rebalance, base=base)
+
+def equal_weight_sector(
+    sector: str,
+    limit: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    rebalance: Optional[str] = 'quarterly'
+) -> Dict[str, pd.DataFrame]:
+    """Equal-weight proxy of a sector ETF from its holdings in sectors.yaml."""
+    holdings: List[str] = get_sector_tickers(sector, limit)
+    return build_index_from_panel({t: 1.0 for t in holdings}, start_date, end_date, rebalance)
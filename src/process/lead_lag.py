@@ -1,15 +1,94 @@
+import os
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import stats
+from typing import List, Dict, Iterator, Tuple, Optional
 from config.helper import get_sector_config
-from src.process.returns import get_cumulative_returns
-from statsmodels.tsa.stattools import grangercausalitytests
-from src.fetch.update_data import update_data
+from src.process.returns import get_returns_panel
 
 config = get_sector_config()
 sector_etfs = config['sector_etfs']
 benchmark = config['benchmark']
 
+def centered_returns(returns: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The arrays the pairwise sums are built from: returns demeaned per column with zeros where
+    missing, the presence mask as float weights, and the squares of the demeaned returns.
+    Demeaning leaves correlations unchanged and keeps running sums small, which limits drift
+    when rows are added and subtracted.
+    """
+    values = returns.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    filled = np.where(mask, values, 0.0)
+    # an all-missing column has nothing to demean
+    means = filled.sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+    centered = np.where(mask, filled - means, 0.0)
+    return centered, mask.astype(float), centered ** 2
+
+def sliding_products(left: np.ndarray, right: np.ndarray, ends: List[int], window: int) -> Iterator[np.ndarray]:
+    """
+    left[rows].T @ right[rows] over the rows end - window + 1 .. end, for each of the ascending
+    window ends. The sums are carried from one end to the next: the rows entering since the
+    previous end are added and those leaving are subtracted, together in one signed matrix
+    product; a window that does not overlap the previous one is summed afresh.
+    """
+    sums = np.zeros((left.shape[1], right.shape[1]))
+    added, removed = 0, 0
+    for end in ends:
+        start = max(end - window + 1, 0)
+        if start >= added:
+            sums = left[start:end + 1].T @ right[start:end + 1]
+        else:
+            rows = np.r_[added:end + 1, removed:start]
+            signs = np.r_[np.ones(end + 1 - added), -np.ones(start - removed)]
+            sums += (left[rows] * signs[:, None]).T @ right[rows]
+        added, removed = end + 1, start
+        yield sums
+
+def lagged_correlations(returns: pd.DataFrame, max_lag: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Correlation of every column pair at every lag from -max_lag to max_lag, in one batch.
+
+    corr[k, i, j] is the Pearson correlation of column i at t with column j at t + lag,
+    over the dates where both are present, so a positive lag means column i leads column j.
+    Each non-negative lag is a handful of masked matrix products over the whole returns
+    matrix; negative lags come from the symmetry corr(i, j, -k) = corr(j, i, +k).
+
+    Returns:
+        (lags, corr) with corr of shape (2 * max_lag + 1, N, N); NaN where fewer than 3
+        overlapping observations exist or a series is constant
+    """
+    filled, weights, squares = centered_returns(returns)
+
+    n_rows, n_cols = filled.shape
+    positive = np.full((max_lag + 1, n_cols, n_cols), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for lag in range(min(max_lag, n_rows - 1) + 1):
+            x, mx, xx = filled[:n_rows - lag], weights[:n_rows - lag], squares[:n_rows - lag]
+            y, my, yy = filled[lag:], weights[lag:], squares[lag:]
+            n = mx.T @ my
+            sx, sy = x.T @ my, mx.T @ y
+            sxy, sxx, syy = x.T @ y, xx.T @ my, mx.T @ yy
+            cov = n * sxy - sx * sy
+            var = (n * sxx - sx ** 2) * (n * syy - sy ** 2)
+            corr = cov / np.sqrt(var)
+            corr[(n < 3) | ~(var > 0)] = np.nan
+            positive[lag] = corr
+
+    lags = np.arange(-max_lag, max_lag + 1)
+    negative = positive[1:][::-1].transpose(0, 2, 1)
+    return lags, np.concatenate([negative, positive])
+
+def best_lags(lags: np.ndarray, corr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Lag with the largest absolute correlation per pair (first one on ties), and that correlation."""
+    strength = np.where(np.isnan(corr), -np.inf, np.abs(corr))
+    best = strength.argmax(axis=0)
+    best_corr = np.take_along_axis(corr, best[None], axis=0)[0]
+    best_lag = np.where(np.isnan(best_corr), np.nan, lags[best])
+    return best_lag, best_corr
+
 def cross_correlation_lead_lag(series1: pd.Series, series2: pd.Series, max_lag: int = 10) -> Tuple[int, float]:
     """
     Compute the lag (in periods) where series1 leads/lags series2 the most.
@@ -17,18 +96,28 @@ def cross_correlation_lead_lag(series1: pd.Series, series2: pd.Series, max_lag:
     Positive lag: series1 leads series2.
     Negative lag: series1 lags series2.
     """
-    lags = range(-max_lag, max_lag + 1)
-    correlations = []
-    for lag in lags:
-        if lag < 0:
-            corr = series1.iloc[:lag].corr(series2.iloc[-lag:])
-        elif lag > 0:
-            corr = series1.iloc[lag:].corr(series2.iloc[:-lag])
-        else:
-            corr = series1.corr(series2)
-        correlations.append(corr)
-    best_idx = int(np.nanargmax(np.abs(correlations)))
-    return lags[best_idx], correlations[best_idx]
+    aligned = pd.concat([series1, series2], axis=1, join='outer')
+    lags, corr = lagged_correlations(aligned, max_lag)
+    best_lag, best_corr = best_lags(lags, corr)
+    return int(best_lag[0, 1]), best_corr[0, 1]
+
+def lead_lag_correlation_matrix(
+    sectors: List[str] = sector_etfs,
+    timeframe: str = 'daily',
+    max_lag: int = 10
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Best lag and its correlation for every ordered pair, from one batched computation.
+    Returns (lag_matrix, corr_matrix): rows=leaders, cols=laggards (positive lag: row leads col).
+    """
+    sectors = list(dict.fromkeys(sectors))
+    # Use returns, not cumulative, for lead-lag
+    returns = get_returns_panel(sectors, timeframe)
+
+    lags, corr = lagged_correlations(returns, max_lag)
+    best_lag, best_corr = best_lags(lags, corr)
+    np.fill_diagonal(best_lag, 0)
+    return pd.DataFrame(best_lag, index=sectors, columns=sectors), pd.DataFrame(best_corr, index=sectors, columns=sectors)
 
 def sector_lead_lag_matrix(
     sectors: List[str] = sector_etfs,
@@ -39,56 +128,217 @@ def sector_lead_lag_matrix(
     Compute lead-lag matrix for all sector pairs.
     Returns a DataFrame: rows=leaders, cols=laggards, values=best lag (positive: row leads col).
     """
-    idx = pd.Index(sectors)
-    results = pd.DataFrame(index=idx, columns=idx)
-    returns = {}
-    for sector in sectors:
-        update_data(sector)
-        # Use returns, not cumulative, for lead-lag
-        df = get_cumulative_returns(sector, timeframe)
-        returns[sector] = df.iloc[:, 0].pct_change().dropna()
-    for leader in sectors:
-        for laggard in sectors:
-            if leader == laggard:
-                results.loc[leader, laggard] = 0
-            else:
-                lag, corr = cross_correlation_lead_lag(returns[leader], returns[laggard], max_lag)
-                results.loc[leader, laggard] = lag
-    return results
+    lag_matrix, _ = lead_lag_correlation_matrix(sectors, timeframe, max_lag)
+    return lag_matrix
+
+def rolling_lead_lag(returns: pd.DataFrame, window: int = 126, max_lag: int = 5, step: int = 1) -> Dict[str, object]:
+    """
+    Time-varying lead-lag: for every window end date, the best lag and its correlation for
+    every column pair, with the same lag convention as lagged_correlations (positive: row leads).
+
+    Within a window of `window` rows, lag k pairs row t of column i with row t + k of column j
+    when both rows lie in the window. The per-lag pair sums (counts, sums, cross products,
+    squares) are the blocks of [w | x | xx].T @ [w | x | xx] over rows t against rows t + k,
+    carried between window ends by sliding_products (one signed matrix product per lag for
+    the pairs entering and leaving) instead of recomputing each window. Only the best lag
+    (int8) and its correlation (float32) are stored per output date, so memory is 5 bytes per
+    pair per date regardless of max_lag.
+
+    Args:
+        returns: Date x ticker returns
+        window: Rows per window
+        max_lag: Largest lag tested in each direction
+        step: Store every step-th window
+    Returns:
+        {'dates': window end dates, 'tickers': columns,
+         'lag': (dates, N, N) int8, 'corr': (dates, N, N) float32}
+    """
+    if window <= max_lag + 2:
+        raise ValueError("window must be larger than max_lag + 2")
+
+    x, w, xx = centered_returns(returns)
+    n_rows, n_cols = x.shape
+    lags = np.arange(-max_lag, max_lag + 1)
+    stacked = np.hstack([w, x, xx])
+    a, b = slice(0, n_cols), slice(n_cols, 2 * n_cols)
+    c = slice(2 * n_cols, 3 * n_cols)
+
+    out_rows = list(range(window - 1, n_rows, step))
+    best_lag = np.zeros((len(out_rows), n_cols, n_cols), dtype=np.int8)
+    best_corr = np.full((len(out_rows), n_cols, n_cols), np.nan, dtype=np.float32)
+
+    # at lag k, pair t joins row t with row t + k; a window ending at row e holds pairs up to e - k
+    streams = [
+        sliding_products(stacked[:n_rows - lag], stacked[lag:], [end - lag for end in out_rows], window - lag)
+        for lag in range(max_lag + 1)
+    ]
+    for i, blocks in enumerate(zip(*streams)):
+        sums = np.stack(blocks)
+        n, sx, sy = sums[:, a, a], sums[:, b, a], sums[:, a, b]
+        sxy, sxx, syy = sums[:, b, b], sums[:, c, a], sums[:, a, c]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = n * sxy - sx * sy
+            var = (n * sxx - sx ** 2) * (n * syy - sy ** 2)
+            positive = cov / np.sqrt(var)
+            positive[(n < 3) | ~(var > 1e-12 * np.abs(n * sxx * n * syy))] = np.nan
+        corr = np.concatenate([positive[1:][::-1].transpose(0, 2, 1), positive])
+        lag_matrix, corr_matrix = best_lags(lags, corr)
+        best_lag[i] = np.nan_to_num(lag_matrix).astype(np.int8)
+        best_corr[i] = corr_matrix
+
+    return {
+        'dates': returns.index[out_rows],
+        'tickers': list(returns.columns),
+        'lag': best_lag,
+        'corr': best_corr
+    }
+
+def rolling_sector_lead_lag(
+    sectors: List[str] = sector_etfs,
+    timeframe: str = 'daily',
+    window: int = 126,
+    max_lag: int = 5,
+    step: int = 1
+) -> Dict[str, object]:
+    """Rolling lead-lag (see rolling_lead_lag) for sector returns loaded with one panel read."""
+    sectors = list(dict.fromkeys(sectors))
+    returns = get_returns_panel(sectors, timeframe)
+    return rolling_lead_lag(returns, window=window, max_lag=max_lag, step=step)
+
+GRANGER_TESTS = ['ssr_ftest', 'ssr_chi2test', 'lrtest', 'params_ftest']
+
+# by default the tests only go to a process pool above this much work (series^2 x rows x lags,
+# a few seconds in-process); below it the pool's start-up costs more than it saves
+GRANGER_POOL_MIN_WORK = 50_000_000
+
+# returns matrix shared with pool workers, sent once per worker instead of once per task
+_worker_values = None
+
+def _init_granger_worker(values: np.ndarray):
+    global _worker_values
+    _worker_values = values
+
+def _lag_block(series: np.ndarray, lag: int) -> np.ndarray:
+    """
+    Lags 1..lag of every row of a (columns, n) array for times lag..n-1, shape (columns, n - lag, lag).
+    A strided view into the series, so no lag matrix is copied.
+    """
+    n = series.shape[1]
+    return sliding_window_view(series, lag, axis=1)[:, :n - lag, ::-1]
+
+def _granger_pvalues(y: np.ndarray, leaders: np.ndarray, max_lag: int, test: str) -> np.ndarray:
+    """
+    Granger p-values of every leader column for one laggard y, for lags 1..max_lag, matching
+    statsmodels.grangercausalitytests on each inner-joined pair. The restricted model (own
+    lags of y) is fitted once per lag and shared by all leaders with the same observations;
+    each leader's extra lags enter through the Frisch-Waugh-Lovell residual update, batched.
+
+    Returns:
+        Array of shape (leaders, max_lag), NaN where the test cannot be computed
+    """
+    pvalues = np.full((leaders.shape[1], max_lag), np.nan)
+    valid = ~np.isnan(leaders) & ~np.isnan(y)[:, None]
+
+    # leaders with identical overlap with y share the restricted fits
+    groups = {}
+    for i in range(leaders.shape[1]):
+        groups.setdefault(valid[:, i].tobytes(), []).append(i)
+
+    for members in groups.values():
+        rows = valid[:, members[0]]
+        yy, xx = y[rows], np.ascontiguousarray(leaders[rows][:, members].T)
+        n = len(yy)
+        # same minimum as grangercausalitytests
+        if n <= 3 * max_lag + 1:
+            continue
+        # a constant leader makes the test infeasible
+        feasible = xx.max(axis=1) != xx.min(axis=1)
+
+        for lag in range(1, max_lag + 1):
+            nobs = n - lag
+            target = yy[lag:]
+            own = np.column_stack([_lag_block(yy[None], lag)[0], np.ones(nobs)])
+            q, _ = np.linalg.qr(own)
+            resid = target - q @ (q.T @ target)
+            ssr_down = resid @ resid
+
+            # leader lags with the restricted design projected out, (leaders, nobs, lag)
+            lags = _lag_block(xx, lag)
+            block = lags - q @ (q.T @ lags)
+            block_t = block.transpose(0, 2, 1)
+            rtr = block_t @ block
+            rte = block_t @ resid
+            gain = np.einsum('gk,gk->g', rte, (np.linalg.pinv(rtr) @ rte[..., None])[..., 0])
+            ssr_joint = ssr_down - gain
+            df_resid = nobs - (2 * lag + 1)
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if test in ('ssr_ftest', 'params_ftest'):
+                    stat = (ssr_down - ssr_joint) / ssr_joint / lag * df_resid
+                    p = stats.f.sf(stat, lag, df_resid)
+                elif test == 'ssr_chi2test':
+                    stat = nobs * (ssr_down - ssr_joint) / ssr_joint
+                    p = stats.chi2.sf(stat, lag)
+                else:
+                    stat = nobs * np.log(ssr_down / ssr_joint)
+                    p = stats.chi2.sf(stat, lag)
+            # perfect fits are infeasible in statsmodels as well
+            p[~feasible | ~(ssr_joint > np.finfo(float).eps * ssr_down)] = np.nan
+            pvalues[members, lag - 1] = p
+    return pvalues
+
+def _granger_laggard(column: int, max_lag: int, test: str) -> np.ndarray:
+    return _granger_pvalues(_worker_values[:, column], _worker_values, max_lag, test)
 
 def granger_lead_lag_matrix(
     sectors: List[str] = sector_etfs,
     timeframe: str = 'daily',
     max_lag: int = 10,
-    test: str = 'ssr_chi2test'
+    test: str = 'ssr_chi2test',
+    n_jobs: Optional[int] = None
 ) -> pd.DataFrame:
     """
     Returns a DataFrame: rows=leaders, cols=laggards, values=(min_pvalue, best_lag)
+
+    The returns matrix is loaded once and each laggard's tests against all leaders run as one
+    batched task. With n_jobs > 1 tasks are spread over that many worker processes; by default
+    they run in-process, and over all cores only above GRANGER_POOL_MIN_WORK. P-values match
+    statsmodels.grangercausalitytests for the chosen test.
     """
+    if test not in GRANGER_TESTS:
+        raise ValueError(f"test must be one of {GRANGER_TESTS}")
+
+    sectors = list(dict.fromkeys(sectors))
+    returns = get_returns_panel(sectors, timeframe)
+    values = returns.to_numpy(dtype=float)
+
+    if n_jobs is None:
+        work = len(sectors) ** 2 * len(values) * max_lag
+        n_jobs = os.cpu_count() if work >= GRANGER_POOL_MIN_WORK else 1
+    columns = range(len(sectors))
+    if n_jobs <= 1 or len(sectors) < 2:
+        _init_granger_worker(values)
+        by_laggard = [_granger_laggard(j, max_lag, test) for j in columns]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(sectors)), initializer=_init_granger_worker, initargs=(values,)) as pool:
+            by_laggard = list(pool.map(_granger_laggard, columns, [max_lag] * len(sectors), [test] * len(sectors)))
+
     idx = pd.Index(sectors)
     results = pd.DataFrame(index=idx, columns=idx, dtype=object)
-    for sector in sectors:
-        update_data(sector)
-    returns = {sector: get_cumulative_returns(sector, timeframe).iloc[:, 0].pct_change().dropna() for sector in sectors}
-    for leader in sectors:
-        for laggard in sectors:
+    for j, laggard in enumerate(sectors):
+        for i, leader in enumerate(sectors):
             if leader == laggard:
                 results.loc[leader, laggard] = (np.nan, 0)
                 continue
-            # Align series
-            df = pd.concat([returns[laggard], returns[leader]], axis=1, join='inner')
-            df.columns = ['laggard', 'leader']
-            try:
-                test_result = grangercausalitytests(df, maxlag=max_lag)
-                # Find lag with minimum p-value
-                min_p = 1.0
-                best_lag = 0
-                for lag in range(1, max_lag+1):
-                    pval = test_result[lag][0][test][1]
-                    if pval < min_p:
-                        min_p = pval
-                        best_lag = lag
-                results.loc[leader, laggard] = (min_p, best_lag)
-            except Exception as e:
+            pvals = by_laggard[j][i]
+            # statsmodels fails the whole pair when any lag cannot be tested
+            if np.isnan(pvals).any():
                 results.loc[leader, laggard] = (np.nan, 0)
+                continue
+            # lag with the minimum p-value, first one on ties
+            best = int(np.nanargmin(pvals))
+            if pvals[best] < 1.0:
+                results.loc[leader, laggard] = (float(pvals[best]), best + 1)
+            else:
+                results.loc[leader, laggard] = (1.0, 0)
     return results
@@ -1,13 +1,90 @@
+import numpy as np
 import pandas as pd
-from typing import List, Optional
-from src.process.relative_strength import get_relative_strength
-from src.process.rs_momentum import get_relative_strength_momentum
+from typing import Dict, List, Optional
+from src.process.relative_strength import get_relative_strength_panel
+from src.process.rs_momentum import get_relative_strength_momentum_panel
 from config.helper import get_sector_config
 from src.process.volatility import get_volatility_data
-from src.fetch.update_data import update_data
 
 config = get_sector_config()
 
+def rank_matrix(values: pd.DataFrame, ascending: bool = False) -> Dict[str, pd.DataFrame]:
+    """
+    Cross-sectional rank of every row of a date x ticker matrix, all dates at once.
+
+    Args:
+        values: Date x ticker matrix (e.g. an RS or momentum panel)
+        ascending: Rank the smallest value first instead of the largest
+    Returns:
+        {'rank': 1 = first place, ties in column order, NaN where the ticker has no value,
+         'percentile': share of the row's tickers ranked at or below (1.0 = first place)}
+    """
+    ranks = values.rank(axis=1, method='first', ascending=ascending)
+    percentile = values.rank(axis=1, method='max', ascending=not ascending, pct=True)
+    return {'rank': ranks, 'percentile': percentile}
+
+def rank_persistence(ranks: pd.DataFrame, periods: int = 1) -> pd.Series:
+    """
+    Spearman correlation between each date's ranks and the ranks `periods` rows earlier, over
+    the tickers ranked on both dates. Near 1 the leaders stay the leaders; near 0 the order reshuffles.
+    """
+    current = ranks.to_numpy(dtype=float)
+    previous = ranks.shift(periods).to_numpy(dtype=float)
+    both = ~np.isnan(current) & ~np.isnan(previous)
+    count = both.sum(axis=1)
+    # re-rank within the shared tickers so both rows are permutations of 1..count
+    current = pd.DataFrame(np.where(both, current, np.nan)).rank(axis=1).to_numpy()
+    previous = pd.DataFrame(np.where(both, previous, np.nan)).rank(axis=1).to_numpy()
+    squared_diff = np.nansum((current - previous) ** 2, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rho = 1 - 6 * squared_diff / (count * (count ** 2 - 1))
+    rho[count < 2] = np.nan
+    return pd.Series(rho, index=ranks.index, name='RankPersistence')
+
+def relative_strength_rank_history(
+    tickers: List[str] = config['sector_etfs'],
+    benchmark: str = config['benchmark'],
+    lookback_days: Optional[int] = None,
+    normalize: bool = True,
+    timeframe: str = 'daily'
+) -> Dict[str, pd.DataFrame]:
+    """
+    Date x ticker RS rank and percentile matrices over the whole history (or the last
+    lookback_days bars), from one RS panel. See rank_matrix.
+    """
+    rs_panel = get_relative_strength_panel(tickers, benchmark, lookback_days=lookback_days, normalize=normalize, timeframe=timeframe)
+    return rank_matrix(rs_panel.drop(columns=benchmark))
+
+def relative_strength_momentum_rank_history(
+    tickers: List[str] = config['sector_etfs'],
+    benchmark: str = config['benchmark'],
+    lookback_days: Optional[int] = None,
+    momentum_window: int = 5,
+    normalize: bool = True,
+    timeframe: str = 'daily'
+) -> Dict[str, pd.DataFrame]:
+    """
+    Date x ticker RS momentum rank and percentile matrices over the whole history (or the last
+    lookback_days bars), from one momentum panel. See rank_matrix.
+    """
+    momentum = get_relative_strength_momentum_panel(
+        tickers,
+        benchmark,
+        lookback_days=lookback_days,
+        momentum_window=momentum_window,
+        normalize=normalize,
+        return_series=True,
+        timeframe=timeframe
+    )
+    return rank_matrix(momentum.drop(columns=benchmark).dropna(how='all'))
+
+def _latest_ranking(values: pd.Series, name: str) -> pd.DataFrame:
+    # one row of a rank matrix as a sorted table
+    ranks = rank_matrix(values.to_frame().T)['rank'].iloc[0]
+    df = values.to_frame(name=name)
+    df['Rank'] = ranks.astype(int)
+    return df.sort_values(by='Rank')
+
 def rank_relative_strength(
     tickers: List[str] = config['sector_etfs'],
     benchmark: str = config['benchmark'],
@@ -16,20 +93,8 @@ def rank_relative_strength(
     display: bool = True,
     timeframe: str = 'daily'
 ) -> pd.DataFrame:
-    rs_values = {}
-
-    for ticker in tickers:
-        update_data(ticker)
-        if ticker == benchmark:
-            continue
-
-        rs_series = get_relative_strength(ticker, benchmark, lookback_days=lookback_days, normalize=normalize, timeframe=timeframe)
-
-        rs_values[ticker] = rs_series.iloc[-1]
-
-    rs_df = pd.DataFrame.from_dict(rs_values, orient='index', columns=['RelativeStrength'])
-    rs_df.sort_values(by='RelativeStrength', ascending=False, inplace=True)
-    rs_df['Rank'] = range(1, len(rs_df) + 1)
+    rs_panel = get_relative_strength_panel(tickers, benchmark, lookback_days=lookback_days, normalize=normalize, timeframe=timeframe)
+    rs_df = _latest_ranking(rs_panel.drop(columns=benchmark).iloc[-1].dropna(), 'RelativeStrength')
 
     if display:
         print("\nSector Relative Strength Rankings:")
@@ -47,28 +112,19 @@ def rank_relative_strength_momentum(
     display: bool = True,
     timeframe: str = 'daily'
 ) -> pd.DataFrame:
-    momentum_values = {}
+    slopes = get_relative_strength_momentum_panel(
+        tickers,
+        benchmark,
+        lookback_days=lookback_days,
+        momentum_window=momentum_window,
+        normalize=normalize,
+        timeframe=timeframe
+    ).drop(benchmark)
 
-    for ticker in tickers:
-        update_data(ticker)
-        if ticker == benchmark:
-            continue
-        try:
-            slope = get_relative_strength_momentum(
-                target=ticker,
-                benchmark=benchmark,
-                lookback_days=lookback_days,
-                momentum_window=momentum_window,
-                normalize=normalize,
-                timeframe=timeframe
-            )
-            momentum_values[ticker] = slope
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
-
-    df = pd.DataFrame.from_dict(momentum_values, orient='index', columns=['RSMomentum'])
-    df.sort_values(by='RSMomentum', ascending=False, inplace=True)
-    df['Rank'] = range(1, len(df) + 1)
+    for ticker in slopes.index[slopes.isna()]:
+        print(f"Error processing {ticker}: Insufficient RS data for {ticker} vs {benchmark}")
+
+    df = _latest_ranking(slopes.dropna(), 'RSMomentum')
 
     if display:
         print("\nSector RS Momentum Rankings:")
@@ -81,7 +137,9 @@ def rank_volatility(
     tickers: Optional[List[str]] = config['sector_etfs'],
     window: int = 20,
     display: bool = True,
-    raw_volatility: bool = False
+    raw_volatility: bool = False,
+    volatility: Optional[dict] = None,
+    estimator: str = 'close'
 ) -> dict:
     """
     Rank sectors by volatility across daily, weekly, and monthly timeframes.
@@ -90,12 +148,12 @@ def rank_volatility(
         window: Rolling window for volatility calculation (default: 20)
         display: Whether to print rankings to console (default: True)
         raw_volatility: If True, use raw annualized volatility; if False, use z-scores (default: False)
+        volatility: Precomputed compute_volatility output to reuse (e.g. the one behind the heatmap)
+        estimator: Volatility estimator, see compute_volatility (default: close-to-close)
     Returns:
         Dictionary containing rankings for each timeframe
     """
-    for ticker in tickers:
-        update_data(ticker)
-    vol_df = get_volatility_data(tickers=tickers, window=window, raw_volatility=raw_volatility)
+    vol_df = get_volatility_data(tickers=tickers, timeframe=None, window=window, raw_volatility=raw_volatility, volatility=volatility, estimator=estimator)
     
     # Choose column names based on raw_volatility parameter
     if raw_volatility:
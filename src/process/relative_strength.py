@@ -1,44 +1,80 @@
+import numpy as np
 import pandas as pd
-from typing import Optional
-from src.process.returns import get_cumulative_returns
+from typing import List, Optional
+from src.process.returns import get_cumulative_returns, get_cumulative_returns_panel
 from src.fetch.update_data import update_data
 
+# extra rows read past the lookback so that calendar gaps between two tickers still leave a full window
+TAIL_MARGIN = 10
+
+def relative_strength_panel(prices: pd.DataFrame, benchmark: str, lookback_days: Optional[int] = None, normalize: bool = True) -> pd.DataFrame:
+    """
+    Relative strength of every column of a price matrix against its benchmark column, in one
+    broadcast division.
+
+    Args:
+        prices: Date x ticker matrix of prices or cumulative returns, including the benchmark column
+        benchmark: Name of the benchmark column
+        lookback_days: Keep only the last lookback_days + 1 rows
+        normalize: Divide each column by its first value in the window
+    Returns:
+        Date x ticker RS matrix (the benchmark column is all 1.0). A ticker is NaN on dates
+        before both it and the benchmark have data.
+    """
+    if benchmark not in prices.columns:
+        raise ValueError(f"Benchmark {benchmark} is not a column of the price matrix")
+
+    # forward fill covers days where one ticker trades and the other does not
+    aligned = prices.dropna(how='all').ffill()
+    values = aligned.to_numpy(dtype=float)
+    bench = values[:, [aligned.columns.get_loc(benchmark)]]
+
+    if np.isnan(bench).all():
+        raise ValueError(f"No data available for benchmark {benchmark}")
+    if (bench[~np.isnan(bench)] <= 0).any():
+        raise ValueError(f"Benchmark {benchmark} contains zero or negative values, which would cause division errors")
+
+    rs = values / bench
+    index = aligned.index
+    if lookback_days is not None:
+        rs = rs[-(lookback_days + 1):]
+        index = index[-(lookback_days + 1):]
+
+    if normalize and len(rs):
+        # once a column starts it stays filled, so its first valid row is the window start
+        valid = ~np.isnan(rs)
+        first = rs[valid.argmax(axis=0), np.arange(rs.shape[1])]
+        rs = rs / first
+
+    return pd.DataFrame(rs, index=index, columns=aligned.columns)
+
+def get_relative_strength_panel(tickers: List[str], benchmark: str, lookback_days: Optional[int] = None, normalize: bool = True, timeframe: str = 'daily') -> pd.DataFrame:
+    """
+    RS matrix for many tickers against one benchmark, with the benchmark loaded and aligned once.
+    Returns a date x ticker DataFrame (benchmark column included).
+    """
+    tail_days = lookback_days + TAIL_MARGIN if (normalize and lookback_days is not None) else None
+    prices = get_cumulative_returns_panel(list(dict.fromkeys(list(tickers) + [benchmark])), timeframe, tail_days)
+    return relative_strength_panel(prices, benchmark, lookback_days, normalize)
+
 def get_relative_strength(target: str, benchmark: str, lookback_days: Optional[int] = None, normalize: bool = True, timeframe: str = 'daily') -> pd.Series:
     update_data(target)
     update_data(benchmark)
-    
-    print(f"Getting cumulative returns for {target}...")
-    target_cum = get_cumulative_returns(target, timeframe)
-    benchmark_cum = get_cumulative_returns(benchmark, timeframe)
-
-    # Ensure both series have proper names for identification
-    target_cum.name = f"{target}_target"
-    benchmark_cum.name = f"{benchmark}_benchmark"
-    
-    # Use concat with outer join to preserve all dates, then forward fill to handle missing values
-    # This ensures we don't lose data due to different trading calendars
-    aligned = pd.concat([target_cum, benchmark_cum], axis=1, join='outer')
-    
-    # Forward fill any missing values (this handles cases where one ticker trades on a day the other doesn't)
-    aligned = aligned.ffill()
-    
-    # Drop any rows where we still have NaN values (should be minimal after forward fill)
-    aligned = aligned.dropna()
-    
-    # Validate that we have data and benchmark values are non-zero
-    if aligned.empty:
-        raise ValueError(f"No aligned data available for {target} vs {benchmark}")
-    
-    if (aligned.iloc[:, 1] <= 0).any():
-        raise ValueError(f"Benchmark {benchmark} contains zero or negative values, which would cause division errors")
 
-    if lookback_days is not None:
-        aligned = aligned.tail(lookback_days + 1)
+    # Normalizing divides out the cumulative level at the window start, so only the window's
+    # returns matter and the full history does not have to be read
+    tail_days = lookback_days + TAIL_MARGIN if (normalize and lookback_days is not None) else None
 
-    rs = aligned.iloc[:, 0] / aligned.iloc[:, 1]
-    rs.name = f"{target}_vs_{benchmark}_RS"
+    print(f"Getting cumulative returns for {target}...")
+    target_cum = get_cumulative_returns(target, timeframe, tail_days)
+    benchmark_cum = get_cumulative_returns(benchmark, timeframe, tail_days)
 
-    if normalize:
-        rs = rs / rs.iloc[0]
+    prices = pd.concat([target_cum.iloc[:, 0].rename('target'), benchmark_cum.iloc[:, 0].rename('benchmark')], axis=1, join='outer')
+    # drop the leading rows where only one of the two has data, as before
+    prices = prices[prices.ffill().notna().all(axis=1)]
+    if prices.empty:
+        raise ValueError(f"No aligned data available for {target} vs {benchmark}")
 
+    rs = relative_strength_panel(prices, 'benchmark', lookback_days, normalize)['target']
+    rs.name = f"{target}_vs_{benchmark}_RS"
     return rs
@@ -1,32 +1,42 @@
 import pandas as pd
-from typing import Optional
-from pathlib import Path
-from config.helper import get_data_file
-from src.fetch.price_data import fetch
-from src.process.transform_timeframe import get_resampled_data
+from typing import List, Optional
+from src.process.transform_timeframe import get_resampled_data, compound_returns, timeframe_rule
+from src.fetch.storage import read_artifact, read_tail
+from src.fetch.panel import load_panel
 from src.fetch.update_data import update_data
-from src.process.transform_timeframe import get_resampled_data
+from src.fetch.manifest import version
+from src.fetch.freshness import on_invalidate
+from src.process.cache import LRUCache
+from config.helper import get_settings
 
-def get_cumulative_returns(ticker: str, timeframe: str = 'daily', lookback_days: Optional[int] = None) -> pd.DataFrame:
-    if timeframe not in ['daily', 'weekly', 'monthly']:
-        raise ValueError("Timeframe must be 'daily', 'weekly', or 'monthly'.")
+# loaded and cumulated series, keyed by (ticker, timeframe, lookback, data version)
+_cache = LRUCache(get_settings().get('cache', {}).get('max_mb', 256) * 1024 * 1024)
+# drop a ticker's entries as soon as the fetch layer writes new data for it
+on_invalidate(_cache.invalidate)
+
+def cache_stats() -> dict:
+    """Hit/miss counts and memory use of the get_cumulative_returns cache."""
+    return _cache.stats()
 
-    file_suffix = {
-        'daily': f'{ticker}_daily.parquet',
-        'weekly': f'{ticker}_weekly.parquet',
-        'monthly': f'{ticker}_monthly.parquet'
-    }[timeframe]
+def clear_cache():
+    _cache.invalidate()
 
+def get_cumulative_returns(ticker: str, timeframe: str = 'daily', lookback_days: Optional[int] = None) -> pd.DataFrame:
     update_data(ticker)
-    file_path = get_data_file(file_suffix)
-    
-    if not Path(file_path).exists():
+    if timeframe != 'daily':
+        # validates the timeframe and brings its stored bars up to date, rewriting only the open bar
         get_resampled_data(ticker, timeframe)
-        file_path = get_data_file(file_suffix)
 
-    
-    data = pd.read_parquet(file_path)
-    
+    key = (ticker, timeframe, lookback_days, version(ticker, timeframe))
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    # only the window is read from disk when a lookback is given
+    if lookback_days is not None:
+        data = read_tail(ticker, timeframe, lookback_days + 1)
+    else:
+        data = read_artifact(ticker, timeframe)
     
     if data.empty:
         raise ValueError(f"{ticker} could not be retrieved. The ticker may be invalid or missing data.")
@@ -46,4 +56,51 @@ def get_cumulative_returns(ticker: str, timeframe: str = 'daily', lookback_days:
     # Apply cumulative product
     cumulative = (1 + df).cumprod()
 
+    _cache.put(key, cumulative)
     return cumulative
+
+
+def resample_returns(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Compound a date x ticker matrix of daily returns into returns per bar of any timeframe
+    in memory, with the same bars as the stored resampled artifacts.
+    """
+    if timeframe == 'daily':
+        return df
+    return compound_returns(df, timeframe)
+
+
+def get_returns_panel(tickers: List[str], timeframe: str = 'daily', start_date: Optional[str] = None) -> pd.DataFrame:
+    """
+    Returns per bar of a timeframe for many tickers at once, from the stored daily returns in
+    the consolidated price panel (one bulk read instead of one file per ticker).
+
+    Returns:
+        DataFrame indexed by date with one column per ticker
+    """
+    if timeframe != 'daily':
+        timeframe_rule(timeframe)
+
+    for ticker in tickers:
+        update_data(ticker)
+    df = load_panel(tickers, start_date=start_date, field='return').dropna(how='all')
+
+    if df.empty:
+        raise ValueError(f"None of {tickers} could be retrieved.")
+
+    return resample_returns(df, timeframe)
+
+
+def get_cumulative_returns_panel(tickers: List[str], timeframe: str = 'daily', lookback_days: Optional[int] = None) -> pd.DataFrame:
+    """
+    Cumulative returns for many tickers at once (see get_returns_panel).
+
+    Returns:
+        DataFrame indexed by date with one column per ticker
+    """
+    df = get_returns_panel(tickers, timeframe)
+
+    if lookback_days is not None:
+        df = df.tail(lookback_days + 1)
+
+    return (1 + df).cumprod()
@@ -0,0 +1,94 @@
+import pandas as pd
+from typing import Dict, List, Optional
+from config.helper import get_sector_config
+from src.fetch.panel import load_panel
+from src.fetch.manifest import last_date as stored_last_date
+from src.fetch.update_data import update_data
+from src.process.returns import resample_returns
+from src.process.relative_strength import relative_strength_panel, TAIL_MARGIN
+from src.process.rs_momentum import rolling_slope
+
+config = get_sector_config()
+
+TIMEFRAMES = ['daily', 'weekly', 'monthly']
+
+# calendar days spanned by one bar (with room for weekends and holidays), used to bound
+# how much daily history has to be loaded
+BAR_DAYS = {'daily': 2, 'weekly': 7, 'monthly': 31}
+
+def _rrg_tail(rs: pd.DataFrame, momentum: pd.DataFrame, momentum_window: int) -> pd.DataFrame:
+    """Last momentum_window (RS ratio, RS momentum) points of every ticker, long format."""
+    rows = []
+    for ticker in rs.columns:
+        # same minimum history as plot_rrg has always required
+        if rs[ticker].count() < momentum_window + 1:
+            continue
+        points = pd.DataFrame({'rs_ratio': rs[ticker], 'rs_momentum': momentum[ticker]}).dropna().tail(momentum_window)
+        points.insert(0, 'ticker', ticker)
+        rows.append(points)
+    if not rows:
+        return pd.DataFrame(columns=['ticker', 'rs_ratio', 'rs_momentum'])
+    return pd.concat(rows)
+
+def compute_rrg(
+    tickers: List[str] = config['sector_etfs'],
+    benchmark: str = config['benchmark'],
+    lookback_days: int = 30,
+    momentum_window: int = 5,
+    normalize: bool = True,
+    timeframes: Optional[List[str]] = None
+) -> Dict[str, dict]:
+    """
+    RS ratio and RS momentum for every ticker and timeframe in one pass. Daily returns are
+    loaded from the panel once; weekly and monthly bars are compounded from them in memory.
+
+    Args:
+        tickers: Tickers to place on the graph
+        benchmark: Benchmark ticker
+        lookback_days: Lookback in bars of each timeframe (days, weeks or months)
+        momentum_window: Bars per momentum slope, also the length of each tail
+        normalize: Normalize RS to 1.0 at the start of the window
+        timeframes: Subset of 'daily', 'weekly', 'monthly' (default: all three)
+    Returns:
+        {timeframe: {'rs': date x ticker RS ratio,
+                     'momentum': date x ticker RS momentum,
+                     'tail': last momentum_window points per ticker (columns ticker, rs_ratio, rs_momentum)}}
+        The benchmark itself is left out of 'tail'.
+    """
+    timeframes = TIMEFRAMES if timeframes is None else timeframes
+    for tf in timeframes:
+        if tf not in TIMEFRAMES:
+            raise ValueError("timeframe must be 'daily', 'weekly', or 'monthly'")
+
+    columns = list(dict.fromkeys(list(tickers) + [benchmark]))
+    for ticker in columns:
+        update_data(ticker)
+
+    total_lookback = lookback_days + momentum_window
+    tail_bars = total_lookback + TAIL_MARGIN
+    start_date = None
+    latest = stored_last_date(benchmark)
+    if normalize and latest is not None:
+        # only the window's returns matter once RS is normalized, see get_relative_strength
+        span = max(BAR_DAYS[tf] for tf in timeframes) * (tail_bars + 2)
+        start_date = (latest.tz_localize(None) if latest.tz is not None else latest) - pd.Timedelta(days=span)
+
+    daily = load_panel(columns, start_date=start_date, field='return').dropna(how='all')
+    if daily.empty:
+        raise ValueError(f"None of {columns} could be retrieved.")
+
+    result = {}
+    for tf in timeframes:
+        returns = resample_returns(daily, tf)
+        if normalize:
+            returns = returns.tail(tail_bars + 1)
+        prices = (1 + returns).cumprod()
+
+        rs = relative_strength_panel(prices, benchmark, total_lookback, normalize)
+        momentum = rolling_slope(rs, momentum_window)
+        result[tf] = {
+            'rs': rs,
+            'momentum': momentum,
+            'tail': _rrg_tail(rs.drop(columns=benchmark), momentum.drop(columns=benchmark), momentum_window)
+        }
+    return result
@@ -1,11 +1,59 @@
+import numpy as np
 import pandas as pd
-from typing import Optional
-from src.process.relative_strength import get_relative_strength
-from scipy.stats import linregress
+from typing import List, Optional, Union
+from numpy.lib.stride_tricks import sliding_window_view
+from src.process.relative_strength import get_relative_strength, get_relative_strength_panel
 from src.fetch.update_data import update_data
 
 
-def get_relative_strength_momentum(target: str, benchmark: str, lookback_days: int = 30, momentum_window: Optional[int] = 5, normalize: bool = True, method: str = "slope", return_series: bool = False, timeframe: str = 'daily') -> float:
+def rolling_slope(values: Union[pd.Series, pd.DataFrame], window: int) -> Union[pd.Series, pd.DataFrame]:
+    """
+    OLS slope of each trailing window against x = 0..window-1, for every column at once.
+    With a fixed x-design the slope is a weighted sum of the window, weights (x - mean(x)) / Sxx,
+    which gives the same result as scipy.stats.linregress on each window.
+
+    Args:
+        values: Series or date x ticker DataFrame (e.g. an RS matrix)
+        window: Number of points per regression
+    Returns:
+        Same shape and index as the input; the first window - 1 rows, and windows containing
+        NaN, are NaN
+    """
+    if window < 2:
+        raise ValueError("Momentum window must be at least 2")
+
+    data = values.to_numpy(dtype=float)
+    squeeze = data.ndim == 1
+    if squeeze:
+        data = data[:, None]
+
+    x = np.arange(window, dtype=float)
+    weights = (x - x.mean()) / ((x - x.mean()) ** 2).sum()
+
+    slopes = np.full(data.shape, np.nan)
+    if len(data) >= window:
+        # (rows - window + 1, columns, window) view, no copy
+        windows = sliding_window_view(data, window, axis=0)
+        slopes[window - 1:] = windows @ weights
+
+    if squeeze:
+        return pd.Series(slopes[:, 0], index=values.index, name=values.name)
+    return pd.DataFrame(slopes, index=values.index, columns=values.columns)
+
+
+def get_relative_strength_momentum_panel(tickers: List[str], benchmark: str, lookback_days: int = 30, momentum_window: int = 5, normalize: bool = True, return_series: bool = False, timeframe: str = 'daily') -> Union[pd.Series, pd.DataFrame]:
+    """
+    RS slope momentum for many tickers from one RS matrix.
+    Returns the latest slope per ticker, or the full date x ticker slope matrix when return_series is True.
+    """
+    rs_panel = get_relative_strength_panel(tickers, benchmark, lookback_days=lookback_days, normalize=normalize, timeframe=timeframe)
+    momentum = rolling_slope(rs_panel, momentum_window)
+    if return_series:
+        return momentum
+    return momentum.iloc[-1]
+
+
+def get_relative_strength_momentum(target: str, benchmark: str, lookback_days: int = 30, momentum_window: Optional[int] = 5, normalize: bool = True, method: str = "slope", return_series: bool = False, timeframe: str = 'daily') -> Union[float, pd.Series]:
     update_data(target)
     update_data(benchmark)
     rs_series = get_relative_strength(
@@ -23,24 +71,14 @@ def get_relative_strength_momentum(target: str, benchmark: str, lookback_days: i
     if momentum_window is not None:
         if len(rs_series) < momentum_window:
             raise ValueError("Momentum window exceeds available RS data")
-        
+
     if method == "slope":
         if return_series:
-            # Compute rolling slope for each tail segment
-            momentum_vals = []
-            for t in range(len(rs_series) - momentum_window + 1):
-                window = rs_series.iloc[t:t + momentum_window]
-                x = list(range(momentum_window))
-                y = window.values
-                slope, *_ = linregress(x, y)
-                momentum_vals.append(slope)
-            return momentum_vals
+            # Slope of every window, indexed by the window's last date
+            return rolling_slope(rs_series, momentum_window).iloc[momentum_window - 1:]
 
         else:
-            x = range(momentum_window)
-            y = rs_series.tail(momentum_window).values
-            slope, *_ = linregress(x, y)
-            return slope
+            return float(rolling_slope(rs_series.tail(momentum_window), momentum_window).iloc[-1])
 
     elif method == "pct_change":
         if return_series:
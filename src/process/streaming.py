@@ -0,0 +1,263 @@
+import json
+import math
+import os
+import pandas as pd
+from collections import deque
+from typing import Dict, List, Optional
+from config.helper import get_data_dir, get_sector_config
+from src.fetch.manifest import get_entry, base_version
+from src.fetch.storage import read_artifact, read_range
+from src.fetch.update_data import update_data
+from src.process.volatility import PERIODS_PER_YEAR
+
+config = get_sector_config()
+
+state_dir = get_data_dir() / 'state'
+
+STATE_VERSION = 2
+
+class StreamingState:
+    """
+    Running RS, RS momentum and volatility of one ticker against a benchmark, advanced one
+    daily bar at a time in constant time:
+        - cumulative levels of both series (products of 1 + return since each one's first bar)
+        - the last momentum_window RS values with their plain and x-weighted sums, so the OLS
+          slope over x = 0..window-1 (as in rolling_slope) is updated by dropping one value and adding one
+        - the last vol_window ticker returns with a sliding Welford mean and sum of squared deviations
+
+    RS here is the ratio of the two cumulative levels, i.e. get_relative_strength with
+    normalize=False over the full history; the momentum is the slope of that series.
+    """
+    def __init__(self, ticker: str, benchmark: str, momentum_window: int = 5, vol_window: int = 20):
+        if momentum_window < 2 or vol_window < 2:
+            raise ValueError("Momentum and volatility windows must be at least 2")
+        self.ticker = ticker
+        self.benchmark = benchmark
+        self.momentum_window = momentum_window
+        self.vol_window = vol_window
+        self.last_date = None
+        self.sources = {}
+        self.level = None
+        self.benchmark_level = None
+        self.rs_window = deque()
+        self.rs_sum = 0.0
+        self.rs_xsum = 0.0
+        self.return_window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def advance(self, date: pd.Timestamp, ticker_return: Optional[float], benchmark_return: Optional[float]) -> dict:
+        """Apply one bar; either return may be None/NaN when only one side traded. Returns snapshot()."""
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"Bar {date.date()} is not after the last applied bar {self.last_date.date()}")
+
+        if _valid(ticker_return):
+            self.level = (1.0 if self.level is None else self.level) * (1 + ticker_return)
+            self._add_return(ticker_return)
+        if _valid(benchmark_return):
+            self.benchmark_level = (1.0 if self.benchmark_level is None else self.benchmark_level) * (1 + benchmark_return)
+        if self.level is not None and self.benchmark_level is not None:
+            self._add_rs(self.level / self.benchmark_level)
+
+        self.last_date = date
+        return self.snapshot()
+
+    def _add_rs(self, value: float):
+        window = self.momentum_window
+        if len(self.rs_window) == window:
+            # shift x down by one: every kept value loses one x-weight, the oldest leaves at x = 0
+            oldest = self.rs_window.popleft()
+            self.rs_sum -= oldest
+            self.rs_xsum -= self.rs_sum
+        self.rs_xsum += len(self.rs_window) * value
+        self.rs_sum += value
+        self.rs_window.append(value)
+
+    def _add_return(self, value: float):
+        if len(self.return_window) == self.vol_window:
+            oldest = self.return_window.popleft()
+            count = len(self.return_window)
+            delta = oldest - self.mean
+            self.mean -= delta / count
+            self.m2 -= delta * (oldest - self.mean)
+        self.return_window.append(value)
+        count = len(self.return_window)
+        delta = value - self.mean
+        self.mean += delta / count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def rs(self) -> Optional[float]:
+        return self.rs_window[-1] if self.rs_window else None
+
+    @property
+    def momentum(self) -> Optional[float]:
+        window = self.momentum_window
+        if len(self.rs_window) < window:
+            return None
+        x_mean = (window - 1) / 2
+        sxx = window * (window ** 2 - 1) / 12
+        return (self.rs_xsum - x_mean * self.rs_sum) / sxx
+
+    @property
+    def volatility(self) -> Optional[float]:
+        """Annualized volatility of the ticker's daily returns over vol_window bars."""
+        if len(self.return_window) < self.vol_window:
+            return None
+        return math.sqrt(max(self.m2, 0.0) / (self.vol_window - 1) * PERIODS_PER_YEAR['daily'])
+
+    def snapshot(self) -> dict:
+        return {
+            'ticker': self.ticker,
+            'benchmark': self.benchmark,
+            'date': self.last_date,
+            'level': self.level,
+            'benchmark_level': self.benchmark_level,
+            'rs': self.rs,
+            'momentum': self.momentum,
+            'volatility': self.volatility
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            'version': STATE_VERSION,
+            'ticker': self.ticker,
+            'benchmark': self.benchmark,
+            'momentum_window': self.momentum_window,
+            'vol_window': self.vol_window,
+            'last_date': self.last_date.isoformat() if self.last_date is not None else None,
+            'sources': self.sources,
+            'level': self.level,
+            'benchmark_level': self.benchmark_level,
+            'rs_window': list(self.rs_window),
+            'rs_sum': self.rs_sum,
+            'rs_xsum': self.rs_xsum,
+            'return_window': list(self.return_window),
+            'mean': self.mean,
+            'm2': self.m2
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'StreamingState':
+        state = cls(data['ticker'], data['benchmark'], data['momentum_window'], data['vol_window'])
+        state.last_date = pd.Timestamp(data['last_date']) if data['last_date'] else None
+        state.sources = data.get('sources', {})
+        state.level = data['level']
+        state.benchmark_level = data['benchmark_level']
+        state.rs_window = deque(data['rs_window'])
+        state.rs_sum = data['rs_sum']
+        state.rs_xsum = data['rs_xsum']
+        state.return_window = deque(data['return_window'])
+        state.mean = data['mean']
+        state.m2 = data['m2']
+        return state
+
+    def save(self):
+        state_dir.mkdir(parents=True, exist_ok=True)
+        path = state_path(self.ticker, self.benchmark, self.momentum_window, self.vol_window)
+        tmp_path = path.with_suffix('.json.tmp')
+        with tmp_path.open('w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+def _valid(value) -> bool:
+    return value is not None and not math.isnan(value)
+
+def _naive(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    # Tiingo dates are naive, Polygon dates UTC midnight
+    return (index.tz_localize(None) if index.tz is not None else index).normalize()
+
+def state_path(ticker: str, benchmark: str, momentum_window: int = 5, vol_window: int = 20):
+    return state_dir / f"{ticker}_{benchmark}_m{momentum_window}_v{vol_window}.json"
+
+def load_state(ticker: str, benchmark: str, momentum_window: int = 5, vol_window: int = 20) -> Optional[StreamingState]:
+    path = state_path(ticker, benchmark, momentum_window, vol_window)
+    if not path.exists():
+        return None
+    try:
+        with path.open('r') as f:
+            data = json.load(f)
+        if data.get('version') != STATE_VERSION:
+            return None
+        return StreamingState.from_dict(data)
+    except (ValueError, KeyError) as e:
+        print(f"Discarding unreadable state {path.name}: {e}")
+        return None
+
+def _stored_entries(ticker: str, benchmark: str) -> Optional[dict]:
+    entries = {t: get_entry(t, 'daily') for t in (ticker, benchmark)}
+    if any(entry is None for entry in entries.values()):
+        return None
+    return entries
+
+def _returns_since(ticker: str, start_date: Optional[pd.Timestamp]) -> pd.Series:
+    # only the row groups after the state's last bar are read once the state exists
+    df = read_artifact(ticker, 'daily') if start_date is None else read_range(ticker, 'daily', start_date=start_date)
+    series = df.iloc[:, 0] if isinstance(df, pd.DataFrame) else df
+    series.index = _naive(series.index)
+    if start_date is not None:
+        series = series[series.index > start_date]
+    return series.astype(float)
+
+def update_streaming_state(
+    ticker: str,
+    benchmark: str = config['benchmark'],
+    momentum_window: int = 5,
+    vol_window: int = 20,
+    fetch: bool = True
+) -> Optional[dict]:
+    """
+    Bring the persisted state of a ticker/benchmark pair up to the latest stored bar and save it
+    under data/state. Only bars after the state's last date are read and applied, so a nightly
+    run costs one short range read per series. The state is rebuilt from full history the first
+    time, or when either series' stored history was rewritten rather than appended to (its
+    manifest base version or first date changed, e.g. a re-fetch or synthetic rebuild).
+    Returns the latest snapshot (see StreamingState.snapshot), or None if data is missing.
+    """
+    if fetch:
+        update_data(ticker)
+        update_data(benchmark)
+
+    entries = _stored_entries(ticker, benchmark)
+    if entries is None:
+        print(f"No stored daily data for {ticker} or {benchmark}")
+        return None
+    # appends keep both; a rewritten history invalidates everything accumulated from it
+    sources = {t: {'first_date': entry['first_date'], 'base': base_version(entry)} for t, entry in entries.items()}
+
+    state = load_state(ticker, benchmark, momentum_window, vol_window)
+    if state is None or state.sources != sources:
+        state = StreamingState(ticker, benchmark, momentum_window, vol_window)
+        state.sources = sources
+    elif state.last_date is not None and all(
+        entry['last_date'] is None or _naive(pd.DatetimeIndex([entry['last_date']]))[0] <= state.last_date
+        for entry in entries.values()
+    ):
+        # the manifest shows nothing newer, no file is opened
+        return state.snapshot()
+
+    bars = pd.concat({
+        'ticker': _returns_since(ticker, state.last_date),
+        'benchmark': _returns_since(benchmark, state.last_date)
+    }, axis=1).sort_index()
+
+    for date, ticker_return, benchmark_return in bars.itertuples():
+        state.advance(date, ticker_return, benchmark_return)
+
+    if len(bars) or not state_path(ticker, benchmark, momentum_window, vol_window).exists():
+        state.save()
+    return state.snapshot()
+
+def update_streaming_states(
+    tickers: List[str] = config['sector_etfs'],
+    benchmark: str = config['benchmark'],
+    momentum_window: int = 5,
+    vol_window: int = 20
+) -> Dict[str, Optional[dict]]:
+    """Update the state of every ticker against the benchmark. Returns {ticker: snapshot}."""
+    update_data(benchmark)
+    return {
+        ticker: update_streaming_state(ticker, benchmark, momentum_window, vol_window)
+        for ticker in tickers
+    }
@@ -1,101 +1,178 @@
+import re
+import numpy as np
 import pandas as pd
-from pathlib import Path
+from typing import List, Optional
+from pandas.tseries.frequencies import to_offset
 from src.fetch.price_data import fetch
-from config.helper import get_data_file, get_sector_config
+from config.helper import get_sector_config
 from src.fetch.update_data import update_data
+from src.fetch.manifest import write_artifact, register_artifact, annotate, get_entry, base_version, last_date as stored_last_date
+from src.fetch.storage import read_artifact, read_range, read_tail, append_artifact
+from src.fetch.trading_calendar import sessions
 
 config = get_sector_config()
 synth_tickers = config['synthetic_etfs']
 
-def get_resampled_data(ticker: str, freq: str = 'weekly', save: bool = True):
-    
-    if freq not in ['weekly', 'monthly']:
-        raise ValueError("freq must be 'weekly' or 'monthly'")
+# named timeframes -> pandas resample rules, labelled at the period end
+FREQUENCIES = {'weekly': 'W-SUN', 'monthly': 'ME', 'quarterly': 'QE'}
+
+# N-session bars ('10session') are counted from this session, so bucket boundaries never move
+SESSION_EPOCH = '1990-01-02'
+
+OHLCV_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+def _session_count(freq: str) -> Optional[int]:
+    match = re.fullmatch(r'(\d+)session', freq)
+    return int(match.group(1)) if match else None
+
+def timeframe_rule(freq: str) -> str:
+    """
+    Resample rule of a timeframe: 'weekly', 'monthly', 'quarterly', 'Nsession' for bars of
+    N exchange sessions (e.g. '10session'), or any pandas offset alias (e.g. '2W-FRI').
+    """
+    if freq in FREQUENCIES:
+        return FREQUENCIES[freq]
+    if _session_count(freq):
+        return freq
+    try:
+        to_offset(freq)
+    except ValueError:
+        raise ValueError(f"Unsupported timeframe '{freq}'. Use one of {list(FREQUENCIES)}, 'Nsession' or a pandas offset alias")
+    return freq
+
+def bucket_labels(index: pd.DatetimeIndex, freq: str) -> pd.DatetimeIndex:
+    """
+    Bar label of every row of a sorted date index. Labels only depend on the date itself, so
+    resampling any slice of history gives the same labels as resampling all of it.
+    """
+    sessions_per_bar = _session_count(freq)
+    if sessions_per_bar is None:
+        # let pandas place the bucket boundaries, then spread each label over its rows
+        counts = pd.Series(1, index=index).resample(timeframe_rule(freq)).count()
+        return pd.DatetimeIndex(np.repeat(counts.index, counts.to_numpy()), name=index.name)
+
+    naive = index.tz_localize(None) if index.tz is not None else index
+    calendar = sessions(SESSION_EPOCH, naive.max() + pd.Timedelta(days=2 * sessions_per_bar + 10))
+    ordinal = calendar.searchsorted(naive.normalize(), side='right') - 1
+    # label each bar with its last session, known even while the bar is still open
+    last = np.minimum((ordinal // sessions_per_bar + 1) * sessions_per_bar - 1, len(calendar) - 1)
+    labels = calendar[last]
+    if index.tz is not None:
+        labels = labels.tz_localize(index.tz)
+    return pd.DatetimeIndex(labels, name=index.name)
+
+def resample_bars(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Aggregate daily OHLCV bars into bars of any timeframe."""
+    agg = {col: how for col, how in OHLCV_AGG.items() if col in df.columns}
+    return df.groupby(bucket_labels(df.index, freq)).agg(agg).dropna()
+
+def compound_returns(returns: pd.DataFrame, freq: str, drop_first: bool = True) -> pd.DataFrame:
+    """
+    Compound daily returns (one column per ticker) into returns per bar. With drop_first,
+    each column's first bar is dropped, since it does not cover a full bar from a prior close.
+    """
+    labels = bucket_labels(returns.index, freq)
+    compounded = (1 + returns).groupby(labels).prod(min_count=1) - 1
+    if drop_first:
+        started = returns.notna().groupby(labels).sum().cumsum() > 0
+        first = started & ~started.shift(fill_value=False)
+        compounded = compounded.mask(first)
+    return compounded.dropna(how='all')
+
+def _source_artifact(ticker: str) -> str:
+    # synthetic ETFs only have a stitched return stream, not continuous OHLCV
+    return 'daily' if ticker in synth_tickers else 'daily_raw'
+
+def _source_versions(ticker: str) -> dict:
+    # appends keep both; a rewritten history (re-fetch, adjusted prices, rebuild) changes the base
+    artifacts = ['daily'] if ticker in synth_tickers else ['daily', 'daily_raw']
+    versions = {}
+    for artifact in artifacts:
+        entry = get_entry(ticker, artifact)
+        versions[artifact] = {'first_date': entry['first_date'], 'base': base_version(entry)} if entry is not None else None
+    return versions
+
+def _full_resample(ticker: str, freq: str) -> int:
+    returns = compound_returns(read_artifact(ticker, 'daily'), freq)
+    if returns.empty:
+        print(f"Warning: No returns data generated for {ticker}")
+        return 0
+    if ticker not in synth_tickers:
+        write_artifact(resample_bars(read_artifact(ticker, 'daily_raw'), freq), ticker, f'{freq}_raw')
+    write_artifact(returns, ticker, freq)
+    print(f"Saved: {ticker}_{freq}.parquet")
+    return len(returns)
+
+def _incremental_resample(ticker: str, freq: str, previous_label: pd.Timestamp) -> int:
+    # everything up to the previous bar is final; rebuild the open bar and any new ones
+    returns = compound_returns(read_range(ticker, 'daily', start_date=previous_label), freq, drop_first=False)
+    returns = returns[returns.index > previous_label]
+    if ticker not in synth_tickers:
+        bars = resample_bars(read_range(ticker, 'daily_raw', start_date=previous_label), freq)
+        append_artifact(bars[bars.index > previous_label], ticker, f'{freq}_raw', replace_last=True)
+    append_artifact(returns, ticker, freq, replace_last=True)
+    return len(returns)
+
+def update_resampled(ticker: str, freq: str = 'weekly') -> int:
+    """
+    Keep the ticker's resampled artifacts for a timeframe current. The manifest records which
+    daily date and daily versions they were built from; when new daily bars are appended only
+    the last stored bar (which may have been open) and any newer bars are recomputed, from the
+    daily rows after the last complete bar. A rewritten daily history (manifest base version or
+    first date changed) is resampled in full. Nothing is read when they are already current.
+    Returns the number of bars written.
+    """
+    timeframe_rule(freq)
+    register_artifact(freq)
+    register_artifact(f'{freq}_raw')
+
+    source = _source_artifact(ticker)
+    source_last = stored_last_date(ticker, source)
+    if source_last is None:
+        print(f"{ticker}_{source}.parquet not found. Attempting to fetch...")
+        fetch(ticker)
+        source_last = stored_last_date(ticker, source)
+        if source_last is None:
+            return 0
+
+    entry = get_entry(ticker, freq)
+    versions = _source_versions(ticker)
+    appended = (
+        entry is not None
+        and entry.get('source_last_date') is not None
+        and entry.get('source_versions') == versions
+        and all(version is not None and version['base'] is not None for version in versions.values())
+    )
+    if appended and entry['source_last_date'] == source_last.isoformat():
+        return 0
+
+    previous = read_tail(ticker, freq, 2).index if appended else []
+    if len(previous) < 2:
+        rows = _full_resample(ticker, freq)
+    else:
+        rows = _incremental_resample(ticker, freq, previous[0])
+
+    for artifact in [freq] + ([] if ticker in synth_tickers else [f'{freq}_raw']):
+        if get_entry(ticker, artifact) is not None:
+            annotate(ticker, artifact, source_last_date=source_last.isoformat(), source_versions=versions)
+    return rows
+
+def update_resampled_all(tickers: List[str], freqs: List[str] = ['weekly', 'monthly']) -> dict:
+    """Bring every ticker's resampled timeframes up to date. Returns {ticker: {freq: bars written}}."""
+    return {ticker: {freq: update_resampled(ticker, freq) for freq in freqs} for ticker in tickers}
 
+def get_resampled_data(ticker: str, freq: str = 'weekly', save: bool = True):
+    """
+    Resampled returns for a timeframe. With save (the default) the stored artifacts are brought
+    up to date incrementally; otherwise the returns are computed in memory and returned.
+    """
+    timeframe_rule(freq)
     update_data(ticker)
-    
-    if ticker in synth_tickers:
-        get_resampled_synth_data(ticker=ticker, freq=freq, save=save)
-        return
-        
-    file_suffix_raw = {'weekly': '_weekly_raw.parquet', 'monthly': '_monthly_raw.parquet'}[freq]
-    file_suffix_ret = {'weekly': '_weekly.parquet', 'monthly': '_monthly.parquet'}[freq]
-
-    raw_output_path = get_data_file(ticker + file_suffix_raw)
-    returns_output_path = get_data_file(ticker + file_suffix_ret)
-
-    # If both raw and returns files exist, skip processing
-    if save and Path(raw_output_path).exists() and Path(returns_output_path).exists():
-        return
-
-    # Ensure raw daily data exists
-    raw_parquet_path = get_data_file(f"{ticker}_daily_raw.parquet")
-    if not Path(raw_parquet_path).exists():
-        print(f"{ticker}_daily_raw.parquet not found. Attempting to fetch...")
-        fetch(ticker)
 
-    # Load raw daily data
-    df = pd.read_parquet(raw_parquet_path)
-    df.sort_index(inplace=True)
-
-    # Choose resampling rule
-    rule = {'weekly': 'W-SUN', 'monthly': 'ME'}[freq]
-
-    # Resample OHLCV
-    resampled = df.resample(rule).agg({
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }).dropna()
-
-    if save:
-        # Save raw resampled OHLCV
-        resampled.to_parquet(raw_output_path)
-
-        # Save percentage returns
-        close_series = resampled[['close']].copy()
-        close_series.rename(columns={'close': ticker}, inplace=True)
-        returns = close_series.pct_change().dropna()
-
-        if not returns.empty:
-            returns.to_parquet(returns_output_path)
-            print(f"Saved: {Path(returns_output_path).name}")
-        else:
-            print(f"Warning: No returns data generated for {ticker}")
+    if not save:
+        return compound_returns(read_artifact(ticker, 'daily'), freq)
+    update_resampled(ticker, freq)
 
 def get_resampled_synth_data(ticker: str, freq: str = 'weekly', save: bool = True):
-    update_data(ticker)
-    file_suffix_ret = {'weekly': '_weekly.parquet', 'monthly': '_monthly.parquet'}[freq]
-    
-    returns_output_path = get_data_file(ticker + file_suffix_ret)
-    
-    if save and Path(returns_output_path).exists():
-        return
-    
-    # Ensure raw daily data exists
-    returns_parquet_path = get_data_file(f"{ticker}_daily.parquet")
-    if not Path(returns_parquet_path).exists():
-        print(f"{ticker}_daily.parquet not found. Attempting to fetch...")
-        fetch(ticker)
-        
-    # Load raw daily data
-    df = pd.read_parquet(returns_parquet_path)
-    df.sort_index(inplace=True)
-    
-    # Convert % returns to cumulative to preserve compounding, then resample
-    cumulative = (1 + df).cumprod()
-
-    rule = {'weekly': 'W-SUN', 'monthly': 'ME'}[freq]
-    resampled_cumulative = cumulative.resample(rule).last().dropna()
-
-    # Reconvert back to % return from cumulative
-    resampled_returns = resampled_cumulative.pct_change().dropna()
-
-    if save:
-        if not resampled_returns.empty:
-            resampled_returns.to_parquet(returns_output_path)
-            print(f"Saved: {Path(returns_output_path).name}")
-        else:
-            print(f"Warning: No resampled returns generated for {ticker}")
\ No newline at end of file
+    # synthetic ETFs resample their stitched return stream, handled by get_resampled_data
+    return get_resampled_data(ticker, freq=freq, save=save)
@@ -0,0 +1,197 @@
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from config.helper import get_sector_config, get_sector_tickers
+from src.fetch.panel import load_panel
+from src.fetch.manifest import last_date as stored_last_date
+from src.process.returns import resample_returns
+from src.process.relative_strength import relative_strength_panel, TAIL_MARGIN
+from src.process.rs_momentum import rolling_slope
+from src.process.rrg import TIMEFRAMES, BAR_DAYS
+
+config = get_sector_config()
+
+# RRG quadrants, split at RS = 1.0 and momentum = 0.0 as drawn by plot_rrg
+QUADRANTS = ['Leading', 'Weakening', 'Lagging', 'Improving']
+
+def quadrant_codes(rs: np.ndarray, momentum: np.ndarray) -> np.ndarray:
+    """Index into QUADRANTS for every (RS, momentum) pair, -1 where either is missing."""
+    codes = np.select(
+        [(rs >= 1) & (momentum >= 0), (rs >= 1) & (momentum < 0), (rs < 1) & (momentum < 0), (rs < 1) & (momentum >= 0)],
+        [0, 1, 2, 3],
+        default=-1
+    )
+    return codes
+
+def _quadrant_names(codes: np.ndarray) -> np.ndarray:
+    names = np.array(QUADRANTS + [None], dtype=object)
+    return names[codes]
+
+def universe_holdings(sectors: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """{sector ETF: holdings} from sectors.yaml."""
+    sectors = config['sector_etfs'] if sectors is None else sectors
+    return {sector: get_sector_tickers(sector) for sector in sectors}
+
+def _rrg_state(rs: pd.DataFrame, momentum_window: int, event_bars: int) -> dict:
+    # latest point, quadrant history and quadrant changes of every column of an RS matrix
+    momentum = rolling_slope(rs, momentum_window)
+    codes = quadrant_codes(rs.to_numpy(), momentum.to_numpy())
+    latest = codes[-1]
+
+    # bars since the quadrant last changed (counting the latest bar)
+    same = codes == latest
+    differs = ~same[::-1]
+    run = np.where(differs.any(axis=0), differs.argmax(axis=0), len(codes))
+
+    previous = np.full(codes.shape[1], -1)
+    has_previous = run < len(codes)
+    previous[has_previous] = codes[len(codes) - 1 - run[has_previous], np.nonzero(has_previous)[0]]
+
+    # every change within the last event_bars bars
+    recent = codes[-(event_bars + 1):]
+    changed = (recent[1:] != recent[:-1]) & (recent[1:] >= 0) & (recent[:-1] >= 0)
+    rows, cols = np.nonzero(changed)
+    dates = rs.index[-len(recent) + 1:] if len(recent) > 1 else rs.index[:0]
+    events = pd.DataFrame({
+        'Ticker': rs.columns[cols],
+        'Date': dates[rows],
+        'From': _quadrant_names(recent[rows, cols]),
+        'To': _quadrant_names(recent[rows + 1, cols])
+    })
+
+    return {
+        'rs': rs.iloc[-1],
+        'momentum': momentum.iloc[-1],
+        'quadrant': pd.Series(_quadrant_names(latest), index=rs.columns),
+        'previous': pd.Series(_quadrant_names(previous), index=rs.columns),
+        'bars': pd.Series(np.where(latest >= 0, run, 0), index=rs.columns),
+        'events': events
+    }
+
+def _columns(state: dict, suffix: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        f'RS_{suffix}': state['rs'],
+        f'Momentum_{suffix}': state['momentum'],
+        f'Quadrant_{suffix}': state['quadrant'],
+        f'PrevQuadrant_{suffix}': state['previous'],
+        f'BarsInQuadrant_{suffix}': state['bars']
+    })
+
+def scan_universe(
+    sectors: Optional[List[str]] = None,
+    benchmark: str = config['benchmark'],
+    lookback_days: int = 30,
+    momentum_window: int = 5,
+    normalize: bool = True,
+    timeframe: str = 'daily',
+    event_bars: Optional[int] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    RS ratio, RS momentum and RRG quadrant of every sector holding against its own sector ETF
+    and against the benchmark, from locally stored data. Returns for all tickers are loaded
+    from the panel in one read and every RS matrix is computed in one broadcast per sector,
+    so nothing is processed ticker by ticker and no data is fetched (run update_grouped
+    and update_data first to refresh).
+
+    Args:
+        sectors: Sector ETFs whose holdings are scanned (default: all)
+        benchmark: Market benchmark
+        lookback_days, momentum_window, normalize, timeframe: As for compute_rrg
+        event_bars: Bars searched for quadrant changes (default: momentum_window, the RRG tail)
+    Returns:
+        {'table': one row per (holding, sector) with RS_*, Momentum_*, Quadrant_*,
+                  PrevQuadrant_* and BarsInQuadrant_* columns for 'Sector' and 'Benchmark',
+         'events': quadrant changes within event_bars (Ticker, Sector, Against, Date, From, To)}
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError("timeframe must be 'daily', 'weekly', or 'monthly'")
+    event_bars = momentum_window if event_bars is None else event_bars
+    holdings = universe_holdings(sectors)
+    holdings = {sector: [t for t in members if t not in (sector, benchmark)] for sector, members in holdings.items()}
+    columns = list(dict.fromkeys([benchmark] + list(holdings) + [t for members in holdings.values() for t in members]))
+
+    total_lookback = lookback_days + momentum_window
+    tail_bars = total_lookback + TAIL_MARGIN
+    start_date = None
+    latest = stored_last_date(benchmark)
+    if normalize and latest is not None:
+        span = BAR_DAYS[timeframe] * (tail_bars + 2)
+        start_date = (latest.tz_localize(None) if latest.tz is not None else latest) - pd.Timedelta(days=span)
+
+    daily = load_panel(columns, start_date=start_date, field='return').dropna(how='all')
+    if daily.empty or daily[benchmark].isna().all():
+        raise ValueError(f"No stored data for {benchmark}; fetch it before scanning")
+    returns = resample_returns(daily, timeframe)
+    if normalize:
+        returns = returns.tail(tail_bars + 1)
+    prices = (1 + returns).cumprod()
+
+    missing = [t for t in columns if prices[t].isna().all()]
+    if missing:
+        print(f"No stored data for {len(missing)} tickers, skipped: {', '.join(missing[:10])}" + (" ..." if len(missing) > 10 else ""))
+
+    # same window as compute_rrg, so the latest points match the RRG graph
+    against_benchmark = _rrg_state(relative_strength_panel(prices, benchmark, total_lookback, normalize), momentum_window, event_bars)
+
+    tables, events = [], []
+    for sector, members in holdings.items():
+        members = [t for t in members if t not in missing]
+        if not members or sector in missing:
+            continue
+        against_sector = _rrg_state(relative_strength_panel(prices[members + [sector]], sector, total_lookback, normalize), momentum_window, event_bars)
+
+        table = pd.concat([
+            _columns(against_sector, 'Sector').loc[members],
+            _columns(against_benchmark, 'Benchmark').loc[members]
+        ], axis=1)
+        table.insert(0, 'Sector', sector)
+        tables.append(table)
+
+        for state, against in [(against_sector, sector), (against_benchmark, benchmark)]:
+            sector_events = state['events'][state['events']['Ticker'].isin(members)].copy()
+            sector_events.insert(1, 'Sector', sector)
+            sector_events.insert(2, 'Against', against)
+            events.append(sector_events)
+
+    table = pd.concat(tables) if tables else pd.DataFrame()
+    table.index.name = 'Ticker'
+    table = table.reset_index()
+    events = pd.concat(events, ignore_index=True).sort_values(['Date', 'Ticker'], ascending=[False, True]) if events else pd.DataFrame()
+    return {'table': table, 'events': events.reset_index(drop=True)}
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="RRG scan of every sector holding against its sector ETF and the benchmark.")
+    parser.add_argument('--sectors', nargs='+', help="sector ETFs to scan (default: all)")
+    parser.add_argument('--benchmark', default=config['benchmark'])
+    parser.add_argument('--timeframe', default='daily', choices=TIMEFRAMES)
+    parser.add_argument('--lookback', type=int, default=30, help="lookback in bars")
+    parser.add_argument('--momentum', type=int, default=5, help="momentum window in bars")
+    parser.add_argument('--sort', default='Momentum_Benchmark', help="column to sort the table by")
+    parser.add_argument('--ascending', action='store_true')
+    parser.add_argument('--quadrant', choices=QUADRANTS, help="only holdings in this quadrant against the benchmark")
+    parser.add_argument('--top', type=int, help="only print the first N rows")
+    parser.add_argument('--events', action='store_true', help="print quadrant changes instead of the table")
+    parser.add_argument('--csv', help="also write the printed frame to this CSV file")
+    args = parser.parse_args(argv)
+
+    result = scan_universe(args.sectors, args.benchmark, args.lookback, args.momentum, timeframe=args.timeframe)
+    if args.events:
+        frame = result['events']
+    else:
+        frame = result['table']
+        if args.quadrant:
+            frame = frame[frame['Quadrant_Benchmark'] == args.quadrant]
+        if args.sort not in frame.columns:
+            parser.error(f"--sort must be one of {list(frame.columns)}")
+        frame = frame.sort_values(args.sort, ascending=args.ascending)
+    if args.top:
+        frame = frame.head(args.top)
+
+    print(frame.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    if args.csv:
+        frame.to_csv(args.csv, index=False)
+        print(f"Saved: {args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,209 @@
+import numpy as np
 import pandas as pd
-from typing import Optional, List
-from src.process.returns import get_cumulative_returns
+from typing import Dict, Optional, List
+from config.helper import get_sector_config, get_settings
+from src.fetch.panel import load_panel
 from src.fetch.update_data import update_data
+from src.process.returns import resample_returns
+from src.process.transform_timeframe import bucket_labels, OHLCV_AGG
 
-def compute_volatility_for_timeframe(ticker: str, timeframe: str = 'daily', window: int = 20, raw_volatility: bool = False) -> Optional[float]:
+config = get_sector_config()
+
+TIMEFRAMES = ['daily', 'weekly', 'monthly']
+
+PERIODS_PER_YEAR = {'daily': 252, 'weekly': 52, 'monthly': 12}
+
+ESTIMATORS = ['close', 'parkinson', 'garman_klass', 'rogers_satchell', 'yang_zhang', 'ewma']
+
+ewma_lambda = get_settings().get('volatility', {}).get('ewma_lambda', 0.94)
+
+def _pack(frame: pd.DataFrame):
+    # move every column's observations to the top, in date order
+    values = frame.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    order = np.argsort(~valid, axis=0, kind='stable')
+    packed = np.take_along_axis(values, order, axis=0)
+    return packed, order, valid
+
+def _unpack(packed: np.ndarray, order: np.ndarray, valid: np.ndarray, frame: pd.DataFrame) -> pd.DataFrame:
+    # scatter back to each observation's own date
+    packed[np.arange(len(packed))[:, None] >= valid.sum(axis=0)] = np.nan
+    result = np.full(packed.shape, np.nan)
+    np.put_along_axis(result, order, packed, axis=0)
+    result[~valid] = np.nan
+    return pd.DataFrame(result, index=frame.index, columns=frame.columns)
+
+def _window_sums(packed: np.ndarray, window: int) -> np.ndarray:
+    # sum of each trailing window of packed rows (NaN padding treated as 0, masked by _unpack)
+    sums = np.vstack([np.zeros((1, packed.shape[1])), np.cumsum(np.nan_to_num(packed), axis=0)])
+    out = np.full(packed.shape, np.nan)
+    out[window - 1:] = sums[window:] - sums[:-window]
+    return out
+
+def rolling_mean(frame: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    Rolling mean of every column over its last `window` observations. Each column skips its
+    own missing rows (as dropna on a single series would), so a gap in one ticker does not
+    blank the other tickers or a full window of its own history. Uses cumulative sums over
+    each column's observations, so the cost does not grow with the window.
+    """
+    packed, order, valid = _pack(frame)
+    return _unpack(_window_sums(packed, window) / window, order, valid, frame)
+
+def previous_observation(frame: pd.DataFrame) -> pd.DataFrame:
+    """Each column's previous observed value, skipping its own missing rows (NaN at its first)."""
+    packed, order, valid = _pack(frame)
+    shifted = np.vstack([np.full((1, packed.shape[1]), np.nan), packed[:-1]])
+    return _unpack(shifted, order, valid, frame)
+
+def rolling_std(returns: pd.DataFrame, window: int) -> pd.DataFrame:
+    """Rolling sample standard deviation of every column, with the same windows as rolling_mean."""
+    if window < 2:
+        raise ValueError("Volatility window must be at least 2")
+    packed, order, valid = _pack(returns)
+    # demeaning keeps the running sums of squares small
+    packed = packed - np.nan_to_num(np.nanmean(packed, axis=0))
+    window_sum = _window_sums(packed, window)
+    window_squares = _window_sums(packed ** 2, window)
+    variance = np.maximum(window_squares - window_sum ** 2 / window, 0.0) / (window - 1)
+    return _unpack(np.sqrt(variance), order, valid, returns)
+
+def _ewma_variance(returns: pd.DataFrame, window: int) -> pd.DataFrame:
+    # RiskMetrics recursion s2_t = lambda * s2_{t-1} + (1 - lambda) * r_t^2 per column,
+    # skipping each column's missing rows; the first window - 1 values are warm-up
+    variance = (returns ** 2).ewm(alpha=1 - ewma_lambda, adjust=False, ignore_na=True, min_periods=window).mean()
+    return variance.where(returns.notna())
+
+def range_variance(bars: Dict[str, pd.DataFrame], estimator: str) -> pd.DataFrame:
+    """
+    Per-bar variance term of a range-based estimator, for date x ticker open/high/low/close matrices.
+        parkinson:       ln(H/L)^2 / (4 ln 2)
+        garman_klass:    0.5 ln(H/L)^2 - (2 ln 2 - 1) ln(C/O)^2
+        rogers_satchell: ln(H/C) ln(H/O) + ln(L/C) ln(L/O)
+    """
+    log_hl = np.log(bars['high'] / bars['low'])
+    if estimator == 'parkinson':
+        return log_hl ** 2 / (4 * np.log(2))
+    if estimator == 'garman_klass':
+        return 0.5 * log_hl ** 2 - (2 * np.log(2) - 1) * np.log(bars['close'] / bars['open']) ** 2
+    if estimator == 'rogers_satchell':
+        return (np.log(bars['high'] / bars['close']) * np.log(bars['high'] / bars['open'])
+                + np.log(bars['low'] / bars['close']) * np.log(bars['low'] / bars['open']))
+    raise ValueError(f"Unsupported range estimator '{estimator}'")
+
+def estimator_volatility(bars: Dict[str, pd.DataFrame], estimator: str = 'close', window: int = 20) -> pd.DataFrame:
+    """
+    Rolling per-bar volatility (not annualized) of every ticker with one of ESTIMATORS.
+
+    Args:
+        bars: {'return': date x ticker returns} for 'close' and 'ewma', plus 'open', 'high',
+            'low', 'close' price matrices for the range-based estimators
+        estimator: One of ESTIMATORS
+        window: Bars per estimate (warm-up length for 'ewma')
+    """
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unsupported estimator '{estimator}'. Use one of {ESTIMATORS}")
+    if estimator == 'close':
+        return rolling_std(bars['return'], window)
+    if estimator == 'ewma':
+        return np.sqrt(_ewma_variance(bars['return'], window))
+    if estimator == 'yang_zhang':
+        if window < 2:
+            raise ValueError("Volatility window must be at least 2")
+        # overnight and open-to-close variances, blended with Rogers-Satchell; the overnight gap
+        # is from each ticker's own previous bar, and all three terms share the same bars
+        overnight = np.log(bars['open'] / previous_observation(bars['close']))
+        observed = overnight.notna()
+        open_close = np.log(bars['close'] / bars['open']).where(observed)
+        rogers_satchell = range_variance(bars, 'rogers_satchell').where(observed)
+        k = 0.34 / (1.34 + (window + 1) / (window - 1))
+        variance = (rolling_std(overnight, window) ** 2 + k * rolling_std(open_close, window) ** 2
+                    + (1 - k) * rolling_mean(rogers_satchell, window))
+        return np.sqrt(variance)
+    return np.sqrt(rolling_mean(range_variance(bars, estimator), window).clip(lower=0))
+
+def volatility_panel(volatility: pd.DataFrame, periods_per_year: int = 252) -> Dict[str, pd.DataFrame]:
+    """
+    Annualized volatility and z-scores from a date x ticker matrix of per-bar volatility.
+
+    Returns:
+        {'vol': annualized volatility,
+         'zscore': volatility standardized by each ticker's own full-history mean and std}
+    """
+    zscore = (volatility - volatility.mean()) / volatility.std()
+    return {'vol': volatility * (periods_per_year ** 0.5), 'zscore': zscore}
+
+def _ohlc_bars(tickers: List[str], timeframe: str) -> Dict[str, pd.DataFrame]:
+    # daily OHLC from the panel (same price basis as the returns), aggregated into bars of the
+    # timeframe for all tickers at once
+    bars = {field: load_panel(tickers, field=field, sync=(field == 'open')) for field in ['open', 'high', 'low', 'close']}
+    if timeframe != 'daily':
+        labels = bucket_labels(bars['close'].index, timeframe)
+        bars = {field: getattr(frame.groupby(labels), OHLCV_AGG[field])() for field, frame in bars.items()}
+    # a bar needs all four prices
+    complete = np.logical_and.reduce([frame.notna().to_numpy() for frame in bars.values()])
+    return {field: frame.where(complete) for field, frame in bars.items()}
+
+def compute_volatility(tickers: Optional[List[str]] = None, timeframes: Optional[List[str]] = None, window: int = 20, estimator: str = 'close') -> Dict[str, Dict[str, pd.DataFrame]]:
+    """
+    Volatility histories for every ticker and timeframe in one pass. Daily returns (or OHLC
+    prices for the range-based estimators) are loaded from the panel once; weekly and monthly
+    bars are aggregated from them in memory.
+
+    Args:
+        tickers: Ticker symbols (default: sector ETFs from config)
+        timeframes: Subset of 'daily', 'weekly', 'monthly' (default: all three)
+        window: Rolling window in bars of each timeframe
+        estimator: 'close' (close-to-close std), 'parkinson', 'garman_klass',
+            'rogers_satchell', 'yang_zhang' or 'ewma'
+    Returns:
+        {timeframe: {'vol': date x ticker annualized volatility, 'zscore': date x ticker z-scores}}
+    """
+    tickers = list(dict.fromkeys(config['sector_etfs'] if tickers is None else tickers))
+    if not tickers:
+        raise ValueError("No tickers provided and no sector_etfs found in config")
+    timeframes = TIMEFRAMES if timeframes is None else timeframes
+    for tf in timeframes:
+        if tf not in TIMEFRAMES:
+            raise ValueError("timeframe must be 'daily', 'weekly', or 'monthly'")
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unsupported estimator '{estimator}'. Use one of {ESTIMATORS}")
+
+    for ticker in tickers:
+        update_data(ticker)
+
+    result = {}
+    if estimator in ('close', 'ewma'):
+        daily = load_panel(tickers, field='return').dropna(how='all')
+        if daily.empty:
+            raise ValueError(f"None of {tickers} could be retrieved.")
+        for tf in timeframes:
+            bars = {'return': resample_returns(daily, tf)}
+            result[tf] = volatility_panel(estimator_volatility(bars, estimator, window), PERIODS_PER_YEAR[tf])
+    else:
+        for tf in timeframes:
+            bars = _ohlc_bars(tickers, tf)
+            if bars['close'].dropna(how='all').empty:
+                raise ValueError(f"No OHLC data for any of {tickers}.")
+            result[tf] = volatility_panel(estimator_volatility(bars, estimator, window), PERIODS_PER_YEAR[tf])
+    return result
+
+def latest_volatility(volatility: Dict[str, Dict[str, pd.DataFrame]], raw_volatility: bool = False) -> pd.DataFrame:
+    """
+    Latest value of every ticker from compute_volatility output, one column per timeframe
+    ('DailyVol', ... when raw_volatility, else 'DailyZVol', ...), indexed by Ticker.
+    """
+    columns = {}
+    for tf, panels in volatility.items():
+        history = panels['vol' if raw_volatility else 'zscore']
+        col_name = f"{tf.capitalize()}Vol" if raw_volatility else f"{tf.capitalize()}ZVol"
+        # each ticker's last value, even if its history ends before the others
+        columns[col_name] = history.ffill().iloc[-1] if len(history) else pd.Series(np.nan, index=history.columns)
+    df = pd.DataFrame(columns)
+    df.index.name = 'Ticker'
+    return df
+
+def compute_volatility_for_timeframe(ticker: str, timeframe: str = 'daily', window: int = 20, raw_volatility: bool = False, estimator: str = 'close') -> Optional[float]:
     """
     Compute volatility for a single timeframe.
     Args:
@@ -11,59 +211,34 @@ def compute_volatility_for_timeframe(ticker: str, timeframe: str = 'daily', wind
         timeframe: 'daily', 'weekly', or 'monthly'
         window: Rolling window for volatility calculation (default: 20)
         raw_volatility: If True, return raw annualized volatility; if False, return z-score
+        estimator: Volatility estimator, see compute_volatility
     Returns:
         Single volatility value (float) or None on error
     """
     try:
-        update_data(ticker)
-        cum_returns = get_cumulative_returns(ticker, timeframe=timeframe)
-        returns = cum_returns.pct_change().dropna()
-
-        rolling_vol = returns.rolling(window).std()
-
-        if raw_volatility:
-            periods_per_year = {'daily': 252, 'weekly': 52, 'monthly': 12}[timeframe]
-            annualized_vol = rolling_vol * (periods_per_year ** 0.5)
-            latest_vol = annualized_vol.iloc[-1]
-            if isinstance(latest_vol, pd.Series):
-                latest_vol = latest_vol.iloc[0]
-            return latest_vol
-        else:
-            zscore_vol = (rolling_vol - rolling_vol.mean()) / rolling_vol.std()
-            latest_z = zscore_vol.iloc[-1]
-            if isinstance(latest_z, pd.Series):
-                latest_z = latest_z.iloc[0]
-            return latest_z
-
+        latest = latest_volatility(compute_volatility([ticker], [timeframe], window, estimator), raw_volatility)
+        return latest.iloc[0, 0]
     except Exception as e:
         print(f"Error processing {ticker} for {timeframe}: {e}")
         return None
 
-def get_volatility_data(tickers: Optional[List[str]] = None, timeframe: str = 'daily', window: int = 20, raw_volatility: bool = False) -> pd.DataFrame:
+def get_volatility_data(tickers: Optional[List[str]] = None, timeframe: Optional[str] = 'daily', window: int = 20, raw_volatility: bool = False, volatility: Optional[dict] = None, estimator: str = 'close') -> pd.DataFrame:
     """
-    Calculate volatility for a list of tickers for a specific timeframe.
+    Calculate volatility for a list of tickers.
     Args:
         tickers: List of ticker symbols (if None, uses sector ETFs from config)
-        timeframe: 'daily', 'weekly', or 'monthly'
+        timeframe: 'daily', 'weekly', 'monthly', or None for all three
         window: Rolling window for volatility calculation (default: 20)
         raw_volatility: If True, return raw annualized volatility; if False, return z-scores
+        volatility: Precomputed compute_volatility output to reuse
+        estimator: Volatility estimator, see compute_volatility
     Returns:
-        DataFrame with ticker and its volatility for the given timeframe
+        DataFrame with ticker and its volatility for each requested timeframe
     """
-    from config.helper import get_sector_config
-
-    config = get_sector_config()
-    if tickers is None:
-        tickers = config['sector_etfs']
-    if not tickers:
-        raise ValueError("No tickers provided and no sector_etfs found in config")
-
-    records = []
-    for ticker in tickers:
-        vol = compute_volatility_for_timeframe(ticker, timeframe, window, raw_volatility)
-        col_name = f"{timeframe.capitalize()}Vol" if raw_volatility else f"{timeframe.capitalize()}ZVol"
-        records.append({'Ticker': ticker, col_name: vol})
-
-    df = pd.DataFrame(records)
-    df.set_index('Ticker', inplace=True)
-    return df
+    timeframes = TIMEFRAMES if timeframe is None else [timeframe]
+    if volatility is None:
+        volatility = compute_volatility(tickers, timeframes, window, estimator)
+    latest = latest_volatility({tf: volatility[tf] for tf in timeframes}, raw_volatility)
+    if tickers is not None:
+        latest = latest.reindex(list(dict.fromkeys(tickers)))
+    return latest
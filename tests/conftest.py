@@ -0,0 +1,30 @@
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# point data/ at a scratch directory before any src module resolves it at import
+import config.helper as helper
+
+DATA_DIR = Path(tempfile.mkdtemp(prefix='rrg_data_'))
+helper.get_data_dir = lambda: DATA_DIR
+helper.get_data_file = lambda filename: DATA_DIR / filename
+
+
+@pytest.fixture
+def data_dir():
+    """An empty data/ directory with the in-process manifest and freshness state reset."""
+    from src.fetch import freshness, manifest
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+    DATA_DIR.mkdir(parents=True)
+    manifest._entries = None
+    manifest._loaded_mtime = None
+    freshness.invalidate()
+    yield DATA_DIR
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+    manifest._entries = None
+    manifest._loaded_mtime = None
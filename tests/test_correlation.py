@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.process.correlation import rolling_correlation
+
+
+def _returns(rows=300, tickers=('SPY', 'XLK', 'XLF', 'XLE'), seed=0):
+    index = pd.bdate_range('2020-01-01', periods=rows, name='date')
+    rng = np.random.default_rng(seed)
+    returns = pd.DataFrame(rng.normal(0.0003, 0.01, (rows, len(tickers))), index=index, columns=list(tickers))
+    # a late start and a gap, as with a newer listing and a halted ticker
+    returns.iloc[:60, 2] = np.nan
+    returns.iloc[200:204, 3] = np.nan
+    return returns
+
+
+@pytest.mark.parametrize('window, step', [(63, 1), (40, 9), (30, 120)])
+def test_rolling_correlation_matches_each_window(window, step):
+    returns = _returns()
+    result = rolling_correlation(returns, window=window, step=step)
+    assert result['dates'][-1] == returns.index[-1]
+    for date, corr in zip(result['dates'], result['corr']):
+        end = returns.index.get_loc(date)
+        expected = returns.iloc[end - window + 1:end + 1].corr(min_periods=window // 2)
+        np.testing.assert_allclose(corr, expected.to_numpy(), rtol=1e-5, atol=1e-6)
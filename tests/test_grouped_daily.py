@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from src.fetch import grouped_daily
+from src.fetch.manifest import write_artifact, last_date
+from src.fetch.trading_calendar import sessions
+
+
+def _store(ticker, end):
+    index = pd.DatetimeIndex(sessions('2024-01-02', end), name='date').tz_localize('UTC')
+    close = 100 + np.arange(len(index), dtype=float)
+    bars = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 10.0}, index=index)
+    write_artifact(bars, ticker, 'daily_raw')
+    write_artifact(bars[['close']].rename(columns={'close': ticker}).pct_change().dropna(), ticker, 'daily')
+
+
+def test_stale_holdings_do_not_widen_the_grouped_span(data_dir, monkeypatch):
+    _store('AAA', '2024-06-27')
+    _store('BBB', '2024-06-24')
+    _store('OLD', '2024-02-01')
+    requested, individual, backfilled = [], [], []
+
+    def fake_grouped(date):
+        requested.append(date)
+        return pd.DataFrame({'close': [200.0, 300.0], 'open': 1.0, 'high': 1.0, 'low': 1.0, 'volume': 1.0,
+                             'date': pd.Timestamp(date)}, index=pd.Index(['AAA', 'BBB'], name='ticker'))
+
+    monkeypatch.setattr(grouped_daily, 'fetch_grouped_daily', fake_grouped)
+    monkeypatch.setattr(grouped_daily, 'update_data', individual.append)
+    monkeypatch.setattr(grouped_daily, 'fetch', lambda tickers, **kwargs: backfilled.extend(tickers))
+
+    result = grouped_daily.update_grouped(['AAA', 'BBB', 'OLD', 'NEW'], end_date='2024-06-28')
+    assert requested == ['2024-06-25', '2024-06-26', '2024-06-27', '2024-06-28']
+    assert result['written'] == {'AAA': 1, 'BBB': 4}
+    assert result['laggards'] == ['OLD'] and individual == ['OLD']
+    assert result['backfilled'] == ['NEW'] and backfilled == ['NEW']
+    assert last_date('BBB', 'daily_raw').date() == pd.Timestamp('2024-06-28').date()
+
+
+def _unexpected_request(date):
+    raise AssertionError(f"unexpected grouped request for {date}")
+
+
+def test_current_holdings_make_no_requests(data_dir, monkeypatch):
+    _store('AAA', '2024-06-28')
+    monkeypatch.setattr(grouped_daily, 'fetch_grouped_daily', _unexpected_request)
+    result = grouped_daily.update_grouped(['AAA'], end_date='2024-06-28')
+    assert result == {'written': {}, 'laggards': [], 'backfilled': []}
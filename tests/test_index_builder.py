@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.process.index_builder import build_index, weight_schedule
+
+
+def _prices(tz=None, rows=260, seed=0):
+    index = pd.bdate_range('2020-01-01', periods=rows, tz=tz, name='date')
+    rng = np.random.default_rng(seed)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (rows, 3)), axis=0))
+    return pd.DataFrame(values, index=index, columns=['A', 'B', 'C'])
+
+
+def test_daily_rebalance_is_weighted_mean_of_returns():
+    prices = _prices()
+    result = build_index(prices, {'A': 0.5, 'B': 0.3, 'C': 0.2}, rebalance='daily')
+    expected = prices.pct_change() @ pd.Series({'A': 0.5, 'B': 0.3, 'C': 0.2})
+    np.testing.assert_allclose(result['returns'].iloc[1:], expected.iloc[1:], rtol=1e-9, atol=1e-15)
+
+
+def test_buy_and_hold_tracks_units():
+    prices = _prices()
+    result = build_index(prices, {'A': 1.0, 'B': 1.0}, rebalance=None, base=100.0)
+    units = 0.5 / prices[['A', 'B']].iloc[0]
+    expected = 100.0 * (prices[['A', 'B']] * units).sum(axis=1)
+    np.testing.assert_allclose(result['level'], expected, rtol=1e-9, atol=1e-15)
+
+
+def test_dated_weights_switch_on_schedule_date():
+    prices = _prices()
+    weights = {'2020-01-01': {'A': 1.0}, '2020-06-01': {'C': 1.0}}
+    result = build_index(prices, weights, rebalance=None)
+    returns = prices.pct_change()
+    switch = prices.index.searchsorted(pd.Timestamp('2020-06-01'))
+    # held from the close of the switch date on
+    np.testing.assert_allclose(result['returns'].iloc[1:switch + 1], returns['A'].iloc[1:switch + 1], rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(result['returns'].iloc[switch + 1:], returns['C'].iloc[switch + 1:], rtol=1e-9, atol=1e-15)
+
+
+@pytest.mark.parametrize('weights', [
+    {'A': 0.6, 'B': 0.4},
+    {'2019-12-01': {'A': 0.6, 'B': 0.4}, '2020-05-15': {'B': 0.5, 'C': 0.5}},
+])
+def test_utc_index_matches_naive_index(weights):
+    naive = build_index(_prices(), weights, rebalance='quarterly')
+    utc = build_index(_prices(tz='UTC'), weights, rebalance='quarterly')
+    assert utc['level'].index.tz is not None
+    np.testing.assert_allclose(utc['level'].to_numpy(), naive['level'].to_numpy(), rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(utc['weights'].to_numpy(), naive['weights'].to_numpy(), rtol=1e-9, atol=1e-15)
+
+
+def test_renormalizes_over_listed_constituents():
+    prices = _prices()
+    prices.loc[:'2020-03-31', 'C'] = np.nan
+    result = build_index(prices, {'A': 1.0, 'B': 1.0, 'C': 2.0}, rebalance='quarterly')
+    before = result['weights'].loc['2020-02-03']
+    assert before['C'] == 0.0
+    assert before.sum() == pytest.approx(1.0)
+    # C starts trading in April but only joins at the quarter-end rebalance
+    assert result['weights'].loc['2020-04-01', 'C'] == 0.0
+    assert result['weights'].loc['2020-07-01', 'C'] == pytest.approx(0.5)
+
+
+def test_schedule_dates_are_naive():
+    schedule = weight_schedule(pd.DataFrame({'A': [1.0]}, index=pd.DatetimeIndex(['2020-01-01'], tz='UTC')))
+    assert schedule.index.tz is None
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.stattools import grangercausalitytests
+
+from src.process import lead_lag
+from src.process.lead_lag import _granger_pvalues, best_lags, lagged_correlations, rolling_lead_lag
+
+
+def _returns(rows=400, tickers=('SPY', 'XLK', 'XLF', 'XLE'), seed=0):
+    index = pd.bdate_range('2020-01-01', periods=rows, name='date')
+    rng = np.random.default_rng(seed)
+    returns = pd.DataFrame(rng.normal(0.0003, 0.01, (rows, len(tickers))), index=index, columns=list(tickers))
+    # a late start and a gap, as with a newer listing and a halted ticker
+    returns.iloc[:60, 2] = np.nan
+    returns.iloc[200:204, 3] = np.nan
+    return returns
+
+
+def test_lagged_correlations_match_shifted_pandas_corr():
+    returns = _returns()
+    lags, corr = lagged_correlations(returns, max_lag=3)
+    for k, lag in enumerate(lags):
+        for i, a in enumerate(returns.columns):
+            for j, b in enumerate(returns.columns):
+                expected = returns[a].corr(returns[b].shift(-lag))
+                assert corr[k, i, j] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('step', [1, 7, 80])
+def test_rolling_lead_lag_matches_each_window(step):
+    returns = _returns()
+    window = 60
+    result = rolling_lead_lag(returns, window=window, max_lag=3, step=step)
+    assert len(result['dates']) == len(range(window - 1, len(returns), step))
+    for i, date in enumerate(result['dates']):
+        end = returns.index.get_loc(date)
+        lag, corr = best_lags(*lagged_correlations(returns.iloc[end - window + 1:end + 1], max_lag=3))
+        np.testing.assert_allclose(result['corr'][i], corr, rtol=1e-5, atol=1e-6)
+        np.testing.assert_array_equal(result['lag'][i], np.nan_to_num(lag))
+
+
+def test_granger_pvalues_match_statsmodels():
+    returns = _returns().iloc[1:]
+    values = returns.to_numpy()
+    pvalues = _granger_pvalues(values[:, 1], values, max_lag=3, test='ssr_ftest')
+    for leader in ['XLF', 'XLE']:
+        column = returns.columns.get_loc(leader)
+        pair = returns[['XLK', leader]].dropna()
+        result = grangercausalitytests(pair, maxlag=3)
+        expected = [result[lag][0]['ssr_ftest'][1] for lag in range(1, 4)]
+        np.testing.assert_allclose(pvalues[column], expected, rtol=1e-7)
+
+
+class _Pool:
+    started = []
+
+    def __init__(self, max_workers, initializer, initargs):
+        self.started.append(max_workers)
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+@pytest.mark.parametrize('n_jobs, min_work, pooled', [(None, None, False), (None, 0, True), (2, None, True), (1, 0, False)])
+def test_granger_only_starts_a_pool_for_large_work(monkeypatch, n_jobs, min_work, pooled):
+    returns = _returns()
+    monkeypatch.setattr(lead_lag, 'get_returns_panel', lambda tickers, timeframe: returns[tickers])
+    monkeypatch.setattr(lead_lag, 'ProcessPoolExecutor', _Pool)
+    monkeypatch.setattr(_Pool, 'started', [])
+    monkeypatch.setattr(lead_lag.os, 'cpu_count', lambda: 4)
+    if min_work is not None:
+        monkeypatch.setattr(lead_lag, 'GRANGER_POOL_MIN_WORK', min_work)
+    tickers = list(returns.columns)
+    result = lead_lag.granger_lead_lag_matrix(tickers, max_lag=3, n_jobs=n_jobs)
+    assert bool(_Pool.started) is pooled
+    assert result.loc['XLF', 'XLK'][1] in range(1, 4)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from src.fetch.manifest import base_version, get_entry, write_artifact
+from src.fetch.storage import append_bars, compact
+from src.fetch.panel import load_panel
+
+
+def _bars(start, end, seed=0, scale=1.0):
+    index = pd.bdate_range(start, end, name='date')
+    rng = np.random.default_rng(seed)
+    close = 100 * scale * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1000.0}, index=index)
+
+
+def _store(ticker, bars):
+    write_artifact(bars, ticker, 'daily_raw')
+    returns = bars[['close']].rename(columns={'close': ticker}).pct_change().dropna()
+    write_artifact(returns, ticker, 'daily')
+    return returns[ticker]
+
+
+def test_appended_bars_reach_the_panel(data_dir):
+    bars = _bars('2010-01-04', '2012-06-29')
+    _store('AAA', bars.loc[:'2011-12-30'])
+    load_panel(['AAA'], field='return')
+    append_bars('AAA', bars.loc['2012-01-01':])
+    panel = load_panel(['AAA'], field='close')
+    pd.testing.assert_series_equal(panel['AAA'], bars['close'], check_names=False, check_freq=False)
+
+
+def test_rewritten_history_replaces_every_year(data_dir):
+    _store('AAA', _bars('2010-01-04', '2012-06-29', seed=1))
+    load_panel(['AAA'], field='return')
+
+    rewritten = _bars('2010-01-04', '2012-06-29', seed=2)
+    expected = _store('AAA', rewritten)
+    panel = load_panel(['AAA'], field='return')
+    pd.testing.assert_series_equal(panel['AAA'].dropna(), expected, check_names=False, check_freq=False)
+
+
+def test_later_start_drops_uncovered_years(data_dir):
+    _store('AAA', _bars('2010-01-04', '2012-06-29', seed=1))
+    _store('BBB', _bars('2010-01-04', '2012-06-29', seed=3))
+    load_panel(['AAA', 'BBB'], field='close')
+
+    _store('AAA', _bars('2011-03-01', '2012-06-29', seed=4))
+    panel = load_panel(['AAA', 'BBB'], field='close')
+    assert panel.loc[:'2011-02-28', 'AAA'].isna().all()
+    assert panel.loc['2011-03-01':, 'AAA'].notna().all()
+    assert panel['BBB'].notna().all()
+
+
+def test_compaction_keeps_the_base_version(data_dir):
+    bars = _bars('2010-01-04', '2012-06-29')
+    _store('AAA', bars.loc[:'2011-12-30'])
+    before = base_version(get_entry('AAA', 'daily'))
+    append_bars('AAA', bars.loc['2012-01-01':])
+    assert compact('AAA') == 2
+    assert base_version(get_entry('AAA', 'daily')) == before
+    assert get_entry('AAA', 'daily')['deltas'] == []
+
+
+def test_close_and_return_fields_share_a_price_basis(data_dir):
+    bars = _bars('2010-01-04', '2012-06-29')
+    # a Tiingo-style dividend adjustment on the adj* columns
+    for field in ['open', 'high', 'low', 'close']:
+        bars[f'adj{field.title()}'] = bars[field] * np.where(bars.index < '2011-06-01', 0.98, 1.0)
+    _store('AAA', bars)
+    close = load_panel(['AAA'], field='close')
+    returns = load_panel(['AAA'], field='return')
+    pd.testing.assert_series_equal(close['AAA'].pct_change().dropna(), returns['AAA'].dropna(), check_freq=False)
@@ -0,0 +1,59 @@
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fetch import price_data
+from src.fetch.manifest import get_entry, write_artifact
+from src.fetch.storage import read_artifact
+from src.fetch.update_data import plan_update
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+def _tiingo_rows(start, end):
+    dates = pd.bdate_range(start, end)
+    close = 100 + np.arange(len(dates)) * 0.5
+    return [{'date': d.strftime('%Y-%m-%d'), 'close': c, 'adjClose': c} for d, c in zip(dates, close)]
+
+
+@pytest.fixture
+def returns_only(data_dir, monkeypatch):
+    """XLK with stored returns but no raw bars, and a provider serving any requested span."""
+    requested = []
+
+    def fake_get(url):
+        query = parse_qs(urlsplit(url).query)
+        requested.append(query['startDate'][0])
+        return _Response(_tiingo_rows(query['startDate'][0], min(query['endDate'][0], '2024-06-28')))
+
+    monkeypatch.setattr(price_data, 'http_get', fake_get)
+    monkeypatch.setattr(price_data, 'default_start_date', '2024-01-02')
+    bars = pd.DataFrame(_tiingo_rows('2024-01-02', '2024-06-27')).set_index('date')
+    bars.index = pd.to_datetime(bars.index)
+    write_artifact(bars[['close']].rename(columns={'close': 'XLK'}).pct_change().dropna(), 'XLK', 'daily')
+    return requested
+
+
+def test_update_without_raw_bars_refetches_the_full_history(returns_only):
+    stored = len(read_artifact('XLK', 'daily'))
+    report = price_data.fetch_ticker('XLK', start_date='2024-06-28', end_date='2024-06-28', update=True)
+    assert report['status'] == 'ok'
+    assert returns_only == ['2024-01-02']
+    # the missing session is added, nothing stored is lost
+    assert len(read_artifact('XLK', 'daily')) == stored + 1
+    assert get_entry('XLK', 'daily_raw')['first_date'].startswith('2024-01-02')
+
+
+def test_plan_is_full_without_raw_bars(returns_only):
+    assert plan_update('XLK') == {'action': 'full'}
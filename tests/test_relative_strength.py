@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.process.relative_strength import relative_strength_panel
+from src.process.rs_momentum import rolling_slope
+
+
+def _cumulative(rows=400, tickers=('SPY', 'XLK', 'XLF', 'XLE'), seed=0):
+    index = pd.bdate_range('2020-01-01', periods=rows, name='date')
+    rng = np.random.default_rng(seed)
+    returns = pd.DataFrame(rng.normal(0.0003, 0.01, (rows, len(tickers))), index=index, columns=list(tickers))
+    # a late start and a gap, as with a newer listing and a halted ticker
+    returns.iloc[:60, 2] = np.nan
+    returns.iloc[200:204, 3] = np.nan
+    return (1 + returns).cumprod()
+
+
+def _pair_rs(target, benchmark, lookback_days, normalize):
+    # the per-pair computation the panel version replaced
+    aligned = pd.concat([target, benchmark], axis=1, join='outer').ffill().dropna()
+    if lookback_days is not None:
+        aligned = aligned.tail(lookback_days + 1)
+    rs = aligned.iloc[:, 0] / aligned.iloc[:, 1]
+    return rs / rs.iloc[0] if normalize else rs
+
+
+@pytest.mark.parametrize('lookback_days, normalize', [(None, False), (None, True), (30, True), (250, True)])
+def test_panel_rs_matches_pairwise_rs(lookback_days, normalize):
+    prices = _cumulative()
+    panel = relative_strength_panel(prices, 'SPY', lookback_days, normalize)
+    for ticker in ['XLK', 'XLF', 'XLE']:
+        expected = _pair_rs(prices[ticker], prices['SPY'], lookback_days, normalize)
+        np.testing.assert_allclose(panel[ticker].dropna(), expected, rtol=1e-12)
+        assert panel[ticker].dropna().index.equals(expected.index)
+
+
+def test_rolling_slope_matches_linregress():
+    rs = relative_strength_panel(_cumulative(), 'SPY', normalize=False)
+    slopes = rolling_slope(rs, 5)
+    for ticker in ['XLK', 'XLE']:
+        values = rs[ticker].to_numpy()
+        for end in [4, 100, len(values) - 1]:
+            expected = stats.linregress(np.arange(5), values[end - 4:end + 1]).slope
+            assert slopes[ticker].iloc[end] == pytest.approx(expected, rel=1e-9)
+    assert slopes.iloc[:4].isna().all().all()
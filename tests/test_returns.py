@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from src.fetch.manifest import write_artifact
+from src.process import returns as returns_module
+
+
+def _returns(ticker, seed, drop=()):
+    index = pd.bdate_range('2020-01-01', '2020-12-31', name='date')
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({ticker: rng.normal(0, 0.01, len(index))}, index=index)
+    return frame.drop(index[list(drop)])
+
+
+def test_returns_panel_keeps_the_first_return_after_a_gap(data_dir, monkeypatch):
+    monkeypatch.setattr(returns_module, 'update_data', lambda ticker: None)
+    aaa = _returns('AAA', 1, drop=range(50, 55))
+    bbb = _returns('BBB', 2)
+    write_artifact(aaa, 'AAA', 'daily')
+    write_artifact(bbb, 'BBB', 'daily')
+
+    panel = returns_module.get_returns_panel(['AAA', 'BBB'])
+    pd.testing.assert_series_equal(panel['AAA'].dropna(), aaa['AAA'], check_names=False, check_freq=False)
+    pd.testing.assert_series_equal(panel['BBB'], bbb['BBB'], check_names=False, check_freq=False)
+
+
+def test_weekly_returns_compound_the_daily_ones(data_dir, monkeypatch):
+    monkeypatch.setattr(returns_module, 'update_data', lambda ticker: None)
+    aaa = _returns('AAA', 1)
+    write_artifact(aaa, 'AAA', 'daily')
+
+    weekly = returns_module.get_returns_panel(['AAA'], 'weekly')['AAA']
+    expected = (1 + aaa['AAA']).resample('W-SUN').prod() - 1
+    # the first week does not start from a prior close and is dropped
+    np.testing.assert_allclose(weekly, expected.iloc[1:], rtol=1e-12)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fetch import storage
+from src.fetch.manifest import get_entry, write_artifact
+from src.fetch.storage import append_artifact, append_bars, compact, read_artifact, read_range, read_tail
+
+
+def _bars(start='2018-01-01', end='2020-12-31', seed=0, tz=None):
+    index = pd.bdate_range(start, end, name='date', tz=tz)
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    return pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close, 'volume': 1000.0}, index=index)
+
+
+def _append_in_chunks(frame, ticker, artifact, first, chunk):
+    write_artifact(frame.iloc[:first], ticker, artifact)
+    for start in range(first, len(frame), chunk):
+        append_artifact(frame.iloc[start:start + chunk], ticker, artifact)
+
+
+@pytest.mark.parametrize('tz', [None, 'UTC'])
+def test_appended_deltas_read_back_as_the_full_frame(data_dir, tz):
+    bars = _bars(tz=tz)
+    _append_in_chunks(bars, 'AAA', 'daily_raw', 500, 7)
+    entry = get_entry('AAA', 'daily_raw')
+    assert entry['rows'] == len(bars)
+    assert len(entry['deltas']) > 0
+    pd.testing.assert_frame_equal(read_artifact('AAA', 'daily_raw'), bars, check_freq=False)
+
+
+def test_range_and_tail_reads_match_slices(data_dir):
+    bars = _bars()
+    _append_in_chunks(bars, 'AAA', 'daily_raw', 700, 5)
+    pd.testing.assert_frame_equal(read_range('AAA', 'daily_raw', '2019-03-01', '2020-11-15'), bars.loc['2019-03-01':'2020-11-15'], check_freq=False)
+    pd.testing.assert_frame_equal(read_range('AAA', 'daily_raw', start_date='2020-12-01'), bars.loc['2020-12-01':], check_freq=False)
+    for rows in [1, 3, 30, 400]:
+        pd.testing.assert_frame_equal(read_tail('AAA', 'daily_raw', rows), bars.tail(rows), check_freq=False)
+
+
+def test_replace_last_supersedes_the_stored_row(data_dir):
+    bars = _bars()
+    write_artifact(bars.iloc[:-5], 'AAA', 'weekly_raw')
+    update = bars.iloc[-6:].copy()
+    update.iloc[0, update.columns.get_loc('close')] = -1.0
+    append_artifact(update, 'AAA', 'weekly_raw', replace_last=True)
+    stored = read_artifact('AAA', 'weekly_raw')
+    assert len(stored) == len(bars) == get_entry('AAA', 'weekly_raw')['rows']
+    assert stored['close'].iloc[-6] == -1.0
+    assert read_tail('AAA', 'weekly_raw', 6)['close'].iloc[0] == -1.0
+
+
+def test_compaction_round_trip(data_dir, monkeypatch):
+    monkeypatch.setattr(storage, 'max_deltas', 4)
+    bars = _bars()
+    _append_in_chunks(bars, 'AAA', 'daily_raw', 600, 10)
+    # every fourth append folds the deltas into the base file
+    assert len(get_entry('AAA', 'daily_raw')['deltas']) < 4
+    before = read_artifact('AAA', 'daily_raw')
+
+    compact('AAA', 'daily_raw')
+    entry = get_entry('AAA', 'daily_raw')
+    assert entry['deltas'] == []
+    assert not (data_dir / 'deltas' / 'AAA_daily_raw').exists()
+    pd.testing.assert_frame_equal(read_artifact('AAA', 'daily_raw'), before)
+    pd.testing.assert_frame_equal(before, bars, check_freq=False)
+
+
+def test_append_bars_matches_full_returns(data_dir):
+    bars = _bars()
+    write_artifact(bars.iloc[:400], 'AAA', 'daily_raw')
+    write_artifact(bars[['close']].iloc[:400].rename(columns={'close': 'AAA'}).pct_change().dropna(), 'AAA', 'daily')
+    for start in range(400, len(bars), 50):
+        # overlapping windows: rows already stored are skipped
+        assert append_bars('AAA', bars.iloc[start - 3:start + 50]) == len(bars.iloc[start:start + 50])
+
+    expected = bars[['close']].rename(columns={'close': 'AAA'}).pct_change().dropna()
+    pd.testing.assert_frame_equal(read_artifact('AAA', 'daily'), expected, check_freq=False)
+    pd.testing.assert_frame_equal(read_artifact('AAA', 'daily_raw'), bars, check_freq=False)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fetch.manifest import write_artifact
+from src.fetch.storage import append_artifact
+from src.process.streaming import StreamingState, update_streaming_state
+
+
+def _returns(ticker, start, end, seed):
+    index = pd.bdate_range(start, end, name='date')
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({ticker: rng.normal(0.0005, 0.01, len(index))}, index=index)
+
+
+def _replay(ticker_returns, benchmark_returns):
+    state = StreamingState('AAA', 'SPY')
+    bars = pd.concat({'ticker': ticker_returns, 'benchmark': benchmark_returns}, axis=1).sort_index()
+    for date, ticker_return, benchmark_return in bars.itertuples():
+        state.advance(date, ticker_return, benchmark_return)
+    return state.snapshot()
+
+
+def _assert_snapshots_equal(actual, expected):
+    assert actual['date'] == expected['date']
+    for key in ['rs', 'momentum', 'volatility']:
+        assert actual[key] == pytest.approx(expected[key], rel=1e-9)
+
+
+def test_appended_bars_match_full_replay(data_dir):
+    aaa = _returns('AAA', '2020-01-01', '2020-12-31', seed=1)
+    spy = _returns('SPY', '2020-01-01', '2020-12-31', seed=2)
+    write_artifact(aaa.loc[:'2020-09-30'], 'AAA', 'daily')
+    write_artifact(spy.loc[:'2020-09-30'], 'SPY', 'daily')
+    update_streaming_state('AAA', 'SPY', fetch=False)
+
+    append_artifact(aaa.loc['2020-10-01':], 'AAA', 'daily')
+    append_artifact(spy.loc['2020-10-01':], 'SPY', 'daily')
+    snapshot = update_streaming_state('AAA', 'SPY', fetch=False)
+    _assert_snapshots_equal(snapshot, _replay(aaa['AAA'], spy['SPY']))
+
+
+def test_rewritten_history_rebuilds_the_state(data_dir):
+    spy = _returns('SPY', '2020-01-01', '2020-12-31', seed=2)
+    write_artifact(_returns('AAA', '2020-01-01', '2020-12-31', seed=1), 'AAA', 'daily')
+    write_artifact(spy, 'SPY', 'daily')
+    update_streaming_state('AAA', 'SPY', fetch=False)
+
+    # same first and last date, different values
+    rewritten = _returns('AAA', '2020-01-01', '2020-12-31', seed=3)
+    write_artifact(rewritten, 'AAA', 'daily')
+    snapshot = update_streaming_state('AAA', 'SPY', fetch=False)
+    _assert_snapshots_equal(snapshot, _replay(rewritten['AAA'], spy['SPY']))
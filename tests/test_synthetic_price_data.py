@@ -0,0 +1,115 @@
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fetch import rate_limit, synthetic_price_data
+from src.fetch.manifest import get_entry, rebuild_manifest, write_artifact
+from src.fetch.price_data import fetch, fetch_ticker, synthetic_params
+
+
+def _constituent(ticker, tz='UTC'):
+    index = pd.bdate_range('2017-01-02', '2018-06-15', tz=tz, name='date')
+    rng = np.random.default_rng(len(ticker))
+    return pd.DataFrame({ticker: 50 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))}, index=index)
+
+
+def test_build_synthetic_from_utc_constituents(data_dir, monkeypatch):
+    monkeypatch.setattr(synthetic_price_data, '_fetch_constituent', lambda ticker, tempticker, *args: _constituent(tempticker))
+    returns, complete = synthetic_price_data.build_synthetic('XLC', {'META': 0.6, 'GOOG': 0.4}, '2017-01-01', '2018-06-18', None, None)
+    assert complete
+    assert len(returns) == len(_constituent('META')) - 1
+    assert get_entry('XLC', 'synthetic_prices_raw') is not None
+
+
+def test_failed_build_leaves_no_raw_artifact(data_dir, monkeypatch):
+    def failing_build(*args, **kwargs):
+        raise ValueError("build failed")
+
+    monkeypatch.setattr(synthetic_price_data, '_fetch_constituent', lambda ticker, tempticker, *args: _constituent(tempticker))
+    monkeypatch.setattr(synthetic_price_data, 'build_index', failing_build)
+    with pytest.raises(ValueError):
+        synthetic_price_data.build_synthetic('XLC', {'META': 0.6, 'GOOG': 0.4}, '2017-01-01', '2018-06-18', None, None)
+    assert get_entry('XLC', 'synthetic_prices_raw') is None
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.mark.parametrize('response, status', [
+    (ValueError("connection reset"), 'error'),
+    ([], 'empty'),
+    ([{'date': '2019-01-02', 'close': 45.0}, {'date': '2019-01-03', 'close': 46.0}], 'ok'),
+])
+def test_real_segment_outcome_is_reported(data_dir, monkeypatch, response, status):
+    def fake_get(url):
+        if isinstance(response, Exception):
+            raise response
+        return _Response(response)
+
+    monkeypatch.setattr(synthetic_price_data, 'http_get', fake_get)
+    report = fetch_ticker('XLC', start_date='2019-01-01', end_date='2019-01-04')
+    assert report['status'] == status
+
+
+def test_appended_real_bars_report_the_rows_stored(data_dir, monkeypatch):
+    real = pd.DataFrame({'close': [45.0, 46.0]}, index=pd.DatetimeIndex(['2019-01-02', '2019-01-03'], name='date'))
+    write_artifact(real, 'XLC', 'real_raw')
+    write_artifact(real.rename(columns={'close': 'XLC'}).pct_change().dropna(), 'XLC', 'daily')
+    rows = [{'date': '2019-01-03', 'close': 46.0}, {'date': '2019-01-04', 'close': 47.0}]
+    monkeypatch.setattr(synthetic_price_data, 'http_get', lambda url: _Response(rows))
+
+    report = fetch_ticker('XLC', start_date='2019-01-03', end_date='2019-01-04', update=True)
+    assert (report['status'], report['rows']) == ('ok', 1)
+    # already stored: received but nothing new
+    report = fetch_ticker('XLC', start_date='2019-01-03', end_date='2019-01-04', update=True)
+    assert (report['status'], report['rows']) == ('ok', 0)
+
+
+def _tiingo_rows(start, end):
+    dates = pd.bdate_range(start, end)
+    close = 40 + np.arange(len(dates)) * 0.1
+    return [{'date': d.strftime('%Y-%m-%d'), 'close': c, 'adjClose': c} for d, c in zip(dates, close)]
+
+
+def test_constituents_share_the_tiingo_slots(data_dir, monkeypatch):
+    monkeypatch.setattr(rate_limit, '_limiters', {})
+    rate_limit.configure_provider('tiingo', max_concurrency=1, rate=1000, burst=1000)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_get(url):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        query = parse_qs(urlsplit(url).query)
+        rows = _tiingo_rows(query['startDate'][0], min(query['endDate'][0], '2018-12-31'))
+        with lock:
+            active[0] -= 1
+        return _Response(rows)
+
+    monkeypatch.setattr(synthetic_price_data, 'http_get', fake_get)
+    reports = {}
+    # a slot held for XLC itself would leave its constituents waiting forever
+    worker = threading.Thread(target=lambda: reports.update(fetch(['XLC'], start_date='2018-01-02', end_date='2018-12-31')), daemon=True)
+    worker.start()
+    worker.join(timeout=30)
+    assert not worker.is_alive()
+    assert reports['XLC']['status'] == 'ok'
+    assert peak[0] == 1
+
+    # the cached segment's manifest row survives a rebuild of the manifest
+    assert get_entry('XLC', 'synthetic') is not None
+    rebuild_manifest()
+    assert get_entry('XLC', 'synthetic') is not None
+    assert set(synthetic_params['XLC']['weights']) <= set(pd.read_parquet(data_dir / 'XLC_synthetic_prices_raw.parquet').columns)
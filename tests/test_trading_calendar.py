@@ -0,0 +1,56 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from src.fetch.trading_calendar import (
+    EXCHANGE_TZ, early_closes, holidays, is_session, last_completed_session, missing_sessions, sessions
+)
+
+# published NYSE full-day closures
+NYSE_HOLIDAYS = {
+    2021: ['2021-01-01', '2021-01-18', '2021-02-15', '2021-04-02', '2021-05-31', '2021-07-05',
+           '2021-09-06', '2021-11-25', '2021-12-24'],
+    2022: ['2022-01-17', '2022-02-21', '2022-04-15', '2022-05-30', '2022-06-20', '2022-07-04',
+           '2022-09-05', '2022-11-24', '2022-12-26'],
+    2024: ['2024-01-01', '2024-01-15', '2024-02-19', '2024-03-29', '2024-05-27', '2024-06-19',
+           '2024-07-04', '2024-09-02', '2024-11-28', '2024-12-25'],
+    2025: ['2025-01-01', '2025-01-09', '2025-01-20', '2025-02-17', '2025-04-18', '2025-05-26',
+           '2025-06-19', '2025-07-04', '2025-09-01', '2025-11-27', '2025-12-25'],
+}
+
+
+@pytest.mark.parametrize('year', sorted(NYSE_HOLIDAYS))
+def test_holidays_match_the_published_schedule(year):
+    assert sorted(d.isoformat() for d in holidays(year)) == NYSE_HOLIDAYS[year]
+
+
+def test_saturday_new_year_is_not_observed_on_friday():
+    # Jan 1 2022 was a Saturday; Dec 31 2021 was a regular session
+    assert is_session(date(2021, 12, 31))
+
+
+def test_early_closes():
+    assert sorted(d.isoformat() for d in early_closes(2024)) == ['2024-07-03', '2024-11-29', '2024-12-24']
+
+
+def test_sessions_skip_weekends_and_holidays():
+    days = sessions('2024-06-28', '2024-07-08')
+    assert [d.strftime('%Y-%m-%d') for d in days] == ['2024-06-28', '2024-07-01', '2024-07-02', '2024-07-03', '2024-07-05', '2024-07-08']
+
+
+@pytest.mark.parametrize('now, expected', [
+    (datetime(2024, 7, 5, 17, 30), date(2024, 7, 5)),    # after the close plus the data delay
+    (datetime(2024, 7, 5, 16, 30), date(2024, 7, 3)),    # bar not yet published; Jul 4 is a holiday
+    (datetime(2024, 7, 3, 14, 30), date(2024, 7, 3)),    # 13:00 early close
+    (datetime(2024, 7, 6, 12, 0), date(2024, 7, 5)),     # weekend
+])
+def test_last_completed_session(now, expected):
+    assert last_completed_session(now.replace(tzinfo=EXCHANGE_TZ)) == expected
+
+
+def test_missing_sessions_after_utc_last_date():
+    now = datetime(2024, 7, 8, 18, 0, tzinfo=EXCHANGE_TZ)
+    missing = missing_sessions(pd.Timestamp('2024-06-28', tz='UTC'), now)
+    assert [d.strftime('%Y-%m-%d') for d in missing] == ['2024-07-01', '2024-07-02', '2024-07-03', '2024-07-05', '2024-07-08']
+    assert len(missing_sessions(pd.Timestamp('2024-07-08'), now)) == 0
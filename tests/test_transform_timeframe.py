@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fetch.freshness import is_fresh, mark_fresh
+from src.fetch.manifest import write_artifact
+from src.fetch import storage
+from src.fetch.storage import append_bars, read_artifact
+from src.process.transform_timeframe import bucket_labels, compound_returns, resample_bars, update_resampled
+
+
+def _store(ticker, start, end, seed=0):
+    index = pd.bdate_range(start, end, name='date')
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    bars = pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close, 'volume': 1000.0}, index=index)
+    write_artifact(bars, ticker, 'daily_raw')
+    write_artifact(bars[['close']].rename(columns={'close': ticker}).pct_change().dropna(), ticker, 'daily')
+    return bars
+
+
+@pytest.mark.parametrize('freq', ['weekly', 'monthly', 'quarterly', '10session'])
+def test_incremental_resample_matches_full_resample(data_dir, monkeypatch, freq):
+    # compact every few appends, so updates also run over freshly compacted files
+    monkeypatch.setattr(storage, 'max_deltas', 5)
+    bars = _store('AAA', '2019-01-01', '2020-09-30')
+    write_artifact(bars.loc[:'2019-06-12'], 'AAA', 'daily_raw')
+    write_artifact(bars[['close']].loc[:'2019-06-12'].rename(columns={'close': 'AAA'}).pct_change().dropna(), 'AAA', 'daily')
+    update_resampled('AAA', freq)
+
+    # uneven chunks, so bars are left open and completed across updates
+    dates = bars.loc['2019-06-13':].index
+    for start in range(0, len(dates), 17):
+        append_bars('AAA', bars.loc[dates[start]:dates[min(start + 16, len(dates) - 1)]])
+        update_resampled('AAA', freq)
+
+    daily = read_artifact('AAA', 'daily')
+    pd.testing.assert_frame_equal(read_artifact('AAA', freq), compound_returns(daily, freq), check_freq=False, rtol=1e-12)
+    pd.testing.assert_frame_equal(read_artifact('AAA', f'{freq}_raw'), resample_bars(bars, freq), check_freq=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize('start', ['2019-01-01', '2019-03-01'])
+def test_rewritten_history_is_resampled_in_full(data_dir, start):
+    _store('AAA', '2019-01-01', '2020-09-30')
+    update_resampled('AAA', 'weekly')
+
+    # a re-fetch ending on the same date, e.g. after adjusted prices changed
+    bars = _store('AAA', start, '2020-09-30', seed=1)
+    assert update_resampled('AAA', 'weekly') > 0
+    pd.testing.assert_frame_equal(read_artifact('AAA', 'weekly'), compound_returns(read_artifact('AAA', 'daily'), 'weekly'), check_freq=False)
+    pd.testing.assert_frame_equal(read_artifact('AAA', 'weekly_raw'), resample_bars(bars, 'weekly'), check_freq=False)
+    assert update_resampled('AAA', 'weekly') == 0
+
+
+def test_bucket_labels_do_not_depend_on_the_slice():
+    index = pd.bdate_range('2020-01-01', '2020-12-31')
+    for freq in ['weekly', 'monthly', '10session']:
+        full = bucket_labels(index, freq)
+        tail = bucket_labels(index[100:], freq)
+        assert full[100:].equals(tail)
+
+
+def test_resampling_keeps_the_ticker_fresh(data_dir):
+    _store('AAA', '2020-01-01', '2020-12-31')
+    mark_fresh('AAA')
+    assert update_resampled('AAA', 'weekly') > 0
+    assert is_fresh('AAA')
+
+
+def test_source_writes_invalidate_freshness(data_dir):
+    _store('AAA', '2020-01-01', '2020-12-31')
+    mark_fresh('AAA')
+    _store('AAA', '2020-01-01', '2021-01-29')
+    assert not is_fresh('AAA')
@@ -0,0 +1,21 @@
+import pytest
+
+from src.fetch import update_data as update_module
+from src.fetch.freshness import is_fresh
+
+
+@pytest.mark.parametrize('status, fresh', [('ok', True), ('empty', False), ('error', False)])
+def test_only_successful_fetches_mark_fresh(data_dir, monkeypatch, status, fresh):
+    calls = []
+
+    def fake_fetch(ticker, **kwargs):
+        calls.append(ticker)
+        return {ticker: {'ticker': ticker, 'provider': 'tiingo', 'status': status, 'rows': 0, 'error': None, 'seconds': 0.0}}
+
+    monkeypatch.setattr(update_module, 'fetch', fake_fetch)
+    update_module.update_data('AAA')
+    assert is_fresh('AAA') is fresh
+
+    # a failure is retried on the next call, a success is answered from the registry
+    update_module.update_data('AAA')
+    assert len(calls) == (1 if fresh else 2)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.process.volatility import estimator_volatility, rolling_std
+
+
+def _ohlc(rows=300, tickers=('A', 'B', 'C'), seed=0):
+    index = pd.bdate_range('2020-01-01', periods=rows, name='date')
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (rows, len(tickers))), axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.005, close.shape))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.005, close.shape)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.005, close.shape)))
+    bars = {name: pd.DataFrame(values, index=index, columns=list(tickers)) for name, values in
+            [('open', open_), ('high', high), ('low', low), ('close', close)]}
+    # gaps of different lengths in two tickers
+    for frame in bars.values():
+        frame.iloc[40:45, 0] = np.nan
+        frame.iloc[100:101, 1] = np.nan
+        frame.iloc[200:230, 1] = np.nan
+    return bars
+
+
+def _yang_zhang_reference(bars, ticker, window):
+    df = pd.DataFrame({name: frame[ticker] for name, frame in bars.items()}).dropna()
+    overnight = np.log(df['open'] / df['close'].shift())
+    df = df.assign(overnight=overnight).iloc[1:]
+    open_close = np.log(df['close'] / df['open'])
+    rogers_satchell = (np.log(df['high'] / df['close']) * np.log(df['high'] / df['open'])
+                       + np.log(df['low'] / df['close']) * np.log(df['low'] / df['open']))
+    k = 0.34 / (1.34 + (window + 1) / (window - 1))
+    variance = (df['overnight'].rolling(window).var() + k * open_close.rolling(window).var()
+                + (1 - k) * rogers_satchell.rolling(window).mean())
+    return np.sqrt(variance)
+
+
+def test_yang_zhang_matches_per_ticker_reference_across_gaps():
+    bars = _ohlc()
+    result = estimator_volatility(bars, 'yang_zhang', window=20)
+    for ticker in result.columns:
+        expected = _yang_zhang_reference(bars, ticker, 20).dropna()
+        np.testing.assert_allclose(result[ticker].dropna(), expected, rtol=1e-9)
+        assert result[ticker].dropna().index.equals(expected.index)
+
+
+def test_rolling_std_matches_pandas_per_column():
+    bars = _ohlc()
+    returns = bars['close'].pct_change(fill_method=None)
+    result = rolling_std(returns, 20)
+    for ticker in returns.columns:
+        expected = returns[ticker].dropna().rolling(20).std().dropna()
+        np.testing.assert_allclose(result[ticker].dropna(), expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize('estimator', ['parkinson', 'garman_klass', 'rogers_satchell'])
+def test_range_estimators_are_non_negative(estimator):
+    result = estimator_volatility(_ohlc(), estimator, window=20)
+    assert (result.dropna() >= 0).all().all()